@@ -1,9 +1,13 @@
+import multiprocessing
+
 from ui.main_window import iniciar_app
 from core.workflow import procesar_video
 
 if __name__ == "__main__":
+    # Necesario para el worker de Whisper en el ejecutable de PyInstaller
+    multiprocessing.freeze_support()
     ventana, barra, log, entrada_url = iniciar_app(
-        lambda path, es_youtube=False, es_audio=False, minutos_por_parte=5, inicio_min=None, fin_min=None, dividir_video=True, vertical_tiktok=False, vertical_orden="LR", recorte_top=0.12, recorte_bottom=0.12, recorte_bordes=False, recorte_manual_top=0.0, recorte_manual_bottom=0.0, generar_srt=True, fondo_path=None, fondo_estilo="fill", fondo_escala=0.92, fondo_usar_tamano_imagen=False, fondo_inset_pct=None, fondo_zoom=1.0, fondo_cintas=None, fondo_mensajes=None, fondo_bg_crop_top=0.0, fondo_bg_crop_bottom=0.0, solo_video=False, visualizador=False, posicion_visualizador="centro", visualizador_opacidad=0.65, visualizador_color="#FFFFFF", visualizador_margen=0, visualizador_exposicion=0.0, visualizador_contraste=1.0, visualizador_saturacion=1.0, visualizador_temperatura=0.0, modo_visualizador="lighten", visualizador_overlay_image=None, visualizador_overlay_start=0.0, visualizador_overlay_duration=2.0, musica_path=None, musica_volumen=0.25, musica_inicio=0.0, musica_fin=None, musica_inicio_video=0.0:
+        lambda path, es_youtube=False, es_audio=False, minutos_por_parte=5, inicio_min=None, fin_min=None, dividir_video=True, vertical_tiktok=False, vertical_orden="LR", recorte_top=0.12, recorte_bottom=0.12, recorte_bordes=False, recorte_manual_top=0.0, recorte_manual_bottom=0.0, generar_srt=True, fondo_path=None, fondo_estilo="fill", fondo_escala=0.92, fondo_usar_tamano_imagen=False, fondo_inset_pct=None, fondo_zoom=1.0, fondo_cintas=None, fondo_mensajes=None, fondo_bg_crop_top=0.0, fondo_bg_crop_bottom=0.0, solo_video=False, visualizador=False, posicion_visualizador="centro", visualizador_opacidad=0.65, visualizador_color="#FFFFFF", visualizador_margen=0, visualizador_exposicion=0.0, visualizador_contraste=1.0, visualizador_saturacion=1.0, visualizador_temperatura=0.0, modo_visualizador="lighten", visualizador_overlay_image=None, visualizador_overlay_start=0.0, visualizador_overlay_duration=2.0, musica_path=None, musica_volumen=0.25, musica_inicio=0.0, musica_fin=None, musica_inicio_video=0.0, al_terminar_parte=None:
         procesar_video(
             path,
             es_youtube,
@@ -51,6 +55,7 @@ if __name__ == "__main__":
             musica_inicio=musica_inicio,
             musica_fin=musica_fin,
             musica_inicio_video=musica_inicio_video,
+            al_terminar_parte=al_terminar_parte,
         )
     )
     ventana.mainloop()
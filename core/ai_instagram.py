@@ -1,8 +1,8 @@
 import os
 import re
-import requests
 from dotenv import load_dotenv
 
+from core import http_client
 from core.api_endpoints import get_primary_endpoint_url
 from core.video_transcription import obtener_transcripcion_para_video
 
@@ -78,7 +78,7 @@ def generar_descripcion_instagram(
     }
     if logs:
         logs("Llamando a OpenAI para generar descripción de Instagram...")
-    resp = requests.post(OPENAI_API_URL, headers=headers, json=payload, timeout=90)
+    resp = http_client.post(OPENAI_API_URL, headers=headers, json=payload, timeout=90)
     if resp.status_code != 200:
         raise RuntimeError(f"OpenAI error {resp.status_code}: {resp.text[:300]}")
     content = resp.json()["choices"][0]["message"]["content"].strip()
@@ -5,6 +5,7 @@ import requests
 import time
 from datetime import datetime
 from dotenv import load_dotenv
+from core import http_client
 from core.api_endpoints import get_primary_endpoint_url
 
 OPENAI_API_URL = get_primary_endpoint_url("OpenAI Chat")
@@ -95,7 +96,7 @@ def generar_descripcion_tiktok(
         "temperature": 0.7,
     }
     if logs: logs("Llamando a OpenAI...")
-    resp = requests.post(OPENAI_API_URL, headers=headers, json=payload, timeout=60)
+    resp = http_client.post(OPENAI_API_URL, headers=headers, json=payload, timeout=60)
     if resp.status_code != 200:
         raise RuntimeError(f"OpenAI error {resp.status_code}: {resp.text[:300]}")
     data = resp.json()
@@ -229,7 +230,7 @@ def generar_recomendaciones_clips(
     resp = None
     for attempt in range(3):
         try:
-            resp = requests.post(OPENAI_API_URL, headers=headers, json=payload, timeout=120)
+            resp = http_client.post(OPENAI_API_URL, headers=headers, json=payload, timeout=120)
             break
         except requests.exceptions.ReadTimeout:
             if logs:
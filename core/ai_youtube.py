@@ -1,14 +1,16 @@
 import os
 import re
-import requests
 from dotenv import load_dotenv
 
 from core.video_transcription import (
     MAX_TRANSCRIPTION_CHARS,
-    extraer_audio_y_subtitulos,
+    generar_srt_para_video,
+    obtener_segmentos_para_video,
     obtener_transcripcion_para_video,
 )
-from core.youtube_upload import YouTubeUploadError, upload_video
+from core import http_client
+from core.pipeline import Pipeline
+from core.youtube_upload import YouTubeCuotaAgotada, YouTubeUploadError, upload_video
 from core.api_endpoints import get_primary_endpoint_url
 from core.utils import obtener_duracion_segundos
 
@@ -103,7 +105,7 @@ def generar_textos_youtube(
     }
     if logs:
         logs("Llamando a OpenAI para generar metadatos...")
-    response = requests.post(
+    response = http_client.post(
         OPENAI_API_URL,
         headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
         json=payload,
@@ -121,35 +123,52 @@ def _format_hashtags(input_value: str) -> list[str]:
     return [f"#{entry}" for entry in parts]
 
 
-def subir_video_youtube_desde_ia(
+def preparar_texto_youtube(video_path: str, idioma: str = "es", log_fn=None) -> str:
+    """
+    Transcripcion del video para la IA; deja el SRT escrito de paso.
+    """
+    # Una sola transcripcion (guardada o recortada de la fuente) para texto y SRT.
+    segmentos = obtener_segmentos_para_video(video_path, idioma, logs=log_fn)
+    texto = obtener_transcripcion_para_video(video_path, idioma, logs=log_fn, segmentos=segmentos)
+    generar_srt_para_video(video_path, idioma, logs=log_fn, segmentos=segmentos)
+    return texto
+
+
+def subir_video_youtube_con_texto(
     video_path: str,
+    texto_base: str,
     api_key: str | None = None,
     model: str = "gpt-4o-mini",
     idioma: str = "es",
     privacy: str = "private",
     log_fn=None,
     max_attempts: int = MAX_METADATA_ATTEMPTS,
+    metadata: dict[str, str] | None = None,
 ) -> dict[str, str]:
+    """
+    Sube el video con metadatos generados a partir de texto_base. Si se pasan
+    metadata ya generados se usan en el primer intento; cada reintento
+    regenera los metadatos.
+    """
     if not video_path:
         raise ValueError("Video no especificado para subir.")
     attempts = max(1, int(max_attempts))
     fallback_title = os.path.splitext(os.path.basename(video_path))[0]
     duration = obtener_duracion_segundos(video_path)
     is_short = duration <= 60
-    texto_base = obtener_transcripcion_para_video(video_path, idioma, logs=log_fn)
-    extraer_audio_y_subtitulos(video_path, idioma, logs=log_fn)
 
     for intento in range(1, attempts + 1):
         if log_fn:
             log_fn(f"Intento {intento}/{attempts} de subida a YouTube.")
-        metadata = generar_textos_youtube(
-            video_path,
-            api_key,
-            model=model,
-            idioma=idioma,
-            texto=texto_base,
-            logs=log_fn,
-        )
+        if metadata is None or intento > 1:
+            metadata = generar_textos_youtube(
+                video_path,
+                api_key,
+                model=model,
+                idioma=idioma,
+                texto=texto_base,
+                logs=log_fn,
+            )
         title = metadata.get("titulo", "").strip() or fallback_title
         description = metadata.get("descripcion", "")
         hashtags = _format_hashtags(metadata.get("palabras", ""))
@@ -174,6 +193,9 @@ def subir_video_youtube_desde_ia(
                 "description": description,
                 "tags": tags_list,
             }
+        except YouTubeCuotaAgotada:
+            # Regenerar metadatos no devuelve cuota.
+            raise
         except YouTubeUploadError as exc:
             if intento >= attempts:
                 raise YouTubeUploadError(
@@ -184,3 +206,76 @@ def subir_video_youtube_desde_ia(
                     f"Upload falló en el intento {intento}: {exc}; regenerando metadatos y reintentando."
                 )
             continue
+
+
+def subir_video_youtube_desde_ia(
+    video_path: str,
+    api_key: str | None = None,
+    model: str = "gpt-4o-mini",
+    idioma: str = "es",
+    privacy: str = "private",
+    log_fn=None,
+    max_attempts: int = MAX_METADATA_ATTEMPTS,
+) -> dict[str, str]:
+    if not video_path:
+        raise ValueError("Video no especificado para subir.")
+    texto_base = preparar_texto_youtube(video_path, idioma, log_fn=log_fn)
+    return subir_video_youtube_con_texto(
+        video_path,
+        texto_base,
+        api_key,
+        model=model,
+        idioma=idioma,
+        privacy=privacy,
+        log_fn=log_fn,
+        max_attempts=max_attempts,
+    )
+
+
+def pipeline_publicacion_youtube(
+    api_key: str | None = None,
+    model: str = "gpt-4o-mini",
+    idioma: str = "es",
+    privacy: str = "private",
+    log_fn=None,
+    preparar=None,
+    concurrencia: tuple[int, int, int] = (1, 2, 1),
+) -> Pipeline:
+    """
+    Pipeline transcripcion -> metadatos IA -> subida para publicar partes a
+    medida que se renderizan (enviar(path) por parte). concurrencia: hilos
+    de cada etapa. preparar(path), si se pasa, corre antes de transcribir
+    (p. ej. generar un SRT con otro modelo).
+    """
+    def _transcribir(video_path):
+        if preparar:
+            preparar(video_path)
+        return video_path, preparar_texto_youtube(video_path, idioma, log_fn=log_fn)
+
+    def _metadatos(datos):
+        video_path, texto = datos
+        metadata = generar_textos_youtube(video_path, api_key, model=model, idioma=idioma, texto=texto, logs=log_fn)
+        return video_path, texto, metadata
+
+    def _subir(datos):
+        video_path, texto, metadata = datos
+        return subir_video_youtube_con_texto(
+            video_path,
+            texto,
+            api_key,
+            model=model,
+            idioma=idioma,
+            privacy=privacy,
+            log_fn=log_fn,
+            metadata=metadata,
+        )
+
+    n_transcripcion, n_metadatos, n_subida = concurrencia
+    return Pipeline(
+        [
+            ("transcripción", _transcribir, n_transcripcion),
+            ("metadatos IA", _metadatos, n_metadatos),
+            ("subida YouTube", _subir, n_subida),
+        ],
+        log_fn=log_fn,
+    )
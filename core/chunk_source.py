@@ -0,0 +1,97 @@
+"""
+Pedazos de archivo para subidas resumables (TikTok, Instagram).
+
+El archivo se abre con mmap de solo lectura y cada pedazo es una vista de sus
+paginas: el cuerpo del PUT/POST sale por bloques de core.upload_queue
+(con su limite de ancho de banda) sin copiar el pedazo a un bytes de Python.
+La memoria no crece con el tamano del pedazo ni con las subidas simultaneas.
+"""
+
+import mmap
+import os
+import random
+import re
+
+from core.upload_queue import CuerpoLimitado, limitador
+
+# Politica de reintentos de todas las subidas (TikTok, Instagram y YouTube).
+MAX_REINTENTOS = 8
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+class FuenteChunks:
+    """
+    Usar como context manager: with FuenteChunks(path) as fuente: ...
+    fuente.cuerpo(inicio, largo) es el data= de cada pedido.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._cuerpos: list[CuerpoLimitado] = []
+
+    def cuerpo(self, inicio: int, largo: int) -> CuerpoLimitado:
+        inicio = max(0, min(inicio, self.size))
+        fin = max(inicio, min(self.size, inicio + largo))
+        if self._mmap is None:
+            return CuerpoLimitado(b"", limitador())
+        # Los cuerpos viejos ya se enviaron: se sueltan sus vistas del mmap.
+        for viejo in self._cuerpos:
+            viejo.liberar()
+        cuerpo = CuerpoLimitado(memoryview(self._mmap)[inicio:fin], limitador())
+        self._cuerpos = [cuerpo]
+        return cuerpo
+
+    def cerrar(self):
+        for cuerpo in self._cuerpos:
+            cuerpo.liberar()
+        self._cuerpos = []
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Alguna vista sigue viva (p. ej. en un pedido fallido); el
+                # mmap se cierra cuando se libere.
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.cerrar()
+
+
+def espera_backoff(intento: int) -> float:
+    # Backoff exponencial con jitter completo.
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** intento)))
+
+
+def offset_servidor(response) -> int | None:
+    """
+    Proximo byte que espera el servidor segun la respuesta: header offset /
+    x-entity-offset o JSON {"offset"} (Instagram), o Range / Content-Range
+    "bytes 0-N" (TikTok). None si la respuesta no lo dice.
+    """
+    for clave in ("offset", "Offset", "x-entity-offset"):
+        valor = response.headers.get(clave)
+        if valor is not None:
+            try:
+                return int(valor)
+            except ValueError:
+                pass
+    try:
+        data = response.json()
+        if isinstance(data, dict) and data.get("offset") is not None:
+            return int(data["offset"])
+    except Exception:
+        pass
+    for clave in ("Range", "Content-Range"):
+        match = re.search(r"bytes[ =]\d+-(\d+)", response.headers.get(clave) or "")
+        if match:
+            return int(match.group(1)) + 1
+    return None
@@ -0,0 +1,183 @@
+"""
+Composicion en memoria de cintas y mensajes.
+
+Mensajes y cintas se dibujan con Pillow sobre una sola capa RGBA
+transparente, sin pasar por PNG temporales intermedios. Las fuentes se
+cargan una vez por (archivo, tamano) y la capa se memoriza por
+configuracion y tamano: todas las partes de un corte (y la vista previa)
+comparten el mismo render. png_capa deja esa capa en un unico PNG para
+usarla como entrada de ffmpeg.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+MAX_FUENTES = 64
+MAX_CAPAS = 8
+
+_lock = threading.Lock()
+
+
+def _pil_color(value: str, fallback: str) -> str:
+    val = (value or "").strip()
+    if not val:
+        val = fallback
+    if val.lower().startswith("0x"):
+        hexval = val[2:]
+        return "#" + hexval.upper()
+    if not val.startswith("#") and all(c in "0123456789abcdefABCDEF" for c in val) and len(val) in (3, 6):
+        return "#" + val.upper()
+    return val
+
+
+@lru_cache(maxsize=MAX_FUENTES)
+def fuente(fontfile: str, size: int):
+    """
+    Fuente TrueType de fontfile en size puntos (la de Pillow si no existe o
+    no se puede abrir). Memorizada por (fontfile, size).
+    """
+    try:
+        if fontfile and os.path.exists(fontfile):
+            return ImageFont.truetype(fontfile, size)
+    except Exception:
+        pass
+    return ImageFont.load_default()
+
+
+def _rect(item: dict, w: int, h: int) -> tuple[int, int, int, int] | None:
+    """
+    (left, top, ancho, alto) en pixeles de un elemento con *_pct.
+    """
+    try:
+        left = float(item.get("left_pct", 0)) / 100.0
+        top = float(item.get("top_pct", 0)) / 100.0
+        width = float(item.get("width_pct", 0)) / 100.0
+        height = float(item.get("height_pct", 0)) / 100.0
+    except Exception:
+        return None
+    return (
+        int(w * left),
+        int(h * top),
+        max(2, int(w * width)),
+        max(2, int(h * height)),
+    )
+
+
+def dibujar_mensajes(draw: ImageDraw.ImageDraw, w: int, h: int, mensajes: list[dict]):
+    for m in mensajes:
+        rect = _rect(m, w, h)
+        if rect is None:
+            continue
+        left_px, top_px, width_px, height_px = rect
+
+        bg_color = _pil_color(m.get("bg_color"), "#D91E18")
+        text_color = _pil_color(m.get("text_color"), "#FFFFFF")
+        border_color = _pil_color(m.get("border_color"), "#FFC400")
+        radius_pct = float(m.get("radius_pct", 0.5) or 0.5)
+        border_w = int(float(m.get("border_width", 2) or 2))
+        radius = max(2, int(height_px * radius_pct))
+
+        caja = [left_px, top_px, left_px + width_px, top_px + height_px]
+        draw.rounded_rectangle(caja, radius=radius, fill=bg_color)
+        if border_w > 0 and border_color:
+            draw.rounded_rectangle(caja, radius=radius, outline=border_color, width=border_w)
+
+        text = str(m.get("text", "") or "")
+        font_size = max(14, int(height_px * 0.55))
+        font = fuente((m.get("fontfile") or "").strip(), font_size)
+        try:
+            bbox = draw.textbbox((0, 0), text, font=font)
+            text_w = bbox[2] - bbox[0]
+            text_h = bbox[3] - bbox[1]
+        except Exception:
+            text_w = len(text) * font_size * 0.5
+            text_h = font_size
+        text_x = left_px + (width_px - text_w) / 2
+        text_y = top_px + (height_px - text_h) / 2
+        draw.text((text_x, text_y), text, font=font, fill=text_color)
+
+
+def dibujar_cintas(draw: ImageDraw.ImageDraw, w: int, h: int, cintas: list[dict]):
+    for c in cintas:
+        rect = _rect(c, w, h)
+        if rect is None:
+            continue
+        left_px, top_px, width_px, height_px = rect
+        border_w = max(4, int(height_px * 0.08))
+
+        bg_color = _pil_color(c.get("bg_color"), "#000000")
+        border_color = _pil_color(c.get("border_color"), "#FFC400")
+        text_color = _pil_color(c.get("text_color"), "#FFFFFF")
+
+        draw.rectangle([left_px, top_px, left_px + width_px, top_px + height_px], fill=bg_color)
+        draw.rectangle([left_px, top_px, left_px + border_w, top_px + height_px], fill=border_color)
+
+        name = str(c.get("nombre", "") or "")
+        role = str(c.get("rol", "") or "")
+        name_size = max(14, int(height_px * 0.45))
+        role_size = max(12, int(height_px * 0.30))
+        name_font = fuente((c.get("fontfile_name") or "").strip(), name_size)
+        role_font = fuente((c.get("fontfile_role") or "").strip(), role_size)
+
+        pad_x = max(6, int(height_px * 0.12))
+        pad_y = max(4, int(height_px * 0.12))
+        draw.text((left_px + border_w + pad_x, top_px + pad_y), name, font=name_font, fill=text_color)
+        draw.text((left_px + border_w + pad_x, top_px + pad_y + name_size + 2), role, font=role_font, fill=text_color)
+
+
+def _clave(w: int, h: int, cintas, mensajes) -> str:
+    return json.dumps([int(w), int(h), cintas or [], mensajes or []], sort_keys=True, default=str, ensure_ascii=False)
+
+
+@lru_cache(maxsize=MAX_CAPAS)
+def _capa_cacheada(clave: str) -> Image.Image:
+    w, h, cintas, mensajes = json.loads(clave)
+    capa = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(capa, "RGBA")
+    # Los mensajes quedan debajo de las cintas.
+    if mensajes:
+        dibujar_mensajes(draw, w, h, mensajes)
+    if cintas:
+        dibujar_cintas(draw, w, h, cintas)
+    return capa
+
+
+def capa(w: int, h: int, cintas: list[dict] | None = None, mensajes: list[dict] | None = None) -> Image.Image:
+    """
+    Capa RGBA (w x h) con mensajes y cintas. Devuelve una copia del render
+    memorizado: se puede componer o escalar sin afectar a otros usos.
+    """
+    with _lock:
+        return _capa_cacheada(_clave(w, h, cintas, mensajes)).copy()
+
+
+def huella(w: int, h: int, cintas: list[dict] | None = None, mensajes: list[dict] | None = None) -> str:
+    return hashlib.sha1(_clave(w, h, cintas, mensajes).encode("utf-8")).hexdigest()[:16]
+
+
+def png_capa(
+    w: int,
+    h: int,
+    cintas: list[dict] | None,
+    mensajes: list[dict] | None,
+    directorio: str,
+) -> str:
+    """
+    Ruta del PNG de la capa en directorio (overlay_<huella>.png). Se
+    renderiza solo si todavia no existe.
+    """
+    path = os.path.join(directorio, f"overlay_{huella(w, h, cintas, mensajes)}.png")
+    if os.path.exists(path):
+        return path
+    imagen = capa(w, h, cintas, mensajes)
+    os.makedirs(directorio, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.png"
+    imagen.save(tmp, "PNG")
+    os.replace(tmp, path)
+    return path
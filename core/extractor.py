@@ -1,7 +1,7 @@
 import os
 import tempfile
-import subprocess
 import hashlib
+from core import ffmpeg_runner
 from core.utils import tiene_audio
 
 def _safe_audio_path(path: str) -> str:
@@ -43,7 +43,7 @@ def extraer_audio(video_path: str, audio_path: str | None = None, log_fn=None) -
         "-b:a", "192k",
         audio_path
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd)
 
     if result.returncode != 0 or not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
         err = (result.stderr or "").strip()
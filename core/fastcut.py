@@ -0,0 +1,274 @@
+"""
+Cortes sin recodificar.
+
+Usa el indice de keyframes (flags de paquete de ffprobe, cacheado en
+probe_cache) para copiar los GOP completos de un tramo. En modo exacto
+("smart cut") solo se recodifican el pedazo inicial hasta el primer keyframe
+y el final desde el ultimo; el centro se copia tal cual.
+
+Modos (argumento o ZEMPER_MODO_CORTE):
+- recodificar: todo con libx264 (por defecto en cortar_tramo)
+- exacto: bordes al frame, recodificando solo cabeza y cola con el perfil,
+  nivel y referencias de la fuente; si libx264 no puede igualarlos (10 bits,
+  4:2:2, entrelazado...) se recodifica todo
+- rapido: copia pura alineada a keyframes (los bordes se mueven al GOP); es
+  el modo por defecto de dividir_tramos, asi dividir un video sin recorte
+  corre a velocidad de disco. Cada parte empieza en un keyframe de la
+  fuente, asi que nunca mezcla SPS/PPS.
+
+El MP4 del modo exacto lleva en banda los SPS/PPS de la cabeza recodificada
+y los de la fuente; aunque perfil y nivel coinciden, no todos los
+reproductores lo toleran, por eso no es el modo por defecto.
+"""
+
+import bisect
+import os
+import shutil
+import tempfile
+
+from core import ffmpeg_runner, probe_cache, stop_control
+from core.part_pool import args_hilos
+
+MODO_CORTE_ENV = "ZEMPER_MODO_CORTE"
+MODOS = ("exacto", "rapido", "recodificar")
+# Tolerancia para considerar que un borde ya cae en un keyframe.
+_TOLERANCIA = 0.002
+# Perfiles H.264 de la fuente que libx264 (8 bits, 4:2:0) puede reproducir.
+_PERFILES_X264 = {"constrained baseline": "baseline", "baseline": "baseline", "main": "main", "high": "high"}
+
+
+def modo_corte(modo: str | None = None, por_defecto: str = "recodificar") -> str:
+    modo = (modo or os.getenv(MODO_CORTE_ENV, "") or por_defecto).strip().lower()
+    return modo if modo in MODOS else por_defecto
+
+
+def _codec(path: str, tipo: str) -> str:
+    stream = probe_cache.primer_stream(path, tipo) or {}
+    return (stream.get("codec_name") or "").lower()
+
+
+def _args_x264(stream: dict) -> list[str] | None:
+    """
+    Opciones de libx264 para que cabeza y cola recodificadas tengan el mismo
+    perfil, nivel, formato de pixel, referencias y B-frames que la fuente.
+    None si libx264 no puede igualarla.
+    """
+    perfil = _PERFILES_X264.get((stream.get("profile") or "").strip().lower())
+    pix_fmt = stream.get("pix_fmt") or ""
+    if not perfil or pix_fmt not in ("yuv420p", "yuvj420p"):
+        return None
+    if (stream.get("field_order") or "progressive") not in ("progressive", "unknown"):
+        return None
+    args = ["-profile:v", perfil, "-pix_fmt", pix_fmt]
+    try:
+        nivel = int(stream.get("level") or 0)
+    except (TypeError, ValueError):
+        nivel = 0
+    if nivel > 0:
+        args += ["-level:v", f"{nivel / 10:.1f}"]
+    x264 = []
+    try:
+        refs = int(stream.get("refs") or 0)
+    except (TypeError, ValueError):
+        refs = 0
+    if refs > 0:
+        x264.append(f"ref={refs}")
+    if perfil == "baseline" or stream.get("has_b_frames") == 0:
+        x264.append("bframes=0")
+    if x264:
+        args += ["-x264-params", ":".join(x264)]
+    return args
+
+
+def soporta_copia(path: str, exacto: bool) -> bool:
+    """
+    La copia necesita video en un codec que MP4 acepte; el modo exacto
+    ademas recodifica cabeza y cola con libx264, asi que exige un H.264 que
+    libx264 pueda igualar.
+    """
+    codec = _codec(path, "video")
+    if exacto:
+        return codec == "h264" and _args_x264(probe_cache.primer_stream(path, "video") or {}) is not None
+    return codec in ("h264", "hevc", "mpeg4", "av1", "vp9")
+
+
+def _correr(cmd: list[str]) -> tuple[bool, str]:
+    result = ffmpeg_runner.run(cmd)
+    return result.returncode == 0, (result.stderr or "")[-400:]
+
+
+def _args_audio(path: str) -> list[str]:
+    # AAC/MP3 van tal cual en MP4; el resto se recodifica (es barato).
+    if _codec(path, "audio") in ("aac", "mp3"):
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac"]
+
+
+def _copiar(video_path: str, inicio: float, duracion: float, out_path: str) -> tuple[bool, str]:
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", f"{inicio:.3f}",
+        "-i", video_path,
+        "-t", f"{duracion:.3f}",
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        "-c:v", "copy",
+        *_args_audio(video_path),
+        "-avoid_negative_ts", "make_zero",
+        "-movflags", "+faststart",
+        out_path
+    ]
+    return _correr(cmd)
+
+
+def _video_ts(video_path: str, inicio: float, duracion: float, out_path: str, recodificar: bool) -> tuple[bool, str]:
+    """
+    Solo video, en MPEG-TS (SPS/PPS en banda) para poder concatenar pedazos
+    copiados y recodificados.
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", f"{inicio:.6f}",
+        "-i", video_path,
+        "-t", f"{duracion:.6f}",
+        "-map", "0:v:0",
+        "-an",
+    ]
+    if recodificar:
+        args_x264 = _args_x264(probe_cache.primer_stream(video_path, "video") or {})
+        if args_x264 is None:
+            return False, "perfil H.264 que libx264 no puede igualar"
+        cmd += [
+            "-c:v", "libx264",
+            *args_hilos(),
+            *args_x264,
+            "-crf", "18",
+        ]
+    else:
+        cmd += ["-c:v", "copy", "-bsf:v", "h264_mp4toannexb"]
+    cmd += ["-f", "mpegts", out_path]
+    return _correr(cmd)
+
+
+def _corte_exacto(video_path: str, inicio: float, duracion: float, out_path: str, kfs: list[float]) -> tuple[bool, str]:
+    fin = inicio + duracion
+    i = bisect.bisect_left(kfs, inicio - _TOLERANCIA)
+    j = bisect.bisect_right(kfs, fin + _TOLERANCIA) - 1
+    if i >= len(kfs) or j < 0 or kfs[i] >= kfs[j]:
+        # No hay un GOP completo dentro del tramo: no vale la pena copiar.
+        return False, "sin GOP completo"
+    k_ini, k_fin = kfs[i], kfs[j]
+    if k_fin >= fin - _TOLERANCIA:
+        k_fin = fin
+    if k_ini <= inicio + _TOLERANCIA and k_fin >= fin:
+        return _copiar(video_path, k_ini, duracion, out_path)
+
+    tmp_dir = tempfile.mkdtemp(prefix="smartcut_", dir=os.path.dirname(out_path) or None)
+    try:
+        piezas = []
+        plan = []
+        if k_ini > inicio + _TOLERANCIA:
+            plan.append((inicio, k_ini - inicio, True))
+        # El centro arranca justo en un keyframe: el seek de copia cae ahi.
+        plan.append((k_ini, k_fin - k_ini, False))
+        if k_fin < fin:
+            plan.append((k_fin, fin - k_fin, True))
+        for n, (desde, largo, recodificar) in enumerate(plan):
+            pieza = os.path.join(tmp_dir, f"{n}.ts")
+            ok, err = _video_ts(video_path, desde, largo, pieza, recodificar)
+            if not ok:
+                return False, err
+            piezas.append(pieza)
+
+        lista = os.path.join(tmp_dir, "lista.txt")
+        with open(lista, "w", encoding="utf-8") as fh:
+            for pieza in piezas:
+                fh.write(f"file '{os.path.abspath(pieza)}'\n")
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0",
+            "-i", lista,
+            "-ss", f"{inicio:.6f}",
+            "-t", f"{duracion:.6f}",
+            "-i", video_path,
+            "-map", "0:v:0",
+            "-map", "1:a:0?",
+            "-c:v", "copy",
+            *_args_audio(video_path),
+            "-t", f"{duracion:.6f}",
+            "-movflags", "+faststart",
+            out_path
+        ]
+        return _correr(cmd)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def cortar_tramo(
+    video_path: str,
+    inicio: float,
+    duracion: float,
+    out_path: str,
+    modo: str | None = None,
+    log_fn=None,
+) -> bool:
+    """
+    Corta [inicio, inicio + duracion) sin filtros copiando el video.
+    Devuelve False si no se pudo (codec no soportado, modo recodificar o
+    error), para que el llamador use su ruta con libx264.
+    """
+    modo = modo_corte(modo)
+    if modo == "recodificar" or not soporta_copia(video_path, exacto=(modo == "exacto")):
+        return False
+    salida_dir = os.path.dirname(out_path)
+    if salida_dir:
+        os.makedirs(salida_dir, exist_ok=True)
+    if modo == "rapido":
+        kfs = probe_cache.keyframes(video_path)
+        k = bisect.bisect_right(kfs, inicio + _TOLERANCIA) - 1
+        desde = kfs[k] if k >= 0 else inicio
+        ok, err = _copiar(video_path, desde, duracion + (inicio - desde), out_path)
+    else:
+        kfs = probe_cache.keyframes(video_path)
+        ok, err = _corte_exacto(video_path, inicio, duracion, out_path, kfs) if kfs else (False, "sin keyframes")
+    if not ok:
+        if log_fn:
+            log_fn(f"⚠️ Corte por copia no disponible ({err.strip()[-200:]}); se recodifica.")
+        try:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+        except Exception:
+            pass
+    return ok
+
+
+def dividir_tramos(
+    video_path: str,
+    tramos: list[tuple[float, float]],
+    out_paths: list[str],
+    modo: str | None = None,
+    log_fn=None,
+) -> list[str] | None:
+    """
+    Corta varios tramos por copia (por defecto en modo rapido). Devuelve las
+    rutas generadas, o None si la fuente no admite copia (el llamador
+    recodifica todo). Un tramo que falla queda fuera de la lista.
+    """
+    modo = modo_corte(modo, por_defecto="rapido")
+    if modo == "recodificar" or not soporta_copia(video_path, exacto=(modo == "exacto")):
+        return None
+    if not probe_cache.keyframes(video_path):
+        return None
+    generados = []
+    for n, ((inicio, duracion), out_path) in enumerate(zip(tramos, out_paths), start=1):
+        if stop_control.should_stop():
+            if log_fn:
+                log_fn("Proceso detenido por el usuario.")
+            break
+        if cortar_tramo(video_path, inicio, duracion, out_path, modo=modo, log_fn=log_fn):
+            generados.append(out_path)
+            if log_fn:
+                log_fn(f"✔ Video parte {n}/{len(tramos)} lista (copia): {out_path}")
+        else:
+            break
+    return generados
@@ -0,0 +1,266 @@
+"""
+Ejecucion unificada de ffmpeg (y de las demas herramientas externas).
+
+Cada proceso arranca en su propio grupo de procesos y queda registrado en
+core.stop_control bajo el trabajo que lo lanzo; un stop termina solo esos
+procesos (el grupo completo, con sus hijos) y no cualquier ffmpeg de la
+maquina. De stderr se guarda solo la cola (COLA_STDERR caracteres). Con
+on_progress se agrega `-progress pipe:1` y cada bloque se entrega como un
+evento {"out_time", "fps", "speed", "frame", "progreso", "eta"}.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+from core import stop_control
+
+COLA_STDERR = 4000
+ESPERA_TERMINAR = 3.0
+
+
+def _opciones_grupo() -> dict:
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def terminar(proc: subprocess.Popen, espera: float = ESPERA_TERMINAR):
+    """
+    Termina proc y su grupo: primero con aviso, luego forzado.
+    """
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            proc.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            os.killpg(proc.pid, signal.SIGTERM)
+    except (OSError, ValueError):
+        pass
+    try:
+        proc.wait(timeout=espera)
+        return
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                capture_output=True,
+                text=True,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def abrir(cmd: list[str], **kwargs) -> subprocess.Popen:
+    """
+    Popen en un grupo propio y registrado en el trabajo actual. Para procesos
+    con pipes que maneja el llamador; cerrar con cerrar(proc).
+    """
+    proc = subprocess.Popen(cmd, **_opciones_grupo(), **kwargs)
+    stop_control.registrar_proceso(proc)
+    return proc
+
+
+def cerrar(proc: subprocess.Popen, forzar: bool = False):
+    if forzar:
+        terminar(proc)
+    stop_control.quitar_proceso(proc)
+
+
+def _segundos(valor: str) -> float | None:
+    valor = (valor or "").strip()
+    if not valor or valor == "N/A":
+        return None
+    try:
+        if ":" in valor:
+            h, m, s = valor.split(":")
+            return int(h) * 3600 + int(m) * 60 + float(s)
+        return float(valor)
+    except ValueError:
+        return None
+
+
+def _evento(bloque: dict, duracion: float | None) -> dict:
+    out_time = None
+    if bloque.get("out_time_us", "N/A") != "N/A":
+        out_time = _segundos(bloque["out_time_us"])
+        out_time = out_time / 1_000_000.0 if out_time is not None else None
+    if out_time is None:
+        out_time = _segundos(bloque.get("out_time", ""))
+    speed = _segundos((bloque.get("speed") or "").rstrip("x"))
+    evento = {
+        "out_time": out_time or 0.0,
+        "fps": _segundos(bloque.get("fps", "")),
+        "speed": speed,
+        "frame": int(bloque["frame"]) if (bloque.get("frame") or "").isdigit() else None,
+        "progreso": None,
+        "eta": None,
+        "fin": bloque.get("progress") == "end",
+    }
+    if duracion and duracion > 0:
+        evento["progreso"] = max(0.0, min(1.0, evento["out_time"] / duracion))
+        if speed and speed > 0:
+            evento["eta"] = max(0.0, duracion - evento["out_time"]) / speed
+    return evento
+
+
+def _con_progreso(cmd: list[str]) -> list[str]:
+    if "-progress" in cmd or not cmd or os.path.basename(cmd[0]).split(".")[0] != "ffmpeg":
+        return cmd
+    return [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+
+
+def run(
+    cmd: list[str],
+    text: bool = True,
+    duracion: float | None = None,
+    on_progress=None,
+    input=None,
+    poll: float = 0.2,
+) -> subprocess.CompletedProcess:
+    """
+    Ejecuta cmd hasta terminar. Devuelve CompletedProcess con stdout completo
+    (salvo con on_progress, donde stdout son los eventos) y la cola de
+    stderr. Si el trabajo se detiene, el proceso se termina y returncode es
+    distinto de cero; stop_control.should_stop() lo distingue de un error.
+    """
+    if on_progress:
+        cmd = _con_progreso(cmd)
+    proc = abrir(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    cola_err = deque()
+    tam_err = [0]
+    salida = []
+
+    def _leer_stderr():
+        for raw in iter(lambda: proc.stderr.read(4096), b""):
+            cola_err.append(raw)
+            tam_err[0] += len(raw)
+            while tam_err[0] - len(cola_err[0]) >= COLA_STDERR:
+                tam_err[0] -= len(cola_err.popleft())
+
+    def _leer_stdout():
+        if not on_progress:
+            salida.append(proc.stdout.read())
+            return
+        bloque = {}
+        for raw in proc.stdout:
+            linea = raw.decode("utf-8", "replace").strip()
+            if "=" not in linea:
+                continue
+            clave, valor = linea.split("=", 1)
+            bloque[clave] = valor
+            if clave == "progress":
+                try:
+                    on_progress(_evento(bloque, duracion))
+                except Exception:
+                    pass
+                bloque = {}
+
+    def _escribir_stdin():
+        try:
+            proc.stdin.write(input if isinstance(input, bytes) else str(input).encode("utf-8"))
+            proc.stdin.close()
+        except OSError:
+            pass
+
+    hilos = [
+        threading.Thread(target=_leer_stderr, daemon=True),
+        threading.Thread(target=_leer_stdout, daemon=True),
+    ]
+    if input is not None:
+        hilos.append(threading.Thread(target=_escribir_stdin, daemon=True))
+    for hilo in hilos:
+        hilo.start()
+    try:
+        while proc.poll() is None:
+            if stop_control.should_stop():
+                terminar(proc)
+                break
+            time.sleep(poll)
+        proc.wait()
+        for hilo in hilos:
+            hilo.join(timeout=5)
+    finally:
+        cerrar(proc)
+
+    stdout = b"".join(s for s in salida if s)
+    stderr = b"".join(cola_err)[-COLA_STDERR:]
+    if text:
+        stdout = stdout.decode("utf-8", "replace")
+        stderr = stderr.decode("utf-8", "replace")
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def formato_eta(segundos: float | None) -> str:
+    if segundos is None:
+        return "--:--"
+    segundos = int(round(segundos))
+    h, resto = divmod(segundos, 3600)
+    m, s = divmod(resto, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class ProgresoAgregado:
+    """
+    Progreso de varios ffmpeg que suman total segundos (p. ej. partes en
+    paralelo). callback(clave) devuelve el on_progress de cada trabajo;
+    actualiza barra.set(fraccion) y cada intervalo segundos loguea el
+    porcentaje con el ETA segun el ritmo real de avance.
+    """
+
+    def __init__(self, total: float, barra=None, log_fn=None, intervalo: float = 10.0):
+        self.total = max(0.001, float(total))
+        self.barra = barra
+        self.log_fn = log_fn
+        self.intervalo = intervalo
+        self._hechos: dict = {}
+        self._lock = threading.Lock()
+        self._inicio = time.monotonic()
+        self._ultimo_log = self._inicio
+
+    def callback(self, clave):
+        def _on_progress(evento: dict):
+            with self._lock:
+                self._hechos[clave] = evento["out_time"]
+            self._actualizar()
+        return _on_progress
+
+    def terminar(self, clave, segundos: float):
+        with self._lock:
+            self._hechos[clave] = segundos
+        self._actualizar()
+
+    def _actualizar(self):
+        with self._lock:
+            hecho = min(self.total, sum(self._hechos.values()))
+            ahora = time.monotonic()
+            loguear = self.log_fn and ahora - self._ultimo_log >= self.intervalo
+            if loguear:
+                self._ultimo_log = ahora
+        fraccion = hecho / self.total
+        if self.barra:
+            try:
+                self.barra.set(fraccion)
+            except Exception:
+                pass
+        if loguear and hecho > 0:
+            ritmo = hecho / max(0.001, ahora - self._inicio)
+            eta = (self.total - hecho) / ritmo if ritmo > 0 else None
+            self.log_fn(f"⏳ {fraccion * 100:.0f}% · ETA {formato_eta(eta)}")
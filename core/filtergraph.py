@@ -0,0 +1,249 @@
+"""
+Compilador de filtergraph por parte para procesar_video.
+
+Junta en un solo -filter_complex los efectos habilitados (recorte, fondo con
+cintas/mensajes, vertical apilado, onda del visualizador, imagen temporizada y
+musica) para que cada parte se decodifique una vez y cada salida se codifique
+una sola vez. Las funciones de core.utils siguen siendo la ruta alternativa.
+"""
+
+import os
+import re
+
+from core.part_pool import args_hilos
+from core.utils import (
+    _ejecutar_ffmpeg_con_progreso,
+    _entradas_fondo,
+    _grafo_fondo,
+    _grafo_imagen_temporizada,
+    _grafo_musica,
+    _grafo_onda,
+    _grafo_overlay_visualizador,
+    _grafo_vertical,
+)
+
+
+def tamano_tras_recorte(src_w: int, src_h: int, crop_filter: str | None) -> tuple[int, int]:
+    """
+    Tamano de salida de un filtro generado por _filtro_recorte.
+    """
+    if not crop_filter:
+        return (src_w, src_h)
+    m = re.search(r"scale=(\d+):(\d+)", crop_filter)
+    if m:
+        return (int(m.group(1)), int(m.group(2)))
+    m = re.match(r"crop=(\d+):(\d+):", crop_filter)
+    if m:
+        return (int(m.group(1)), int(m.group(2)))
+    m = re.match(r"crop=iw:ih\*\(1-([0-9.]+)\)", crop_filter)
+    if m:
+        return (src_w, int(src_h * (1 - float(m.group(1)))))
+    return (src_w, src_h)
+
+
+def _repartir(grafo: list[str], label: str, n: int, nombre: str, audio: bool = False) -> list[str]:
+    if n <= 1:
+        return [label]
+    outs = [f"{nombre}{i}" for i in range(n)]
+    filtro = "asplit" if audio else "split"
+    grafo.append(f"[{label}]{filtro}={n}" + "".join(f"[{o}]" for o in outs))
+    return outs
+
+
+def compilar_parte(
+    duracion: float,
+    recorte: str | None = None,
+    vertical: dict | None = None,
+    fondo: dict | None = None,
+    fondo_vertical: dict | None = None,
+    visualizador: dict | None = None,
+    imagen: dict | None = None,
+    musica: dict | None = None,
+    con_audio: bool = True,
+) -> dict:
+    """
+    Compila los efectos de una parte. La entrada 0 es el video fuente ya
+    recortado en tiempo (-ss/-t). Devuelve:
+    - entradas: argumentos de las entradas extra (1..n), en orden
+    - filter_complex: grafo completo
+    - salidas: {clave: (label_video, map_audio)} con claves principal,
+      fondo, fondo_vertical y final (solo con visualizador)
+
+    fondo / fondo_vertical: resultado de _preparar_fondo mas "path".
+    vertical: {"orden", "recorte_top", "recorte_bottom", "crop_params"}.
+    visualizador: {"width", "height", "estilo", "color", "margen",
+    "exposicion", "contraste", "saturacion", "temperatura", "posicion",
+    "opacidad"}; requiere audio. imagen (solo con visualizador):
+    {"path", "start", "duration", "zoom"}. musica: resultado de
+    _preparar_musica mas "path"; se mezcla en la salida final.
+    """
+    entradas = []
+    grafo = []
+    salidas = {}
+
+    def _entrada(args: list[str]) -> int:
+        entradas.append(args)
+        return len(entradas)
+
+    if not con_audio:
+        visualizador = None
+    if not visualizador:
+        imagen = None
+
+    base = "0:v"
+    if recorte:
+        grafo.append(f"[0:v]{recorte}[rec]")
+        base = "rec"
+
+    # Consumidores de la base: principal (o vertical) y fondo.
+    consumidores = 1 + (1 if fondo else 0)
+    base_outs = _repartir(grafo, base, consumidores, "base")
+    base_main = base_outs[0]
+    if fondo:
+        bg_args, overlay_args = _entradas_fondo(fondo)
+        fondo_idx = _entrada(bg_args)
+        png_in = f"{_entrada(overlay_args)}:v" if overlay_args else None
+        grafo.append(_grafo_fondo(fondo, f"{fondo_idx}:v", base_outs[1], "fondo", overlay_in=png_in, prefix="fd_"))
+        salidas["fondo"] = ("fondo", "0:a?")
+
+    principal = base_main
+    if vertical:
+        grafo.append(_grafo_vertical(
+            base_main,
+            "vert",
+            vertical.get("orden", "LR"),
+            vertical.get("recorte_top", 0.12),
+            vertical.get("recorte_bottom", 0.12),
+            vertical.get("crop_params"),
+            prefix="vt_",
+        ))
+        principal = "vert"
+    else:
+        fondo_vertical = None
+
+    consumidores = 1 + (1 if fondo_vertical else 0) + (1 if visualizador else 0)
+    principal_outs = _repartir(grafo, principal, consumidores, "prin")
+    salidas["principal"] = (principal_outs[0], "0:a?")
+    resto = principal_outs[1:]
+    if fondo_vertical:
+        bg_args, overlay_args = _entradas_fondo(fondo_vertical)
+        fondo_idx = _entrada(bg_args)
+        png_in = f"{_entrada(overlay_args)}:v" if overlay_args else None
+        grafo.append(_grafo_fondo(fondo_vertical, f"{fondo_idx}:v", resto.pop(0), "fondov", overlay_in=png_in, prefix="fv_"))
+        salidas["fondo_vertical"] = ("fondov", "0:a?")
+
+    # Audio dentro del grafo: onda del visualizador y mezcla de musica.
+    usos_audio = (1 if visualizador else 0) + (1 if musica and con_audio else 0)
+    audio_outs = _repartir(grafo, "0:a", usos_audio, "aud", audio=True) if usos_audio else []
+
+    destino_final = "principal"
+    if visualizador:
+        v = resto.pop(0)
+        grafo.append(_grafo_onda(
+            audio_outs.pop(0),
+            "onda",
+            visualizador["width"],
+            visualizador["height"],
+            visualizador.get("estilo", "showwaves"),
+            visualizador.get("color", "#FFFFFF"),
+            duracion,
+            visualizador.get("margen", 0),
+            visualizador.get("exposicion", 0.0),
+            visualizador.get("contraste", 1.0),
+            visualizador.get("saturacion", 1.0),
+            visualizador.get("temperatura", 0.0),
+            prefix="on_",
+        ))
+        grafo.append(_grafo_overlay_visualizador(
+            v,
+            "onda",
+            "vis",
+            visualizador.get("posicion", "centro"),
+            10,
+            visualizador.get("opacidad", 0.75),
+            prefix="vz_",
+        ))
+        v = "vis"
+        if imagen:
+            img_idx = _entrada(["-loop", "1", "-i", imagen["path"]])
+            grafo.append(_grafo_imagen_temporizada(
+                v,
+                f"{img_idx}:v",
+                "imgout",
+                imagen["start"],
+                imagen["duration"],
+                imagen.get("zoom", 1.0),
+                prefix="im_",
+            ))
+            v = "imgout"
+        salidas["final"] = (v, "0:a?")
+        destino_final = "final"
+
+    if musica:
+        music_idx = _entrada([
+            "-ss", f"{musica['music_start']:.3f}",
+            "-t", f"{musica['effective']:.3f}",
+            "-i", musica["path"],
+        ])
+        audio_in = audio_outs.pop(0) if con_audio else None
+        grafo.append(_grafo_musica(musica, audio_in, f"{music_idx}:a", "mix", duracion, prefix="mu_"))
+        salidas[destino_final] = (salidas[destino_final][0], "[mix]")
+
+    return {
+        "entradas": entradas,
+        "filter_complex": ";".join(grafo),
+        "salidas": salidas,
+    }
+
+
+def renderizar_parte(
+    video_path: str,
+    inicio: float,
+    duracion: float,
+    compilado: dict,
+    rutas: dict,
+    log_fn=None,
+    on_progress=None,
+) -> tuple[bool, bool]:
+    """
+    Ejecuta un unico ffmpeg para una parte compilada con compilar_parte.
+    rutas: {clave_salida: ruta}. on_progress recibe los eventos de progreso
+    de ffmpeg_runner.run. Devuelve (ok, detenido).
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", f"{inicio:.3f}",
+        "-t", f"{duracion:.3f}",
+        "-i", video_path,
+    ]
+    for args in compilado["entradas"]:
+        cmd += args
+    cmd += ["-filter_complex", compilado["filter_complex"]]
+    for clave, (v_label, audio) in compilado["salidas"].items():
+        out_path = rutas.get(clave)
+        if not out_path:
+            # Toda etiqueta del grafo debe consumirse: descartar la salida.
+            cmd += ["-map", f"[{v_label}]", "-f", "null", "-"]
+            continue
+        salida_dir = os.path.dirname(out_path)
+        if salida_dir:
+            os.makedirs(salida_dir, exist_ok=True)
+        cmd += [
+            "-map", f"[{v_label}]",
+            "-map", audio,
+            "-c:v", "libx264",
+            *args_hilos(),
+            "-c:a", "aac",
+            "-pix_fmt", "yuv420p",
+            "-t", f"{duracion:.3f}",
+            "-movflags", "+faststart",
+            out_path,
+        ]
+    code, err, detenido = _ejecutar_ffmpeg_con_progreso(cmd, on_progress=on_progress, duracion=duracion)
+    if detenido:
+        return False, True
+    if code != 0:
+        if log_fn:
+            log_fn(f"❌ Grafo fusionado falló (code {code}): {err[-600:]}")
+        return False, False
+    return True, False
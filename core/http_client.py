@@ -0,0 +1,139 @@
+"""
+Transporte HTTP compartido por los clientes de API.
+
+Un requests.Session por host, con conexiones keep-alive en un pool (hasta
+POOL_MAX por host, para las subidas y consultas en paralelo) y reintentos de
+urllib3 con backoff:
+- errores de conexion (el pedido no llego a salir): cualquier metodo;
+- 429/5xx y errores de lectura: solo GET/HEAD/OPTIONS, que no tienen efectos
+  ni cuerpos que se consumen al enviarse.
+Los POST/PUT nunca se reenvian solos: el servidor pudo haber actuado antes
+de cortar (publicar, enviar un mensaje); reintentar es cosa de quien llama,
+que puede consultar el estado primero.
+
+metricas() devuelve pedidos, errores y tiempos por host; con
+ZEMPER_HTTP_METRICAS=1 el resumen se imprime al cerrar la app.
+"""
+
+import atexit
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+METRICAS_ENV = "ZEMPER_HTTP_METRICAS"
+POOL_MAX = 16
+TIMEOUT_DEFECTO = 60
+METODOS_IDEMPOTENTES = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_lock = threading.Lock()
+_sesiones: dict[str, requests.Session] = {}
+_metricas: dict[str, dict] = {}
+
+
+def _reintentos() -> Retry:
+    return Retry(
+        total=3,
+        connect=3,
+        read=1,
+        status=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=METODOS_IDEMPOTENTES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _host(url: str) -> str:
+    partes = urlsplit(url)
+    return f"{partes.scheme}://{partes.netloc}".lower()
+
+
+def sesion(url: str) -> requests.Session:
+    """
+    Session compartida para el host de url.
+    """
+    host = _host(url)
+    with _lock:
+        s = _sesiones.get(host)
+        if s is None:
+            s = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAX, max_retries=_reintentos())
+            s.mount("https://", adaptador)
+            s.mount("http://", adaptador)
+            _sesiones[host] = s
+        return s
+
+
+def _registrar(host: str, segundos: float, error: bool):
+    with _lock:
+        m = _metricas.setdefault(host, {"pedidos": 0, "errores": 0, "segundos": 0.0, "max": 0.0})
+        m["pedidos"] += 1
+        m["errores"] += int(error)
+        m["segundos"] += segundos
+        m["max"] = max(m["max"], segundos)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Como requests.request, sobre la Session del host y con metricas.
+    """
+    kwargs.setdefault("timeout", TIMEOUT_DEFECTO)
+    host = _host(url)
+    s = sesion(url)
+    inicio = time.perf_counter()
+    try:
+        response = s.request(method, url, **kwargs)
+    except Exception:
+        _registrar(host, time.perf_counter() - inicio, True)
+        raise
+    _registrar(host, time.perf_counter() - inicio, response.status_code >= 400)
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def metricas() -> dict[str, dict]:
+    """
+    {host: {"pedidos", "errores", "segundos", "max", "promedio"}}.
+    """
+    with _lock:
+        return {
+            host: dict(m, promedio=m["segundos"] / m["pedidos"] if m["pedidos"] else 0.0)
+            for host, m in _metricas.items()
+        }
+
+
+def resumen_metricas() -> str:
+    lineas = []
+    for host, m in sorted(metricas().items(), key=lambda item: -item[1]["segundos"]):
+        lineas.append(
+            f"{host}: {m['pedidos']} pedidos, {m['errores']} errores, "
+            f"prom {m['promedio'] * 1000:.0f} ms, max {m['max'] * 1000:.0f} ms"
+        )
+    return "\n".join(lineas)
+
+
+def _imprimir_metricas():
+    resumen = resumen_metricas()
+    if resumen:
+        print(f"Metricas HTTP:\n{resumen}")
+
+
+if os.getenv(METRICAS_ENV, "").strip() in ("1", "true", "si"):
+    atexit.register(_imprimir_metricas)
@@ -1,11 +1,10 @@
 import requests
 import time
 import os
-import json
-import subprocess
 from pathlib import Path
 from fractions import Fraction
 
+from core import chunk_source, ffmpeg_runner, http_client, probe_cache
 from core.instagram_auth import exchange_long_lived_token, token_expired
 
 
@@ -131,7 +130,7 @@ class InstagramUploader:
             "access_token": self.access_token
         }
         try:
-            r = requests.post(url, data=payload)
+            r = http_client.post(url, data=payload)
             r.raise_for_status()
             return r.json().get("id")
         except Exception as e:
@@ -148,7 +147,7 @@ class InstagramUploader:
         
         while time.time() - start_time < timeout:
             try:
-                r = requests.get(url, params=params)
+                r = http_client.get(url, params=params)
                 data = r.json()
                 status = data.get("status_code")
                 
@@ -174,7 +173,7 @@ class InstagramUploader:
             "access_token": self.access_token
         }
         try:
-            r = requests.post(url, data=payload)
+            r = http_client.post(url, data=payload)
             r.raise_for_status()
             return r.json().get("id")
         except Exception as e:
@@ -192,7 +191,7 @@ class InstagramUploader:
         # share_to_feed es opcional; sÃ³lo enviarlo si viene definido
         payload["share_to_feed"] = str(share_to_feed).lower()
         try:
-            r = requests.post(url, data=payload)
+            r = http_client.post(url, data=payload)
             r.raise_for_status()
             data = r.json()
             upload_uri = data.get("uri") or data.get("upload_url") or data.get("upload_uri")
@@ -216,59 +215,50 @@ class InstagramUploader:
         }
         try:
             # If no chunk size is provided, send the full file in one request (per IG rupload docs).
-            if not chunk_size_mb:
-                headers = {
-                    **base_headers,
-                    "offset": "0",
-                    "Content-Length": str(file_size),
-                }
-                with open(file_path, "rb") as f:
-                    r = requests.post(upload_uri, headers=headers, data=f)
-                r.raise_for_status()
-                return True
-
-            chunk_size = max(1, int(chunk_size_mb)) * 1024 * 1024
+            chunk_size = max(1, int(chunk_size_mb)) * 1024 * 1024 if chunk_size_mb else file_size
             sent = 0
-            with open(file_path, "rb") as f:
+            fallos = 0
+            with chunk_source.FuenteChunks(file_path) as fuente:
                 while sent < file_size:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
+                    largo = min(chunk_size, file_size - sent)
                     headers = {
                         **base_headers,
                         "offset": str(sent),
-                        "Content-Length": str(len(chunk)),
+                        "Content-Length": str(largo),
                     }
-                    r = requests.post(upload_uri, headers=headers, data=chunk)
-                    if r.status_code >= 400:
+                    try:
+                        r = http_client.post(upload_uri, headers=headers, data=fuente.cuerpo(sent, largo), timeout=300)
+                        motivo = f"HTTP {r.status_code}"
+                    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                        r = None
+                        motivo = type(exc).__name__
+                    next_offset = chunk_source.offset_servidor(r) if r is not None else None
+                    if r is not None and r.status_code < 400:
+                        sent = next_offset if next_offset is not None and next_offset > sent else sent + largo
+                        fallos = 0
                         if log_fn:
-                            log_fn(f"❌ IG chunk error HTTP {r.status_code}")
-                            preview = (r.text or "").strip()[:500]
-                            if preview:
-                                log_fn(f"   Respuesta: {preview}")
-                            hdr_offset = r.headers.get("offset") or r.headers.get("Offset") or r.headers.get("x-entity-offset")
-                            if hdr_offset:
-                                log_fn(f"   Offset header: {hdr_offset}")
+                            log_fn(f"↑ IG: {sent}/{file_size} bytes")
+                        continue
+                    if r is not None and log_fn:
+                        log_fn(f"❌ IG chunk error HTTP {r.status_code}")
+                        preview = (r.text or "").strip()[:500]
+                        if preview:
+                            log_fn(f"   Respuesta: {preview}")
+                        if next_offset is not None:
+                            log_fn(f"   Offset header: {next_offset}")
+                    # Un offset distinto del enviado se corrige reanudando desde donde dice IG.
+                    desfasado = next_offset is not None and next_offset != sent
+                    if r is not None and not desfasado and r.status_code < 500 and r.status_code != 429:
                         r.raise_for_status()
-                    next_offset = None
-                    try:
-                        data = r.json()
-                        if isinstance(data, dict) and data.get("offset") is not None:
-                            next_offset = int(data.get("offset"))
-                    except Exception:
-                        pass
-                    hdr_offset = r.headers.get("offset") or r.headers.get("Offset") or r.headers.get("x-entity-offset")
-                    if hdr_offset is not None:
-                        try:
-                            next_offset = int(hdr_offset)
-                        except Exception:
-                            pass
-                    if next_offset is None:
-                        sent += len(chunk)
-                    else:
+                    if fallos >= chunk_source.MAX_REINTENTOS:
+                        raise RuntimeError(f"IG: la subida falló tras {fallos} reintentos ({motivo}).")
+                    if next_offset is not None:
                         sent = next_offset
+                    espera = chunk_source.espera_backoff(fallos)
+                    fallos += 1
                     if log_fn:
-                        log_fn(f"↑ IG: {sent}/{file_size} bytes")
+                        log_fn(f"IG: reintento {fallos} desde el byte {sent} en {espera:.1f}s...")
+                    time.sleep(espera)
             return sent == file_size
         except Exception as e:
             self._log_error(e, "subiendo archivo IG (resumable)", log_fn)
@@ -410,7 +400,7 @@ class InstagramUploader:
             ]
             if log_fn:
                 log_fn("??? Re-encode IG: iniciando ffmpeg...")
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+            result = ffmpeg_runner.run(cmd)
             if result.returncode != 0:
                 if log_fn:
                     log_fn("? Re-encode IG fall?")
@@ -426,23 +416,17 @@ class InstagramUploader:
             return None
 
     def _ffprobe(self, file_path: str, log_fn=print):
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-print_format", "json",
-            "-show_format",
-            "-show_streams",
-            file_path,
-        ]
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace", check=True)
-            return json.loads(result.stdout)
+            data = probe_cache.probe(file_path)
         except Exception as e:
             if log_fn:
                 log_fn(f"??? No se pudo ejecutar ffprobe: {e}")
-                if hasattr(e, "stderr") and e.stderr:
-                    log_fn(f"   stderr: {e.stderr[:500]}")
             return None
+        if not data.get("format") and not data.get("streams"):
+            if log_fn:
+                log_fn(f"??? ffprobe no devolvio datos para {file_path}")
+            return None
+        return data
 
     def _get_fps(self, video_stream: dict):
         fps_raw = video_stream.get("avg_frame_rate") or video_stream.get("r_frame_rate")
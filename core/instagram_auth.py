@@ -1,5 +1,6 @@
 import time
-import requests
+
+from core import http_client
 
 
 def _now() -> int:
@@ -22,7 +23,7 @@ def exchange_long_lived_token(
         "client_secret": app_secret,
         "fb_exchange_token": short_lived_token,
     }
-    resp = requests.get(url, params=params, timeout=30)
+    resp = http_client.get(url, params=params, timeout=30)
     try:
         data = resp.json()
     except Exception:
@@ -5,8 +5,7 @@ import urllib.parse
 import webbrowser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 
-import requests
-
+from core import http_client
 from core.instagram_auth import exchange_long_lived_token
 
 
@@ -104,7 +103,7 @@ def exchange_code_for_token(
         "redirect_uri": redirect_uri,
         "code": code.strip(),
     }
-    resp = requests.get(url, params=params, timeout=30)
+    resp = http_client.get(url, params=params, timeout=30)
     try:
         data = resp.json()
     except Exception:
@@ -0,0 +1,156 @@
+"""
+Manifiesto de trabajo reanudable.
+
+Cada trabajo guarda en output/<base>/manifest.json lo que produjo cada etapa:
+sus salidas, una huella de los parametros y de las entradas, y un sello de
+cuando termino. Al reejecutar, las etapas cuyas salidas siguen en disco con
+la misma huella se saltan y solo se rehace desde la primera parte faltante o
+desactualizada.
+
+Las entradas se identifican por el sello de la etapa que las produjo (asi una
+parte re-renderizada invalida lo que depende de ella) o, si no salieron de
+ninguna etapa, por tamano y mtime del archivo.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+MANIFEST_NAME = "manifest.json"
+# 2: la musica se mezcla en <parte>_musica.mp4; las partes de la version 1
+# pueden tener la musica mezclada en sitio y no se reutilizan.
+MANIFEST_VERSION = 2
+
+
+def huella_archivo(path: str | None) -> str:
+    if not path:
+        return ""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def huella(*valores) -> str:
+    data = json.dumps(valores, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class Manifiesto:
+    """
+    Registro de etapas de un trabajo. Seguro para usar desde el pool de partes.
+    reanudar=False registra igual pero nunca da una etapa por vigente.
+    """
+
+    def __init__(self, base_dir: str, reanudar: bool = True):
+        self.path = os.path.join(base_dir, MANIFEST_NAME)
+        self.reanudar = reanudar
+        self._lock = threading.Lock()
+        self._data = self._cargar()
+
+    def _cargar(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+                data.setdefault("etapas", {})
+                data.setdefault("dirs", {})
+                return data
+        except Exception:
+            pass
+        return {"version": MANIFEST_VERSION, "etapas": {}, "dirs": {}}
+
+    def _guardar(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._data, fh, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+    def sello(self, path: str, excluir: str | None = None) -> str:
+        """
+        Identidad de una entrada: la ultima etapa (distinta de excluir) que la
+        produjo, o la huella del archivo.
+        """
+        objetivo = _norm(path)
+        mejor = None
+        with self._lock:
+            for etapa, registros in self._data["etapas"].items():
+                if etapa == excluir:
+                    continue
+                for registro in registros.values():
+                    if objetivo in registro["salidas"] and (mejor is None or registro["hecho"] > mejor[1]):
+                        mejor = (etapa, registro["hecho"])
+        if mejor:
+            return f"{mejor[0]}@{mejor[1]}"
+        return huella_archivo(path)
+
+    def huella_etapa(self, etapa: str, params, entradas=()) -> str:
+        sellos = [self.sello(e, excluir=etapa) if e else "" for e in entradas]
+        return huella(etapa, params, sellos)
+
+    def vigente(self, etapa: str, clave: str, huella_etapa: str) -> bool:
+        if not self.reanudar:
+            return False
+        with self._lock:
+            registro = self._data["etapas"].get(etapa, {}).get(_norm(clave))
+        if not registro or registro["huella"] != huella_etapa:
+            return False
+        # Las salidas se registran al terminar y el registro se invalida antes
+        # de rehacerlas, asi que un archivo existente no es un parcial.
+        return all(os.path.exists(salida) for salida in registro["salidas"])
+
+    def registrado(self, etapa: str, clave: str, huella_etapa: str) -> bool:
+        """
+        Como vigente, pero sin exigir que las salidas sigan en disco (para
+        temporales que se borran una vez consumidos).
+        """
+        if not self.reanudar:
+            return False
+        with self._lock:
+            registro = self._data["etapas"].get(etapa, {}).get(_norm(clave))
+        return bool(registro) and registro["huella"] == huella_etapa
+
+    def salidas(self, etapa: str, clave: str) -> list[str]:
+        with self._lock:
+            registro = self._data["etapas"].get(etapa, {}).get(_norm(clave))
+        return list(registro["salidas"]) if registro else []
+
+    def invalidar(self, etapa: str, clave: str):
+        with self._lock:
+            if self._data["etapas"].get(etapa, {}).pop(_norm(clave), None) is not None:
+                self._guardar()
+
+    def registrar(self, etapa: str, clave: str, huella_etapa: str, salidas: list[str]):
+        with self._lock:
+            self._data["etapas"].setdefault(etapa, {})[_norm(clave)] = {
+                "huella": huella_etapa,
+                "salidas": [_norm(s) for s in salidas if s],
+                "hecho": time.time(),
+            }
+            self._guardar()
+
+    def directorio(self, nombre: str, huella_dir: str, crear) -> str:
+        """
+        Reutiliza el directorio de la ultima corrida con la misma huella (para
+        reanudar); si no, crea uno nuevo con crear().
+        """
+        with self._lock:
+            previo = self._data["dirs"].get(nombre)
+        if self.reanudar and previo and previo.get("huella") == huella_dir and os.path.isdir(previo.get("path", "")):
+            return previo["path"]
+        path = crear()
+        with self._lock:
+            self._data["dirs"][nombre] = {"huella": huella_dir, "path": os.path.abspath(path)}
+            self._guardar()
+        return path
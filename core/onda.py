@@ -0,0 +1,186 @@
+"""
+Render de la onda (estilo showwaves) con NumPy.
+
+En lugar de que ffmpeg corra showwaves + eq + colorbalance + overlay + pad en
+cada frame, el audio se decodifica a PCM mono por stdout, la envolvente
+(minimo/maximo por columna) se calcula por lotes de frames y la onda se
+rasteriza con mascaras vectorizadas. Los ajustes de color se aplican una sola
+vez al color de la linea. Los frames RGBA crudos van por stdin a un unico
+ffmpeg que solo codifica.
+
+ZEMPER_VISUALIZADOR_RENDER=ffmpeg vuelve al filtergraph de ffmpeg.
+"""
+
+import math
+import os
+import subprocess
+
+import numpy as np
+from PIL import ImageColor
+
+from core import ffmpeg_runner, stop_control
+from core.part_pool import args_hilos
+
+RENDER_ENV = "ZEMPER_VISUALIZADOR_RENDER"
+# showwaves dibuja varias muestras por columna; se decodifica a una tasa
+# multiplo de fps * ancho cercana a esta.
+TASA_OBJETIVO = 44100
+FRAMES_POR_LOTE = 16
+
+
+def habilitado(estilo: str) -> bool:
+    """
+    Solo showwaves tiene render propio; el resto sigue en ffmpeg.
+    """
+    if (estilo or "showwaves").lower() != "showwaves":
+        return False
+    return os.getenv(RENDER_ENV, "numpy").strip().lower() != "ffmpeg"
+
+
+def color_ajustado(
+    color: str,
+    exposicion: float = 0.0,
+    contraste: float = 1.0,
+    saturacion: float = 1.0,
+    temperatura: float = 0.0,
+) -> tuple[int, int, int]:
+    """
+    Color de la linea tras eq (brillo/contraste/saturacion sobre YUV) y
+    colorbalance (sombras), como en el filtergraph de ffmpeg.
+    """
+    try:
+        r, g, b = ImageColor.getrgb(color)[:3]
+    except ValueError:
+        r, g, b = 255, 255, 255
+    rgb = np.array([r, g, b], dtype=np.float64) / 255.0
+    y = 0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]
+    u = (rgb[2] - y) * 0.565
+    v = (rgb[0] - y) * 0.713
+    y = (y - 0.5) * contraste + 0.5 + exposicion
+    u *= saturacion
+    v *= saturacion
+    rgb = np.array([y + 1.403 * v, y - 0.344 * u - 0.714 * v, y + 1.770 * u])
+    if abs(temperatura) > 1e-3:
+        # colorbalance rs/gs/bs actua sobre las sombras: pesa mas cuanto mas oscuro.
+        sombra = max(0.0, 1.0 - float(np.clip(rgb, 0, 1).mean()) * 2.0)
+        rgb += np.array([temperatura, temperatura / 2.0, -temperatura]) * sombra
+    rgb = np.clip(np.round(rgb * 255.0), 0, 255).astype(np.uint8)
+    return int(rgb[0]), int(rgb[1]), int(rgb[2])
+
+
+def rasterizar(bajos: np.ndarray, altos: np.ndarray, height: int, rgba: np.ndarray) -> np.ndarray:
+    """
+    Frames (B, height, W, 4) a partir del minimo y maximo (B, W) de cada
+    columna, en [-1, 1]. Cada columna se pinta desde el centro hasta el
+    extremo de sus muestras, como showwaves mode=line.
+    """
+    centro = height / 2.0
+    arriba = np.clip(np.floor(centro - np.maximum(altos, 0.0) * centro), 0, height - 1).astype(np.int32)
+    abajo = np.clip(np.ceil(centro - np.minimum(bajos, 0.0) * centro), 0, height - 1).astype(np.int32)
+    filas = np.arange(height, dtype=np.int32)[None, :, None]
+    mascara = (filas >= arriba[:, None, :]) & (filas <= abajo[:, None, :])
+    frames = np.zeros(mascara.shape + (4,), dtype=np.uint8)
+    frames[mascara] = rgba
+    return frames
+
+
+def args_video_onda(output_path: str) -> list[str]:
+    """
+    Codec para un video de onda: en .mov se guarda PNG con alfa (para
+    superponerlo despues igual que en el grafo fusionado); en otro
+    contenedor, H.264 sin transparencia.
+    """
+    if output_path.lower().endswith(".mov"):
+        return ["-pix_fmt", "rgba", "-c:v", "png"]
+    return ["-pix_fmt", "yuva420p", "-c:v", "libx264", *args_hilos()]
+
+
+def renderizar_onda(
+    audio_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    color: str,
+    fps: int,
+    margen_horizontal: int = 0,
+    exposicion: float = 0.0,
+    contraste: float = 1.0,
+    saturacion: float = 1.0,
+    temperatura: float = 0.0,
+    inicio: float = 0.0,
+    duracion: float | None = None,
+) -> str:
+    """
+    Genera el video de la onda con el mismo formato de salida que
+    generar_visualizador_audio. Lanza RuntimeError si ffmpeg falla o si se
+    detiene el proceso.
+    """
+    muestras_columna = max(1, round(TASA_OBJETIVO / (fps * width)))
+    tasa = fps * width * muestras_columna
+    por_frame = width * muestras_columna
+    margen = max(0, int(margen_horizontal))
+    ancho_total = width + margen * 2
+    r, g, b = color_ajustado(color, exposicion, contraste, saturacion, temperatura)
+    rgba = np.array([r, g, b, 255], dtype=np.uint8)
+
+    decoder_cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+    if inicio > 0:
+        decoder_cmd += ["-ss", f"{inicio:.3f}"]
+    decoder_cmd += ["-i", audio_path]
+    if duracion is not None:
+        decoder_cmd += ["-t", f"{duracion:.3f}"]
+    decoder_cmd += ["-vn", "-ac", "1", "-ar", str(tasa), "-f", "f32le", "-"]
+    encoder_cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgba",
+        "-s", f"{ancho_total}x{height}",
+        "-r", str(fps),
+        "-i", "-",
+        *args_video_onda(output_path),
+        "-an",
+        output_path,
+    ]
+    decoder = ffmpeg_runner.abrir(decoder_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    encoder = ffmpeg_runner.abrir(encoder_cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    detenido = False
+    try:
+        lote_bytes = FRAMES_POR_LOTE * por_frame * 4
+        while True:
+            if stop_control.should_stop():
+                detenido = True
+                break
+            datos = decoder.stdout.read(lote_bytes)
+            if not datos:
+                break
+            muestras = np.frombuffer(datos[: len(datos) // 4 * 4], dtype=np.float32)
+            n_frames = math.ceil(len(muestras) / por_frame)
+            if n_frames == 0:
+                break
+            # El ultimo frame se completa con silencio.
+            if len(muestras) < n_frames * por_frame:
+                muestras = np.pad(muestras, (0, n_frames * por_frame - len(muestras)))
+            columnas = muestras.reshape(n_frames, width, muestras_columna)
+            frames = rasterizar(columnas.min(axis=2), columnas.max(axis=2), height, rgba)
+            if margen:
+                frames = np.pad(frames, ((0, 0), (0, 0), (margen, margen), (0, 0)))
+            encoder.stdin.write(frames.tobytes())
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            encoder.stdin.close()
+        except OSError:
+            pass
+        ffmpeg_runner.cerrar(decoder, forzar=detenido)
+        ffmpeg_runner.cerrar(encoder, forzar=detenido)
+        decoder.stdout.close()
+        err_dec = decoder.stderr.read().decode("utf-8", "replace")
+        err_enc = encoder.stderr.read().decode("utf-8", "replace")
+        decoder.wait()
+        encoder.wait()
+    if detenido:
+        raise RuntimeError("Proceso detenido por el usuario.")
+    if decoder.returncode != 0 or encoder.returncode != 0:
+        raise RuntimeError((err_enc or err_dec).strip()[-300:] or "ffmpeg fallo al generar la onda.")
+    return output_path
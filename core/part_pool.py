@@ -0,0 +1,105 @@
+"""
+Pool de trabajos por parte para las etapas ffmpeg de procesar_video.
+
+Cada parte se procesa en un hilo del pool (ffmpeg corre en su propio proceso,
+así que el GIL no limita). El número de ffmpeg simultáneos se limita con
+ZEMPER_MAX_FFMPEG y a cada trabajo se le reserva una cuota de hilos de CPU
+que las funciones de core.utils pasan como `-threads`.
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core import stop_control
+
+MAX_FFMPEG_ENV = "ZEMPER_MAX_FFMPEG"
+
+_local = threading.local()
+
+
+def _cpu_count() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def max_ffmpeg_concurrentes(valor: int | None = None) -> int:
+    """
+    Límite de ffmpeg simultáneos: argumento, variable de entorno o
+    un valor por defecto de un encoder cada 4 núcleos.
+    """
+    if valor is None:
+        raw = os.getenv(MAX_FFMPEG_ENV, "").strip()
+        if raw:
+            try:
+                valor = int(raw)
+            except ValueError:
+                valor = None
+    if valor is None:
+        valor = _cpu_count() // 4
+    return max(1, int(valor))
+
+
+def hilos_por_trabajo(max_workers: int) -> int:
+    return max(1, _cpu_count() // max(1, int(max_workers)))
+
+
+def hilos_ffmpeg() -> int | None:
+    """
+    Hilos reservados para el trabajo del hilo actual (None fuera del pool).
+    """
+    return getattr(_local, "hilos", None)
+
+
+def args_hilos() -> list[str]:
+    hilos = hilos_ffmpeg()
+    if not hilos:
+        return []
+    return ["-threads", str(hilos)]
+
+
+def ejecutar_partes(fn, items: list, max_workers: int | None = None, log_fn=None) -> list:
+    """
+    Ejecuta fn(idx, item) para cada item en paralelo y devuelve los resultados
+    en el mismo orden que items. Las partes que no llegaron a empezar antes de
+    un stop quedan como None. Si alguna parte lanza una excepción, se relanza
+    la primera (en orden) cuando terminan las demás.
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = min(len(items), max_ffmpeg_concurrentes(max_workers))
+    hilos = hilos_por_trabajo(workers)
+
+    def _run(idx, item):
+        if stop_control.should_stop():
+            return None
+        _local.hilos = hilos if workers > 1 else None
+        try:
+            return fn(idx, item)
+        finally:
+            _local.hilos = None
+
+    if workers == 1:
+        return [_run(idx, item) for idx, item in enumerate(items)]
+
+    if log_fn:
+        log_fn(f"⚙️ Procesando {len(items)} partes en paralelo ({workers} a la vez, {hilos} hilos c/u)")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parte") as pool:
+        # Cada parte hereda el trabajo de stop_control del llamador.
+        futures = [
+            pool.submit(contextvars.copy_context().run, _run, idx, item)
+            for idx, item in enumerate(items)
+        ]
+        resultados = []
+        error = None
+        for fut in futures:
+            try:
+                resultados.append(fut.result())
+            except Exception as exc:
+                if error is None:
+                    error = exc
+                resultados.append(None)
+    if error is not None:
+        raise error
+    return resultados
@@ -0,0 +1,78 @@
+"""
+Audio PCM para transcripcion.
+
+El audio fuente se decodifica una sola vez a float32 mono 16 kHz (el formato
+que Whisper usa internamente) en un archivo crudo que se abre con np.memmap.
+Los tramos son descriptores {"pcm", "inicio", "fin", "nombre"} en muestras:
+se pasan entre procesos sin copiar audio y se convierten en vistas del
+memmap recien al transcribir, sin cortes MP3 intermedios.
+"""
+
+import os
+
+import numpy as np
+
+from core import ffmpeg_runner
+
+SAMPLE_RATE = 16000
+
+
+def decodificar_pcm(src_path: str, out_path: str, log_fn=None) -> str:
+    """
+    Decodifica el audio de src_path (audio o video) a float32 mono 16 kHz
+    crudo en out_path y devuelve la ruta.
+    """
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if log_fn:
+        log_fn("Decodificando audio a PCM 16 kHz...")
+    cmd = [
+        "ffmpeg", "-y",
+        "-nostdin",
+        "-i", src_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(SAMPLE_RATE),
+        "-f", "f32le",
+        out_path
+    ]
+    result = ffmpeg_runner.run(cmd)
+    if result.returncode != 0 or not os.path.exists(out_path) or os.path.getsize(out_path) == 0:
+        raise RuntimeError(f"No se pudo decodificar el audio: {(result.stderr or '')[-400:]}")
+    return out_path
+
+
+def abrir_pcm(pcm_path: str) -> np.ndarray:
+    # Copy-on-write: vista escribible (torch.from_numpy no avisa) sin copiar.
+    return np.memmap(pcm_path, dtype=np.float32, mode="c")
+
+
+def duracion_pcm(pcm_path: str) -> float:
+    return os.path.getsize(pcm_path) / (4 * SAMPLE_RATE)
+
+
+def tramo(pcm_path: str, inicio: float, duracion: float | None = None, nombre: str | None = None) -> dict:
+    """
+    Descriptor de un tramo en segundos [inicio, inicio + duracion).
+    """
+    total = os.path.getsize(pcm_path) // 4
+    a = min(total, max(0, int(round(inicio * SAMPLE_RATE))))
+    b = total if duracion is None else min(total, a + int(round(duracion * SAMPLE_RATE)))
+    return {
+        "pcm": os.path.abspath(pcm_path),
+        "inicio": a,
+        "fin": max(a, b),
+        "nombre": nombre or os.path.splitext(os.path.basename(pcm_path))[0],
+    }
+
+
+def es_tramo(audio) -> bool:
+    return isinstance(audio, dict) and "pcm" in audio
+
+
+def cargar_tramo(t: dict) -> np.ndarray:
+    """
+    Vista (sin copia) de las muestras del tramo.
+    """
+    return abrir_pcm(t["pcm"])[t["inicio"]:t["fin"]]
@@ -0,0 +1,241 @@
+"""
+Indice de picos de un audio para dibujar la onda sin decodificarlo.
+
+El audio se decodifica una vez y se resume en niveles de resolucion: el
+nivel 0 tiene TASA bins por segundo y cada nivel siguiente agrupa FACTOR
+bins del anterior. Cada bin guarda minimo, maximo y RMS en int16. Los
+niveles van concatenados en un .npy que se abre con mmap, y un .json al
+lado guarda los offsets y la huella del audio (tamano + mtime).
+
+Archivos: <nombre>.picos.<huella>.npy y <nombre>.picos.json en
+output/<base>/audios/, junto a los audios extraidos (tambien para indices
+calculados de un video). El .npy lleva la huella en el nombre: al
+reconstruir se escribe uno nuevo en vez de reemplazar el que puede seguir
+abierto en mmap (en Windows no se puede reemplazar un archivo mapeado).
+"""
+
+import json
+import os
+import subprocess
+import threading
+
+import numpy as np
+
+from core import ffmpeg_runner, stop_control
+from core.utils import asegurar_dir, output_base_dir
+
+TASA = 200
+FACTOR = 4
+MIN_BINS_NIVEL = 512
+TASA_DECODIFICACION = 16000
+ESCALA = 32767.0
+BLOQUE_SEG = 60
+
+_lock = threading.Lock()
+_abiertos: dict[str, tuple] = {}
+
+
+def _rutas(audio_path: str) -> tuple[str, str]:
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    carpeta = os.path.join(output_base_dir(audio_path), "audios")
+    return os.path.join(carpeta, f"{base}.picos"), os.path.join(carpeta, f"{base}.picos.json")
+
+
+def _npy_version(prefijo: str, huella: list | None) -> str:
+    etiqueta = "_".join(str(v) for v in huella) if huella else "sin_huella"
+    return f"{prefijo}.{etiqueta}.npy"
+
+
+def _borrar_viejos(prefijo: str, actual: str):
+    carpeta = os.path.dirname(prefijo)
+    nombre = os.path.basename(prefijo) + "."
+    try:
+        entradas = os.listdir(carpeta)
+    except OSError:
+        return
+    for entrada in entradas:
+        ruta = os.path.join(carpeta, entrada)
+        if entrada.startswith(nombre) and entrada.endswith(".npy") and ruta != actual:
+            try:
+                os.remove(ruta)
+            except OSError:
+                # Sigue mapeado en otro lado; se borra en la proxima reconstruccion.
+                pass
+
+
+def _huella(audio_path: str) -> list | None:
+    try:
+        st = os.stat(audio_path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _resumir(muestras: np.ndarray, por_bin: int) -> np.ndarray:
+    """
+    (n_bins, 3) float32 con minimo, maximo y RMS de cada bin de por_bin
+    muestras. El ultimo bin incompleto se completa con silencio.
+    """
+    n = -(-len(muestras) // por_bin)
+    if len(muestras) < n * por_bin:
+        muestras = np.pad(muestras, (0, n * por_bin - len(muestras)))
+    bins = muestras.reshape(n, por_bin)
+    return np.stack(
+        [bins.min(axis=1), bins.max(axis=1), np.sqrt(np.mean(np.square(bins), axis=1))],
+        axis=1,
+    )
+
+
+def _nivel_siguiente(nivel: np.ndarray) -> np.ndarray:
+    n = -(-len(nivel) // FACTOR)
+    relleno = n * FACTOR - len(nivel)
+    if relleno:
+        nivel = np.concatenate([nivel, np.zeros((relleno, 3), dtype=nivel.dtype)])
+    grupos = nivel.reshape(n, FACTOR, 3)
+    return np.stack(
+        [
+            grupos[:, :, 0].min(axis=1),
+            grupos[:, :, 1].max(axis=1),
+            np.sqrt(np.mean(np.square(grupos[:, :, 2]), axis=1)),
+        ],
+        axis=1,
+    )
+
+
+def construir(audio_path: str, log_fn=None) -> dict:
+    """
+    Decodifica audio_path por bloques, arma los niveles y los guarda junto
+    al audio. Devuelve el indice abierto (ver cargar).
+    """
+    prefijo, meta_path = _rutas(audio_path)
+    if log_fn:
+        log_fn(f"Calculando picos de {os.path.basename(audio_path)}...")
+    por_bin = TASA_DECODIFICACION // TASA
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", audio_path,
+        "-vn", "-ac", "1", "-ar", str(TASA_DECODIFICACION),
+        "-f", "f32le", "-",
+    ]
+    proc = ffmpeg_runner.abrir(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    partes = []
+    try:
+        bloque_bytes = BLOQUE_SEG * TASA_DECODIFICACION * 4
+        while True:
+            if stop_control.should_stop():
+                ffmpeg_runner.terminar(proc)
+                raise RuntimeError("Proceso detenido por el usuario.")
+            datos = proc.stdout.read(bloque_bytes)
+            if not datos:
+                break
+            partes.append(_resumir(np.frombuffer(datos[: len(datos) // 4 * 4], dtype=np.float32), por_bin))
+    finally:
+        proc.stdout.close()
+        err = proc.stderr.read().decode("utf-8", "replace")
+        proc.wait()
+        ffmpeg_runner.cerrar(proc)
+    if proc.returncode != 0 or not partes:
+        raise RuntimeError(f"No se pudieron calcular los picos: {err.strip()[-300:]}")
+
+    niveles = [np.concatenate(partes)]
+    while len(niveles[-1]) > MIN_BINS_NIVEL:
+        niveles.append(_nivel_siguiente(niveles[-1]))
+    offsets = []
+    pos = 0
+    for nivel in niveles:
+        offsets.append([pos, len(nivel)])
+        pos += len(nivel)
+    datos = np.clip(np.round(np.concatenate(niveles) * ESCALA), -ESCALA, ESCALA).astype(np.int16)
+
+    with _lock:
+        _abiertos.pop(prefijo, None)
+    huella = _huella(audio_path)
+    npy_path = _npy_version(prefijo, huella)
+    asegurar_dir(os.path.dirname(npy_path))
+    tmp = f"{npy_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, datos)
+    os.replace(tmp, npy_path)
+    meta = {
+        "tasa": TASA,
+        "factor": FACTOR,
+        "niveles": offsets,
+        "duracion": len(niveles[0]) / TASA,
+        "huella": huella,
+        "archivo": os.path.basename(npy_path),
+    }
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, meta_path)
+    _borrar_viejos(prefijo, npy_path)
+    return cargar(audio_path)
+
+
+def cargar(audio_path: str) -> dict | None:
+    """
+    Indice guardado de audio_path, o None si no existe o el audio cambio.
+    {"tasa", "factor", "duracion", "niveles": [array (n, 3) int16 en mmap]}.
+    """
+    prefijo, meta_path = _rutas(audio_path)
+    huella = _huella(audio_path)
+    with _lock:
+        abierto = _abiertos.get(prefijo)
+        if abierto and abierto[0] == huella:
+            return abierto[1]
+    try:
+        with open(meta_path, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("huella") != huella or not meta.get("archivo"):
+            return None
+        datos = np.load(os.path.join(os.path.dirname(meta_path), meta["archivo"]), mmap_mode="r")
+    except Exception:
+        return None
+    indice = {
+        "tasa": meta["tasa"],
+        "factor": meta["factor"],
+        "duracion": meta["duracion"],
+        "niveles": [datos[a:a + n] for a, n in meta["niveles"]],
+    }
+    with _lock:
+        _abiertos[prefijo] = (huella, indice)
+    return indice
+
+
+def obtener(audio_path: str, log_fn=None) -> dict:
+    """
+    Indice de audio_path; se construye la primera vez.
+    """
+    return cargar(audio_path) or construir(audio_path, log_fn=log_fn)
+
+
+def ventana(indice: dict, inicio: float, fin: float, columnas: int) -> np.ndarray:
+    """
+    (columnas, 3) float32 en [-1, 1] con minimo, maximo y RMS de cada
+    columna de [inicio, fin). Usa el nivel mas grueso que todavia tiene al
+    menos un bin por columna, asi cualquier zoom lee pocos datos.
+    """
+    columnas = max(1, int(columnas))
+    fin = max(inicio, fin)
+    bins_por_seg = float(indice["tasa"])
+    nivel = indice["niveles"][0]
+    for candidato in indice["niveles"][1:]:
+        tasa_candidato = bins_por_seg / indice["factor"]
+        if (fin - inicio) * tasa_candidato < columnas:
+            break
+        bins_por_seg = tasa_candidato
+        nivel = candidato
+    a = min(len(nivel), max(0, int(inicio * bins_por_seg)))
+    b = min(len(nivel), max(a + 1, int(np.ceil(fin * bins_por_seg))))
+    tramo = np.asarray(nivel[a:b], dtype=np.float32) / ESCALA
+    if len(tramo) == 0:
+        return np.zeros((columnas, 3), dtype=np.float32)
+    bordes = np.minimum((np.arange(columnas) * len(tramo)) // columnas, len(tramo) - 1)
+    cuenta = np.maximum(np.diff(np.append(bordes, len(tramo))), 1)
+    return np.stack(
+        [
+            np.minimum.reduceat(tramo[:, 0], bordes),
+            np.maximum.reduceat(tramo[:, 1], bordes),
+            np.sqrt(np.add.reduceat(np.square(tramo[:, 2]), bordes) / cuenta),
+        ],
+        axis=1,
+    )
@@ -0,0 +1,134 @@
+"""
+Pipeline por etapas para publicar partes a medida que se renderizan.
+
+Cada etapa (transcribir, metadatos con IA, subir, ...) tiene sus propios
+hilos y una cola acotada de entrada: la parte 1 puede estar subiendo mientras
+la 2 se transcribe y la 3 se codifica. Si una etapa se atrasa, su cola se
+llena y la anterior espera en vez de acumular trabajo. stop_control corta
+todas las etapas; cada parte reporta su estado por log.
+"""
+
+import contextvars
+import os
+import queue
+import threading
+
+from core import stop_control
+
+_FIN = object()
+
+
+class Pipeline:
+    """
+    etapas: [(nombre, fn, concurrencia)]. fn recibe lo que devolvio la etapa
+    anterior (la primera recibe el item enviado) y devuelve lo que sigue.
+    Uso: enviar() por cada item a medida que existen, cerrar() y esperar().
+    """
+
+    def __init__(self, etapas: list[tuple], capacidad: int = 2, log_fn=None):
+        self.etapas = [(nombre, fn, max(1, int(n))) for nombre, fn, n in etapas]
+        self.log_fn = log_fn
+        self._colas = [queue.Queue(maxsize=max(1, capacidad)) for _ in self.etapas]
+        self._lock = threading.Lock()
+        self._trabajos = []
+        self._hilos = []
+        self._vivos = [n for _, _, n in self.etapas]
+        self._cerrado = False
+        for pos, (nombre, _fn, n) in enumerate(self.etapas):
+            for k in range(n):
+                hilo = threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(self._trabajar, pos),
+                    name=f"pipeline-{nombre}-{k + 1}",
+                    daemon=True,
+                )
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def _log(self, mensaje: str):
+        if self.log_fn:
+            self.log_fn(mensaje)
+
+    def _poner(self, pos: int, elemento) -> bool:
+        # put con espera acotada: un stop no debe quedar bloqueado en una cola llena.
+        while True:
+            try:
+                self._colas[pos].put(elemento, timeout=0.25)
+                return True
+            except queue.Full:
+                if stop_control.should_stop() and elemento is not _FIN:
+                    return False
+
+    def enviar(self, item, nombre: str | None = None):
+        """
+        Agrega un item a la primera etapa. Bloquea si esa cola esta llena.
+        """
+        with self._lock:
+            trabajo = {
+                "idx": len(self._trabajos) + 1,
+                "nombre": nombre or (os.path.basename(item) if isinstance(item, str) else str(item)),
+                "item": item,
+                "estado": "en cola",
+                "etapa": self.etapas[0][0],
+                "resultado": None,
+                "error": None,
+            }
+            self._trabajos.append(trabajo)
+        if not self._poner(0, (trabajo, item)):
+            trabajo["estado"] = "cancelado"
+
+    def _trabajar(self, pos: int):
+        nombre_etapa, fn, _n = self.etapas[pos]
+        ultima = pos == len(self.etapas) - 1
+        while True:
+            elemento = self._colas[pos].get()
+            if elemento is _FIN:
+                break
+            trabajo, valor = elemento
+            if stop_control.should_stop():
+                trabajo["estado"] = "cancelado"
+                continue
+            trabajo["etapa"] = nombre_etapa
+            trabajo["estado"] = "en curso"
+            self._log(f"▶ [{trabajo['idx']}] {trabajo['nombre']}: {nombre_etapa}...")
+            try:
+                valor = fn(valor)
+            except Exception as exc:
+                trabajo["estado"] = "error"
+                trabajo["error"] = exc
+                self._log(f"❌ [{trabajo['idx']}] {trabajo['nombre']}: {nombre_etapa} fallo ({exc})")
+                continue
+            if ultima:
+                trabajo["estado"] = "listo"
+                trabajo["resultado"] = valor
+                self._log(f"✔ [{trabajo['idx']}] {trabajo['nombre']}: listo")
+            elif not self._poner(pos + 1, (trabajo, valor)):
+                trabajo["estado"] = "cancelado"
+        with self._lock:
+            self._vivos[pos] -= 1
+            cerrar_siguiente = self._vivos[pos] == 0 and not ultima
+        if cerrar_siguiente:
+            for _ in range(self.etapas[pos + 1][2]):
+                self._poner(pos + 1, _FIN)
+
+    def cerrar(self):
+        """
+        No hay mas items: cada etapa termina al vaciar su cola.
+        """
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+        for _ in range(self.etapas[0][2]):
+            self._poner(0, _FIN)
+
+    def esperar(self) -> list[dict]:
+        """
+        Cierra y espera a que terminen todas las etapas. Devuelve un dict por
+        item: idx, nombre, item, estado (listo/error/cancelado), etapa
+        (la ultima que alcanzo), resultado y error.
+        """
+        self.cerrar()
+        for hilo in self._hilos:
+            hilo.join()
+        return list(self._trabajos)
@@ -0,0 +1,209 @@
+"""
+Cache de ffprobe por archivo.
+
+Un solo ffprobe (formato + streams en JSON) por archivo; el resultado se
+memoriza en proceso y en disco, indexado por (ruta, tamano, mtime), con
+expulsion LRU en ambos niveles. El indice de keyframes se guarda igual.
+"""
+
+import atexit
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.path.join("output", ".cache", "ffprobe.json")
+MAX_MEMORIA = 256
+MAX_DISCO = 512
+# Las altas se juntan y se escriben a disco como mucho una vez por este lapso.
+GUARDAR_CADA = 2.0
+
+_lock = threading.Lock()
+_memoria: "OrderedDict[tuple, dict]" = OrderedDict()
+_disco: dict | None = None
+_guardado: threading.Timer | None = None
+
+
+def _clave(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _clave_disco(clave: tuple) -> str:
+    return f"{clave[0]}|{clave[1]}|{clave[2]}"
+
+
+def _cargar_disco() -> dict:
+    global _disco
+    if _disco is None:
+        try:
+            with open(CACHE_PATH, "r", encoding="utf-8") as fh:
+                _disco = json.load(fh)
+            if not isinstance(_disco, dict):
+                _disco = {}
+        except Exception:
+            _disco = {}
+    return _disco
+
+
+def _guardar_disco():
+    """
+    Escribe el cache a disco (fuera de _lock: se serializa una copia).
+    """
+    global _guardado
+    with _lock:
+        _guardado = None
+        if _disco is None:
+            return
+        if len(_disco) > MAX_DISCO:
+            orden = sorted(_disco.items(), key=lambda kv: kv[1].get("usado", 0))
+            for key, _ in orden[: len(_disco) - MAX_DISCO]:
+                _disco.pop(key, None)
+        copia = dict(_disco)
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp = f"{CACHE_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(copia, fh)
+        os.replace(tmp, CACHE_PATH)
+    except Exception:
+        pass
+
+
+def _programar_guardado():
+    # Llamar con _lock tomado.
+    global _guardado
+    if _guardado is None:
+        _guardado = threading.Timer(GUARDAR_CADA, _guardar_disco)
+        _guardado.daemon = True
+        _guardado.start()
+
+
+def _volcar_pendiente():
+    with _lock:
+        timer = _guardado
+    if timer is not None:
+        timer.cancel()
+        _guardar_disco()
+
+
+atexit.register(_volcar_pendiente)
+
+
+def _ejecutar_ffprobe(path: str) -> dict:
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json",
+        path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        data = json.loads(result.stdout or "{}")
+    except Exception:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    data.setdefault("format", {})
+    data.setdefault("streams", [])
+    return data
+
+
+def _cacheado(path: str, tipo: str, calcular, valido):
+    """
+    Memoriza calcular(path) por (tipo, ruta, tamano, mtime) en memoria y en
+    disco. Los resultados que no pasan valido() no se guardan.
+    """
+    clave = _clave(path)
+    if clave is None:
+        return calcular(path)
+    clave_mem = (tipo,) + clave
+    clave_disco = _clave_disco(clave) if tipo == "probe" else f"{tipo}|{_clave_disco(clave)}"
+
+    with _lock:
+        data = _memoria.get(clave_mem)
+        if data is not None:
+            _memoria.move_to_end(clave_mem)
+            return data
+        disco = _cargar_disco()
+        entry = disco.get(clave_disco)
+        if entry and entry.get("data") is not None:
+            entry["usado"] = time.time()
+            data = entry["data"]
+            _memoria[clave_mem] = data
+            while len(_memoria) > MAX_MEMORIA:
+                _memoria.popitem(last=False)
+            return data
+
+    data = calcular(path)
+    if not valido(data):
+        # No cachear fallos (archivo a medio escribir, ruta invalida, etc.)
+        return data
+
+    with _lock:
+        _memoria[clave_mem] = data
+        while len(_memoria) > MAX_MEMORIA:
+            _memoria.popitem(last=False)
+        disco = _cargar_disco()
+        disco[clave_disco] = {"usado": time.time(), "data": data}
+        _programar_guardado()
+    return data
+
+
+def probe(path: str) -> dict:
+    """
+    Devuelve {"format": {...}, "streams": [...]} de ffprobe para path.
+    """
+    return _cacheado(
+        path,
+        "probe",
+        _ejecutar_ffprobe,
+        lambda data: bool(data["format"] or data["streams"]),
+    )
+
+
+def _ejecutar_keyframes(path: str) -> list[float]:
+    # Solo lee paquetes (flags K = keyframe), no decodifica.
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    # Relativos al inicio del archivo, que es lo que espera -ss.
+    try:
+        origen = float(probe(path).get("format", {}).get("start_time") or 0.0)
+    except (TypeError, ValueError):
+        origen = 0.0
+    tiempos = []
+    for line in (result.stdout or "").splitlines():
+        pts, _, flags = line.strip().partition(",")
+        if "K" not in flags:
+            continue
+        try:
+            tiempos.append(round(max(0.0, float(pts) - origen), 6))
+        except ValueError:
+            continue
+    return sorted(set(tiempos))
+
+
+def keyframes(path: str) -> list[float]:
+    """
+    Tiempos (s) de los keyframes del primer stream de video.
+    """
+    return _cacheado(path, "kf", _ejecutar_keyframes, bool)
+
+
+def primer_stream(path: str, tipo: str) -> dict | None:
+    for stream in probe(path).get("streams", []):
+        if stream.get("codec_type") == tipo:
+            return stream
+    return None
+
@@ -0,0 +1,211 @@
+"""
+Proxies livianos para la vista previa de fuentes largas.
+
+Por cada fuente se genera en segundo plano, una sola vez:
+- un proxy de baja resolucion todo-intra (cada frame es keyframe), para que
+  la vista previa busque y decodifique rapido sin tocar el original;
+- una tira de miniaturas (sprite): un frame cada SPRITE_INTERVALO segundos
+  en una grilla JPEG, para el hover y el arrastre de la linea de tiempo.
+
+Se guardan en output/<base>/proxy/ y valen mientras la fuente no cambie
+(tamano + mtime). El render final siempre usa el original.
+"""
+
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from core import ffmpeg_runner
+from core.utils import (
+    asegurar_dir,
+    nombre_base_principal,
+    obtener_duracion_segundos,
+    obtener_tamano_video,
+    output_subdir,
+)
+
+PROXY_ALTO = 360
+SPRITE_INTERVALO = 5.0
+SPRITE_ANCHO = 160
+SPRITE_COLUMNAS = 10
+
+_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="proxy")
+_pendientes: dict[str, object] = {}
+_sprites: dict[str, tuple] = {}
+
+
+def _rutas(path: str) -> dict:
+    carpeta = output_subdir(path, "proxy")
+    base = nombre_base_principal(path)
+    return {
+        "carpeta": carpeta,
+        "proxy": os.path.join(carpeta, f"{base}_proxy.mp4"),
+        "sprite": os.path.join(carpeta, f"{base}_sprite.jpg"),
+        "meta": os.path.join(carpeta, f"{base}_proxy.json"),
+    }
+
+
+def _huella(path: str) -> list | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def _leer_meta(path: str) -> dict | None:
+    rutas = _rutas(path)
+    try:
+        with open(rutas["meta"], "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except Exception:
+        return None
+    if meta.get("huella") != _huella(path):
+        return None
+    return meta
+
+
+def _ffmpeg(cmd: list[str], destino: str):
+    tmp = f"{os.path.splitext(destino)[0]}.tmp{os.path.splitext(destino)[1]}"
+    result = ffmpeg_runner.run(cmd + [tmp])
+    if result.returncode != 0 or not os.path.exists(tmp):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise RuntimeError((result.stderr or "").strip()[-300:] or "ffmpeg fallo.")
+    os.replace(tmp, destino)
+
+
+def _generar(path: str, log_fn=None) -> dict:
+    meta = _leer_meta(path)
+    if meta:
+        return meta
+    rutas = _rutas(path)
+    asegurar_dir(rutas["carpeta"])
+    if log_fn:
+        log_fn(f"Generando proxy de vista previa para {os.path.basename(path)}...")
+
+    _ffmpeg(
+        [
+            "ffmpeg", "-y", "-nostdin",
+            "-i", path,
+            "-an", "-sn",
+            "-vf", f"scale=-2:{PROXY_ALTO}",
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-crf", "28",
+            "-g", "1",
+            "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+        ],
+        rutas["proxy"],
+    )
+
+    duracion = max(0.1, obtener_duracion_segundos(path))
+    src_w, src_h = obtener_tamano_video(path)
+    alto = max(2, int(round(SPRITE_ANCHO * src_h / max(1, src_w))) // 2 * 2)
+    cantidad = max(1, math.ceil(duracion / SPRITE_INTERVALO))
+    columnas = min(SPRITE_COLUMNAS, cantidad)
+    filas = math.ceil(cantidad / columnas)
+    # Desde el proxy: decodificar 360p todo-intra es mucho mas barato que el original.
+    _ffmpeg(
+        [
+            "ffmpeg", "-y", "-nostdin",
+            "-i", rutas["proxy"],
+            "-an",
+            "-vf", f"fps=1/{SPRITE_INTERVALO},scale={SPRITE_ANCHO}:{alto},tile={columnas}x{filas}",
+            "-frames:v", "1",
+            "-q:v", "4",
+        ],
+        rutas["sprite"],
+    )
+
+    meta = {
+        "huella": _huella(path),
+        "proxy": rutas["proxy"],
+        "sprite": rutas["sprite"],
+        "intervalo": SPRITE_INTERVALO,
+        "ancho": SPRITE_ANCHO,
+        "alto": alto,
+        "columnas": columnas,
+        "cantidad": cantidad,
+    }
+    with open(rutas["meta"], "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    if log_fn:
+        log_fn(f"Proxy listo: {rutas['proxy']}")
+    return meta
+
+
+def solicitar(path: str, al_terminar=None, log_fn=None):
+    """
+    Genera proxy y sprite de path en segundo plano (una fuente a la vez,
+    compartido por todas las pestanas). al_terminar(meta) se llama desde el
+    hilo del pool cuando estan listos; meta es None si fallo.
+    """
+    clave = os.path.abspath(path)
+
+    def _tarea():
+        try:
+            meta = _generar(path, log_fn=log_fn)
+        except Exception as exc:
+            if log_fn:
+                log_fn(f"No se pudo generar el proxy: {exc}")
+            meta = None
+        finally:
+            with _lock:
+                _pendientes.pop(clave, None)
+        if al_terminar:
+            al_terminar(meta)
+
+    with _lock:
+        futuro = _pendientes.get(clave)
+        if futuro is None:
+            _pendientes[clave] = _pool.submit(_tarea)
+            return
+    # Ya en curso: solo se agrega el aviso.
+    if al_terminar:
+        futuro.add_done_callback(lambda _f: al_terminar(_leer_meta(path)))
+
+
+def proxy_para(path: str) -> str | None:
+    """
+    Ruta del proxy de path si ya esta generado y vigente.
+    """
+    meta = _leer_meta(path)
+    if meta and os.path.exists(meta["proxy"]):
+        return meta["proxy"]
+    return None
+
+
+def miniatura(path: str, t: float):
+    """
+    Miniatura (PIL Image) del sprite de path para el segundo t, o None si el
+    sprite todavia no existe. El sprite se abre una vez y queda en memoria.
+    """
+    clave = os.path.abspath(path)
+    with _lock:
+        cacheado = _sprites.get(clave)
+    if cacheado is None or cacheado[0] != _huella(path):
+        meta = _leer_meta(path)
+        if not meta or not os.path.exists(meta["sprite"]):
+            return None
+        try:
+            imagen = Image.open(meta["sprite"])
+            imagen.load()
+        except Exception:
+            return None
+        cacheado = (meta["huella"], meta, imagen)
+        with _lock:
+            _sprites[clave] = cacheado
+    _huella_sprite, meta, imagen = cacheado
+    idx = min(meta["cantidad"] - 1, max(0, int(t // meta["intervalo"])))
+    x = (idx % meta["columnas"]) * meta["ancho"]
+    y = (idx // meta["columnas"]) * meta["alto"]
+    return imagen.crop((x, y, x + meta["ancho"], y + meta["alto"]))
@@ -1,9 +1,25 @@
-import subprocess
+"""
+Stop global y por trabajo.
+
+request_stop() sin trabajo detiene todo lo que corre en la app; con
+trabajo=id detiene solo ese trabajo. En ambos casos se terminan unicamente
+los procesos que lanzo la app (registrados por core.ffmpeg_runner), nunca
+procesos ajenos con el mismo nombre.
+"""
+
+import contextvars
 import threading
+import uuid
+from contextlib import contextmanager
 
 _stop_event = threading.Event()
 _busy_event = threading.Event()
 
+_lock = threading.Lock()
+_trabajo_actual: contextvars.ContextVar[str | None] = contextvars.ContextVar("trabajo", default=None)
+_stops_trabajo: dict[str, threading.Event] = {}
+_procesos: dict[str | None, set] = {}
+
 
 def clear_stop():
     _stop_event.clear()
@@ -20,29 +36,73 @@ def is_busy() -> bool:
     return _busy_event.is_set()
 
 
+def trabajo_actual() -> str | None:
+    return _trabajo_actual.get()
+
+
+@contextmanager
+def trabajo(nombre: str | None = None):
+    """
+    Marca el codigo (y los procesos que lance) como parte de un trabajo
+    propio: request_stop(trabajo=id) lo detiene sin tocar a los demas.
+    Los hilos nuevos heredan el trabajo si se lanzan con
+    contextvars.copy_context() (core.part_pool lo hace).
+    """
+    trabajo_id = f"{nombre or 'trabajo'}-{uuid.uuid4().hex[:8]}"
+    with _lock:
+        _stops_trabajo[trabajo_id] = threading.Event()
+    token = _trabajo_actual.set(trabajo_id)
+    try:
+        yield trabajo_id
+    finally:
+        _trabajo_actual.reset(token)
+        with _lock:
+            _stops_trabajo.pop(trabajo_id, None)
+            _procesos.pop(trabajo_id, None)
+
+
 def should_stop() -> bool:
-    return _stop_event.is_set()
+    if _stop_event.is_set():
+        return True
+    trabajo_id = _trabajo_actual.get()
+    if trabajo_id is None:
+        return False
+    evento = _stops_trabajo.get(trabajo_id)
+    return evento is not None and evento.is_set()
 
 
-def request_stop(log_fn=None, clear_busy: bool = True):
-    _stop_event.set()
-    if clear_busy:
+def registrar_proceso(proc):
+    with _lock:
+        _procesos.setdefault(_trabajo_actual.get(), set()).add(proc)
+
+
+def quitar_proceso(proc):
+    with _lock:
+        for procs in _procesos.values():
+            procs.discard(proc)
+
+
+def request_stop(log_fn=None, clear_busy: bool = True, trabajo: str | None = None):
+    """
+    Sin trabajo: stop global. Con trabajo: solo ese trabajo y sus procesos.
+    """
+    from core import ffmpeg_runner
+
+    with _lock:
+        if trabajo is None:
+            _stop_event.set()
+            procs = [p for grupo in _procesos.values() for p in grupo]
+        else:
+            evento = _stops_trabajo.get(trabajo)
+            if evento is not None:
+                evento.set()
+            procs = list(_procesos.get(trabajo, ()))
+    if clear_busy and trabajo is None:
         _busy_event.clear()
     if log_fn:
         log_fn("Stop solicitado. Deteniendo procesos...")
-    _kill_process("ffmpeg.exe", log_fn)
-    _kill_process("ffprobe.exe", log_fn)
-    _kill_process("yt-dlp.exe", log_fn)
-
-
-def _kill_process(name: str, log_fn=None):
-    try:
-        subprocess.run(
-            ["taskkill", "/F", "/IM", name],
-            capture_output=True,
-            text=True
-        )
-        if log_fn:
-            log_fn(f"Finalizando {name}...")
-    except Exception:
-        pass
+    if procs and log_fn:
+        log_fn(f"Finalizando {len(procs)} proceso(s)...")
+    for proc in procs:
+        # En hilos aparte: cada terminar() puede esperar unos segundos.
+        threading.Thread(target=ffmpeg_runner.terminar, args=(proc,), daemon=True).start()
@@ -11,6 +11,7 @@ from http.server import BaseHTTPRequestHandler, HTTPServer
 
 import requests
 
+from core import chunk_source, http_client
 from core.api_endpoints import get_all_endpoint_urls
 
 AUTH_URL, TOKEN_URL = get_all_endpoint_urls("TikTok OAuth")
@@ -80,7 +81,7 @@ def token_is_valid(tokens: dict, skew_sec: int = 60) -> bool:
 
 
 def _request_json(method: str, url: str, **kwargs) -> dict:
-    resp = requests.request(method, url, timeout=30, **kwargs)
+    resp = http_client.request(method, url, timeout=30, **kwargs)
     try:
         data = resp.json()
     except Exception:
@@ -300,21 +301,40 @@ def upload_video(upload_url: str, video_path: str, log_fn=None) -> None:
     chunk_size, total = _compute_chunks(size)
     content_type = "video/mp4"
     start = 0
-    part = 1
-    with open(video_path, "rb") as f:
+    fallos = 0
+    with chunk_source.FuenteChunks(video_path) as fuente:
         while start < size:
+            part = min(total, start // chunk_size + 1)
             end = min(size - 1, start + chunk_size - 1)
-            f.seek(start)
-            chunk = f.read(end - start + 1)
             headers = {
                 "Content-Type": content_type,
-                "Content-Length": str(len(chunk)),
+                "Content-Length": str(end - start + 1),
                 "Content-Range": f"bytes {start}-{end}/{size}",
             }
-            resp = requests.put(upload_url, data=chunk, headers=headers, timeout=120)
-            if resp.status_code >= 400:
+            try:
+                resp = http_client.put(
+                    upload_url,
+                    data=fuente.cuerpo(start, end - start + 1),
+                    headers=headers,
+                    timeout=120,
+                )
+                motivo = f"HTTP {resp.status_code}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                resp = None
+                motivo = type(exc).__name__
+            if resp is not None and resp.status_code < 400:
+                if log_fn:
+                    log_fn(f"Chunk {part}/{total} subido.")
+                siguiente = chunk_source.offset_servidor(resp)
+                start = siguiente if siguiente is not None and siguiente > start else end + 1
+                fallos = 0
+                continue
+            if resp is not None and resp.status_code < 500 and resp.status_code != 429:
                 raise RuntimeError(f"Error subiendo chunk {part}/{total}: {resp.status_code} {resp.text[:200]}")
+            if fallos >= chunk_source.MAX_REINTENTOS:
+                raise RuntimeError(f"Error subiendo chunk {part}/{total}: {motivo} tras {fallos} reintentos.")
+            espera = chunk_source.espera_backoff(fallos)
+            fallos += 1
             if log_fn:
-                log_fn(f"Chunk {part}/{total} subido.")
-            start = end + 1
-            part += 1
+                log_fn(f"Chunk {part}/{total} interrumpido ({motivo}). Reintento {fallos} en {espera:.1f}s...")
+            time.sleep(espera)
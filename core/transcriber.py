@@ -1,29 +1,25 @@
+import math
 import os
 import threading
-import whisper
 
-# Carga perezosa de modelos
+from core import pcm, stop_control, transcriber_worker
+
+PROCESOS_ENV = "ZEMPER_WHISPER_PROCESOS"
+SOLAPE_TRAMO = 2.0
+
+# Carga perezosa de modelos (solo cuando el worker esta deshabilitado)
 _models = {}
 _lock = threading.Lock()
 
 def _get_model(model_size: str = "small"):
+    import whisper
+
     with _lock:
         if model_size not in _models:
             _models[model_size] = whisper.load_model(model_size)
         return _models[model_size]
 
-def transcribir(
-    audio_path: str,
-    idioma: str = "es",
-    model_size: str = "small",
-    temperature: float | None = None,
-    beam_size: int | None = None
-) -> str:
-    """
-    Transcribe un archivo de audio a texto en un idioma dado.
-    Forzado a FP32 en CPU.
-    """
-    model = _get_model(model_size)
+def _kwargs_transcripcion(idioma, temperature, beam_size) -> dict:
     kwargs = {"fp16": False}
     if idioma:
         kwargs["language"] = idioma
@@ -31,31 +27,255 @@ def transcribir(
         kwargs["temperature"] = float(temperature)
     if beam_size is not None:
         kwargs["beam_size"] = int(beam_size)
-    result = model.transcribe(audio_path, **kwargs)
+    return kwargs
+
+def _audio_local(audio):
+    """
+    (entrada para model.transcribe, nombre base) de una ruta o un tramo PCM.
+    """
+    if pcm.es_tramo(audio):
+        return pcm.cargar_tramo(audio), audio["nombre"]
+    return audio, os.path.splitext(os.path.basename(audio))[0]
+
+def _transcribir_en_worker(audio, model_size: str, kwargs: dict, srt_dir=None, on_progress=None) -> dict:
+    worker = transcriber_worker.get_worker()
+    job_id, future = worker.submit(
+        audio,
+        model_size=model_size,
+        srt_dir=srt_dir,
+        on_progress=on_progress,
+        **kwargs,
+    )
+    return worker.wait(job_id, future)
+
+def transcribir_resultado(
+    audio_path,
+    idioma: str = "es",
+    model_size: str = "small",
+    temperature: float | None = None,
+    beam_size: int | None = None,
+    srt_dir: str | None = None,
+    palabras: bool = False,
+    on_progress=None,
+) -> dict:
+    """
+    Resultado completo de model.transcribe ("text", "segments", ...) para un
+    audio o un tramo de core.pcm. Con srt_dir tambien escribe el SRT (ruta en
+    "srt"). palabras=True agrega tiempos por palabra a los segmentos.
+    """
+    kwargs = _kwargs_transcripcion(idioma, temperature, beam_size)
+    if palabras:
+        kwargs["word_timestamps"] = True
+    if srt_dir:
+        os.makedirs(srt_dir, exist_ok=True)
+    if transcriber_worker.worker_habilitado():
+        respuesta = _transcribir_en_worker(audio_path, model_size, kwargs, srt_dir=srt_dir, on_progress=on_progress)
+        return dict(respuesta["resultado"], srt=respuesta["srt"])
+    audio, base = _audio_local(audio_path)
+    model = _get_model(model_size)
+    result = model.transcribe(audio, **kwargs)
+    if srt_dir:
+        import whisper
+
+        writer = whisper.utils.get_writer("srt", srt_dir)
+        writer(result, f"{base}.wav")
+        result["srt"] = os.path.join(srt_dir, f"{base}.srt")
+    return result
+
+def transcribir(
+    audio_path,
+    idioma: str = "es",
+    model_size: str = "small",
+    temperature: float | None = None,
+    beam_size: int | None = None,
+    on_progress=None,
+) -> str:
+    """
+    Transcribe un archivo de audio (o un tramo de core.pcm) a texto en un
+    idioma dado. Forzado a FP32 en CPU.
+    """
+    result = transcribir_resultado(audio_path, idioma, model_size, temperature, beam_size, on_progress=on_progress)
     return result.get("text", "").strip()
 
 def transcribir_srt(
-    audio_path: str,
+    audio_path,
     out_dir: str,
     idioma: str = "es",
     model_size: str = "base",
     temperature: float | None = None,
-    beam_size: int | None = None
+    beam_size: int | None = None,
+    on_progress=None,
 ) -> str:
     """
-    Genera un archivo .srt para un audio y devuelve la ruta.
+    Genera un archivo .srt para un audio (o un tramo de core.pcm, que usa su
+    "nombre") y devuelve la ruta.
     """
-    os.makedirs(out_dir, exist_ok=True)
-    model = _get_model(model_size)
-    kwargs = {"fp16": False}
-    if idioma:
-        kwargs["language"] = idioma
-    if temperature is not None:
-        kwargs["temperature"] = float(temperature)
-    if beam_size is not None:
-        kwargs["beam_size"] = int(beam_size)
-    result = model.transcribe(audio_path, **kwargs)
-    writer = whisper.utils.get_writer("srt", out_dir)
-    writer(result, audio_path)
-    base = os.path.splitext(os.path.basename(audio_path))[0]
-    return os.path.join(out_dir, f"{base}.srt")
+    return transcribir_resultado(
+        audio_path,
+        idioma,
+        model_size,
+        temperature,
+        beam_size,
+        srt_dir=out_dir,
+        on_progress=on_progress,
+    )["srt"]
+
+def procesos_transcripcion(valor: int | None = None) -> int:
+    """
+    Procesos de Whisper simultaneos para transcribir por tramos: argumento,
+    variable de entorno o uno cada 4 nucleos (maximo 4).
+    """
+    if valor is None:
+        raw = os.getenv(PROCESOS_ENV, "").strip()
+        if raw:
+            try:
+                valor = int(raw)
+            except ValueError:
+                valor = None
+    if valor is None:
+        valor = min(4, (os.cpu_count() or 1) // 4)
+    return max(1, int(valor))
+
+def largo_tramo(
+    duracion: float,
+    procesos: int,
+    largo_objetivo: float = 600.0,
+    largo_minimo: float = 60.0,
+) -> float:
+    """
+    Largo de tramo ~largo_objetivo, ajustado para que la cantidad de tramos
+    sea multiplo de procesos y todos terminen a la vez.
+    """
+    n = max(procesos, math.ceil(duracion / largo_objetivo))
+    n = procesos * math.ceil(n / procesos)
+    n = max(1, min(n, int(duracion // largo_minimo) or 1))
+    return duracion / n
+
+def tramos_por_pausas(regiones: list[tuple[float, float]]) -> list[dict]:
+    """
+    Tramos sin solape a partir de core.vad.segmentar_por_pausas: cada corte
+    cae en una pausa, el nucleo es el tramo completo.
+    """
+    return [
+        {"inicio": a, "duracion": b - a, "nucleo_inicio": a, "nucleo_fin": b}
+        for a, b in regiones
+        if b > a
+    ]
+
+def planificar_tramos(
+    duracion: float,
+    procesos: int,
+    solape: float = SOLAPE_TRAMO,
+    largo_objetivo: float = 600.0,
+    largo_minimo: float = 60.0,
+) -> list[dict]:
+    """
+    Reparte la duracion en tramos de ~largo_objetivo segundos, en un multiplo
+    de procesos para que todos terminen a la vez. Cada tramo tiene su nucleo
+    [nucleo_inicio, nucleo_fin) y se extrae con `solape` segundos extra a
+    cada lado (inicio/duracion).
+    """
+    if duracion <= 0:
+        return []
+    largo = largo_tramo(duracion, procesos, largo_objetivo, largo_minimo)
+    n = max(1, round(duracion / largo))
+    largo = duracion / n
+    tramos = []
+    for i in range(n):
+        nucleo_inicio = i * largo
+        nucleo_fin = duracion if i == n - 1 else (i + 1) * largo
+        inicio = max(0.0, nucleo_inicio - solape)
+        fin = min(duracion, nucleo_fin + solape)
+        tramos.append({
+            "inicio": inicio,
+            "duracion": fin - inicio,
+            "nucleo_inicio": nucleo_inicio,
+            "nucleo_fin": nucleo_fin,
+        })
+    return tramos
+
+def _normalizar_texto(text: str) -> str:
+    return " ".join("".join(c for c in text.lower() if c.isalnum() or c.isspace()).split())
+
+def unir_segmentos_tramos(resultados: list[dict], tramos: list[dict]) -> list[dict]:
+    """
+    Une los segmentos de cada tramo en tiempo absoluto. Un segmento pertenece
+    al tramo cuyo nucleo contiene su inicio, asi las frases repetidas en el
+    solape se quedan una sola vez. Si un segmento aun pisa al anterior (mismo
+    texto o mas de la mitad de su duracion), se descarta; si no, se recorta.
+    """
+    segmentos = []
+    for idx, (resultado, tramo) in enumerate(zip(resultados, tramos)):
+        primero = idx == 0
+        ultimo = idx == len(tramos) - 1
+        for seg in (resultado or {}).get("segments", []):
+            start = float(seg.get("start", 0.0)) + tramo["inicio"]
+            end = float(seg.get("end", 0.0)) + tramo["inicio"]
+            if start < tramo["nucleo_inicio"] and not primero:
+                continue
+            if start >= tramo["nucleo_fin"] and not ultimo:
+                continue
+            text = (seg.get("text") or "").strip()
+            if not text or end <= start:
+                continue
+            if segmentos and start < segmentos[-1]["end"]:
+                prev = segmentos[-1]
+                pisado = prev["end"] - start
+                if _normalizar_texto(text) == _normalizar_texto(prev["text"]) or pisado > (end - start) / 2:
+                    continue
+                start = prev["end"]
+            segmentos.append({"start": start, "end": end, "text": text})
+    return segmentos
+
+def transcribir_tramos(
+    tramos_audio: list,
+    idioma: str = "es",
+    model_size: str = "base",
+    temperature: float | None = None,
+    beam_size: int | None = None,
+    procesos: int | None = None,
+    log_fn=None,
+) -> list[dict | None]:
+    """
+    Transcribe varios audios (rutas o tramos de core.pcm) repartidos en un
+    pool de procesos de Whisper. Devuelve los resultados de model.transcribe en el mismo orden
+    (None si se detuvo antes de terminarlos).
+    """
+    kwargs = _kwargs_transcripcion(idioma, temperature, beam_size)
+    total = len(tramos_audio)
+    if not transcriber_worker.worker_habilitado():
+        model = _get_model(model_size)
+        resultados = []
+        for i, audio in enumerate(tramos_audio, start=1):
+            if stop_control.should_stop():
+                resultados.append(None)
+                continue
+            resultados.append(model.transcribe(_audio_local(audio)[0], **kwargs))
+            if log_fn:
+                log_fn(f"Tramo {i}/{total} transcrito.")
+        return resultados
+
+    procesos = min(total, procesos_transcripcion(procesos))
+    hilos = max(1, (os.cpu_count() or 1) // procesos)
+    workers = transcriber_worker.get_pool(procesos)
+    if log_fn:
+        log_fn(f"Transcribiendo {total} tramos en {procesos} procesos ({hilos} hilos c/u)...")
+    trabajos = []
+    for i, audio in enumerate(tramos_audio):
+        worker = workers[i % procesos]
+        job_id, future = worker.submit(audio, model_size=model_size, threads=hilos, **kwargs)
+        trabajos.append((worker, job_id, future))
+
+    resultados = []
+    try:
+        for i, (worker, job_id, future) in enumerate(trabajos, start=1):
+            resultados.append(worker.wait(job_id, future)["resultado"])
+            if log_fn:
+                log_fn(f"Tramo {i}/{total} transcrito.")
+    except transcriber_worker.TranscripcionCancelada:
+        resultados += [None] * (total - len(resultados))
+    finally:
+        for worker, job_id, future in trabajos:
+            if not future.done():
+                worker.cancel(job_id)
+    return resultados
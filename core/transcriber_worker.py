@@ -0,0 +1,281 @@
+"""
+Proceso de transcripcion persistente.
+
+Un unico proceso hijo mantiene cargados los modelos de Whisper y atiende
+trabajos desde una cola. El proceso de la UI solo encola, espera resultados y
+recibe el progreso, asi el mainloop de Tk no carga torch ni retiene el GIL
+durante la inferencia, y todas las pestanas comparten los mismos modelos.
+"""
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from core import pcm, stop_control
+
+WORKER_ENV = "ZEMPER_WHISPER_WORKER"
+
+
+class TranscripcionCancelada(RuntimeError):
+    pass
+
+
+def worker_habilitado() -> bool:
+    return os.getenv(WORKER_ENV, "1").strip().lower() not in ("0", "false", "no")
+
+
+def _worker_main(jobs, results, cancels):
+    import torch
+    import whisper
+    import whisper.transcribe as whisper_transcribe
+
+    hilos_default = torch.get_num_threads()
+    models = {}
+    cancelados = set()
+
+    def _drenar_cancelados():
+        while True:
+            try:
+                cancelados.add(cancels.get_nowait())
+            except queue.Empty:
+                return
+
+    class _Progreso:
+        """Reemplazo de tqdm dentro de whisper.transcribe que reporta avance."""
+
+        job_id = None
+
+        def __init__(self, total=None, **_kwargs):
+            self.total = total or 0
+            self.n = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_exc):
+            return False
+
+        def update(self, n=1):
+            self.n += n
+            _drenar_cancelados()
+            if _Progreso.job_id in cancelados:
+                raise TranscripcionCancelada("Transcripcion cancelada.")
+            if self.total:
+                results.put({
+                    "id": _Progreso.job_id,
+                    "estado": "progreso",
+                    "progreso": min(1.0, self.n / self.total),
+                })
+
+    whisper_transcribe.tqdm.tqdm = _Progreso
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id = job["id"]
+        _drenar_cancelados()
+        if job_id in cancelados:
+            cancelados.discard(job_id)
+            results.put({"id": job_id, "estado": "cancelado"})
+            continue
+        try:
+            torch.set_num_threads(job.get("threads") or hilos_default)
+            model_size = job["model_size"]
+            if model_size not in models:
+                results.put({"id": job_id, "estado": "cargando"})
+                models[model_size] = whisper.load_model(model_size)
+            results.put({"id": job_id, "estado": "transcribiendo"})
+            _Progreso.job_id = job_id
+            kwargs = dict(job["kwargs"])
+            kwargs["verbose"] = False
+            audio = job["audio"]
+            if pcm.es_tramo(audio):
+                nombre = audio["nombre"]
+                audio = pcm.cargar_tramo(audio)
+            else:
+                nombre = os.path.splitext(os.path.basename(audio))[0]
+            result = models[model_size].transcribe(audio, **kwargs)
+            srt_path = None
+            if job.get("srt_dir"):
+                os.makedirs(job["srt_dir"], exist_ok=True)
+                writer = whisper.utils.get_writer("srt", job["srt_dir"])
+                writer(result, f"{nombre}.wav")
+                srt_path = os.path.join(job["srt_dir"], f"{nombre}.srt")
+            results.put({"id": job_id, "estado": "listo", "resultado": result, "srt": srt_path})
+        except TranscripcionCancelada:
+            results.put({"id": job_id, "estado": "cancelado"})
+        except Exception as exc:
+            results.put({"id": job_id, "estado": "error", "error": f"{type(exc).__name__}: {exc}"})
+        finally:
+            _Progreso.job_id = None
+            cancelados.discard(job_id)
+            # La vista del memmap mantiene el .f32 mapeado: en Windows no se
+            # podria borrar al terminar el trabajo (limpiar_temp).
+            audio = result = None
+
+
+class WhisperWorker:
+    """
+    Cliente del proceso de transcripcion: submit / wait / cancel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pendientes = {}
+        self._proc = None
+        self._jobs = None
+        self._results = None
+        self._cancels = None
+        self._dispatcher = None
+
+    def _asegurar_proceso(self):
+        if self._proc is not None and self._proc.is_alive():
+            return
+        ctx = mp.get_context("spawn")
+        self._jobs = ctx.Queue()
+        self._results = ctx.Queue()
+        self._cancels = ctx.Queue()
+        self._proc = ctx.Process(
+            target=_worker_main,
+            args=(self._jobs, self._results, self._cancels),
+            name="whisper-worker",
+            daemon=True,
+        )
+        self._proc.start()
+        self._dispatcher = threading.Thread(
+            target=self._despachar,
+            args=(self._proc, self._results),
+            daemon=True,
+        )
+        self._dispatcher.start()
+
+    def _despachar(self, proc, results):
+        while True:
+            try:
+                msg = results.get(timeout=1.0)
+            except queue.Empty:
+                if not proc.is_alive():
+                    self._fallar_pendientes("El proceso de transcripcion termino inesperadamente.")
+                    return
+                continue
+            with self._lock:
+                entry = self._pendientes.get(msg["id"])
+            if not entry:
+                continue
+            future, on_progress = entry
+            estado = msg["estado"]
+            if on_progress and estado in ("cargando", "transcribiendo", "progreso"):
+                try:
+                    on_progress(estado, msg.get("progreso"))
+                except Exception:
+                    pass
+            if estado in ("listo", "error", "cancelado"):
+                with self._lock:
+                    self._pendientes.pop(msg["id"], None)
+                if estado == "listo":
+                    future.set_result({"resultado": msg["resultado"], "srt": msg.get("srt")})
+                elif estado == "cancelado":
+                    future.set_exception(TranscripcionCancelada("Transcripcion cancelada."))
+                else:
+                    future.set_exception(RuntimeError(msg.get("error") or "Error de transcripcion."))
+
+    def _fallar_pendientes(self, motivo: str):
+        with self._lock:
+            pendientes = list(self._pendientes.values())
+            self._pendientes.clear()
+        for future, _ in pendientes:
+            if not future.done():
+                future.set_exception(RuntimeError(motivo))
+
+    def submit(
+        self,
+        audio,
+        model_size: str = "small",
+        srt_dir: str | None = None,
+        on_progress=None,
+        threads: int | None = None,
+        **kwargs,
+    ) -> tuple[int, Future]:
+        """
+        Encola una transcripcion de una ruta o de un tramo PCM (core.pcm).
+        kwargs se pasan a model.transcribe.
+        on_progress(estado, fraccion) se llama desde un hilo secundario.
+        threads: hilos de torch para este trabajo (None = por defecto).
+        """
+        with self._lock:
+            self._asegurar_proceso()
+            job_id = next(self._ids)
+            future = Future()
+            self._pendientes[job_id] = (future, on_progress)
+            self._jobs.put({
+                "id": job_id,
+                "audio": audio if pcm.es_tramo(audio) else os.path.abspath(audio),
+                "model_size": model_size,
+                "srt_dir": os.path.abspath(srt_dir) if srt_dir else None,
+                "threads": threads,
+                "kwargs": kwargs,
+            })
+        return job_id, future
+
+    def cancel(self, job_id: int):
+        with self._lock:
+            if job_id in self._pendientes and self._cancels is not None:
+                self._cancels.put(job_id)
+
+    def wait(self, job_id: int, future: Future, timeout: float | None = None) -> dict:
+        """
+        Espera el resultado. Si stop_control pide detener, cancela el trabajo.
+        """
+        restante = timeout
+        while True:
+            paso = 0.25 if restante is None else min(0.25, restante)
+            try:
+                return future.result(timeout=paso)
+            except TimeoutError:
+                pass
+            if stop_control.should_stop():
+                self.cancel(job_id)
+                return future.result()
+            if restante is not None:
+                restante -= paso
+                if restante <= 0:
+                    raise TimeoutError("La transcripcion no termino a tiempo.")
+
+    def shutdown(self):
+        with self._lock:
+            proc = self._proc
+            if proc is None:
+                return
+            try:
+                self._jobs.put(None)
+            except Exception:
+                pass
+            self._proc = None
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+
+
+_pool: list[WhisperWorker] = []
+_pool_lock = threading.Lock()
+
+
+def get_pool(n: int) -> list[WhisperWorker]:
+    """
+    Devuelve n workers (cada uno su propio proceso con sus modelos).
+    Los procesos se crean bajo demanda y se reutilizan entre llamadas.
+    """
+    n = max(1, int(n))
+    with _pool_lock:
+        while len(_pool) < n:
+            _pool.append(WhisperWorker())
+        return _pool[:n]
+
+
+def get_worker() -> WhisperWorker:
+    return get_pool(1)[0]
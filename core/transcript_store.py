@@ -0,0 +1,247 @@
+"""
+Almacen de transcripciones.
+
+Guarda los segmentos de Whisper (con tiempos por palabra cuando los hay)
+indexados por la huella de contenido del medio y el rango de tiempo que
+cubren. Cada corte generado registra de que fuente y rango salio, asi su
+transcripcion se obtiene recortando la de la fuente en vez de volver a
+pasar Whisper. El texto para la IA y el SRT salen del mismo resultado.
+
+Estructura en output/.cache/transcripciones/:
+- <huella>.json: {"rangos": [{"inicio", "fin", "idioma", "modelo", "segmentos"}]}
+  con tiempos absolutos del medio
+- origenes.json: {huella_corte: {"fuente", "inicio", "fin"}}
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core import probe_cache
+
+STORE_DIR = os.path.join("output", ".cache", "transcripciones")
+ORIGENES_PATH = os.path.join(STORE_DIR, "origenes.json")
+MUESTRA_BYTES = 1 << 20
+# Margen para dar por cubierto un rango (redondeos de duracion/cortes).
+TOLERANCIA = 0.5
+MAX_SALTOS = 4
+
+_lock = threading.Lock()
+_huellas: dict[tuple, str] = {}
+
+
+def huella_contenido(path: str) -> str | None:
+    """
+    Huella del contenido: tamano mas tres muestras de 1 MiB (inicio, medio y
+    final). No depende de la ruta ni del mtime, asi una copia o un archivo
+    movido se reconoce. Se memoriza por (ruta, tamano, mtime).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    clave = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        if clave in _huellas:
+            return _huellas[clave]
+    h = hashlib.sha1(str(st.st_size).encode("ascii"))
+    try:
+        with open(path, "rb") as fh:
+            for pos in (0, max(0, st.st_size // 2 - MUESTRA_BYTES // 2), max(0, st.st_size - MUESTRA_BYTES)):
+                fh.seek(pos)
+                h.update(fh.read(MUESTRA_BYTES))
+    except OSError:
+        return None
+    valor = h.hexdigest()[:20]
+    with _lock:
+        _huellas[clave] = valor
+    return valor
+
+
+def _leer_json(path: str, default):
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        return data if isinstance(data, type(default)) else default
+    except Exception:
+        return default
+
+
+def _escribir_json(path: str, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _ruta_entrada(huella: str) -> str:
+    return os.path.join(STORE_DIR, f"{huella}.json")
+
+
+def segmentos_de_resultado(resultado: dict, desplazamiento: float = 0.0) -> list[dict]:
+    """
+    Segmentos {"start", "end", "text", "words"?} de un resultado de
+    model.transcribe, desplazados desplazamiento segundos.
+    """
+    segmentos = []
+    for seg in (resultado or {}).get("segments", []):
+        text = (seg.get("text") or "").strip()
+        if not text:
+            continue
+        item = {
+            "start": round(float(seg.get("start", 0.0)) + desplazamiento, 3),
+            "end": round(float(seg.get("end", 0.0)) + desplazamiento, 3),
+            "text": text,
+        }
+        if seg.get("words"):
+            item["words"] = [
+                {
+                    "word": w.get("word", ""),
+                    "start": round(float(w.get("start", 0.0)) + desplazamiento, 3),
+                    "end": round(float(w.get("end", 0.0)) + desplazamiento, 3),
+                }
+                for w in seg["words"]
+            ]
+        segmentos.append(item)
+    return segmentos
+
+
+def recortar(segmentos: list[dict], inicio: float, fin: float | None = None) -> list[dict]:
+    """
+    Segmentos dentro de [inicio, fin) con tiempos relativos a inicio. Con
+    palabras se recorta al nivel de palabra; sin ellas, un segmento entra si
+    su punto medio cae dentro del rango.
+    """
+    fin = float("inf") if fin is None else fin
+    recortados = []
+    for seg in segmentos:
+        if seg["end"] <= inicio or seg["start"] >= fin:
+            continue
+        words = seg.get("words")
+        if words:
+            dentro = [w for w in words if inicio <= (w["start"] + w["end"]) / 2 < fin]
+            if not dentro:
+                continue
+            recortados.append({
+                "start": max(0.0, dentro[0]["start"] - inicio),
+                "end": min(fin, dentro[-1]["end"]) - inicio,
+                "text": "".join(w["word"] for w in dentro).strip(),
+                "words": [
+                    {"word": w["word"], "start": max(0.0, w["start"] - inicio), "end": w["end"] - inicio}
+                    for w in dentro
+                ],
+            })
+            continue
+        if not inicio <= (seg["start"] + seg["end"]) / 2 < fin:
+            continue
+        recortados.append({
+            "start": max(0.0, seg["start"] - inicio),
+            "end": min(fin, seg["end"]) - inicio,
+            "text": seg["text"],
+        })
+    return recortados
+
+
+def texto(segmentos: list[dict]) -> str:
+    return " ".join(seg["text"].strip() for seg in segmentos if seg.get("text")).strip()
+
+
+def guardar(
+    path: str,
+    segmentos: list[dict],
+    inicio: float = 0.0,
+    fin: float | None = None,
+    idioma: str = "",
+    modelo: str = "",
+):
+    """
+    Guarda segmentos (tiempos absolutos del medio) que cubren [inicio, fin).
+    fin=None es hasta el final del medio.
+    """
+    huella = huella_contenido(path)
+    if huella is None:
+        return
+    if fin is None:
+        fin = max([_duracion(path)] + [seg["end"] for seg in segmentos])
+    ruta = _ruta_entrada(huella)
+    with _lock:
+        data = _leer_json(ruta, {})
+        rangos = [
+            r for r in data.get("rangos", [])
+            if not (r["inicio"] >= inicio - TOLERANCIA and r["fin"] <= fin + TOLERANCIA and r.get("idioma") == idioma)
+        ]
+        rangos.append({
+            "inicio": inicio,
+            "fin": fin,
+            "idioma": idioma,
+            "modelo": modelo,
+            "hecho": time.time(),
+            "segmentos": segmentos,
+        })
+        rangos.sort(key=lambda r: r["inicio"])
+        _escribir_json(ruta, {"rangos": rangos})
+
+
+def registrar_origen(clip_path: str, fuente_path: str, inicio: float, duracion: float):
+    """
+    Registra que clip_path contiene [inicio, inicio + duracion) de fuente_path.
+    Llamar con el clip ya terminado (la huella depende del contenido).
+    """
+    clip = huella_contenido(clip_path)
+    fuente = huella_contenido(fuente_path)
+    if not clip or not fuente or clip == fuente:
+        return
+    with _lock:
+        origenes = _leer_json(ORIGENES_PATH, {})
+        origenes[clip] = {"fuente": fuente, "inicio": inicio, "fin": inicio + duracion}
+        _escribir_json(ORIGENES_PATH, origenes)
+
+
+def _duracion(path: str) -> float:
+    try:
+        return float(probe_cache.probe(path)["format"].get("duration") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _buscar_huella(huella: str, inicio: float, fin: float, idioma: str) -> list[dict] | None:
+    data = _leer_json(_ruta_entrada(huella), {})
+    for rango in data.get("rangos", []):
+        if idioma and rango.get("idioma") and rango["idioma"] != idioma:
+            continue
+        if rango["inicio"] > inicio + TOLERANCIA or rango["fin"] < fin - TOLERANCIA:
+            continue
+        return recortar(rango["segmentos"], inicio, fin)
+    return None
+
+
+def buscar(path: str, idioma: str = "") -> list[dict] | None:
+    """
+    Segmentos (relativos al inicio del medio) de una transcripcion guardada
+    del propio archivo o, si es un corte, de su fuente. None si no hay.
+    """
+    huella = huella_contenido(path)
+    if huella is None:
+        return None
+    with _lock:
+        origenes = _leer_json(ORIGENES_PATH, {})
+    inicio, fin = 0.0, _duracion(path)
+    for _ in range(MAX_SALTOS):
+        segmentos = _buscar_huella(huella, inicio, fin, idioma)
+        if segmentos is not None:
+            return segmentos
+        origen = origenes.get(huella)
+        if not origen:
+            return None
+        # Un corte de un corte: el rango se traslada a la fuente original.
+        largo = min(fin - inicio, origen["fin"] - origen["inicio"])
+        inicio = origen["inicio"] + inicio
+        fin = inicio + largo
+        huella = origen["fuente"]
+    return None
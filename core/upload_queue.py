@@ -0,0 +1,181 @@
+"""
+Cola de subidas en paralelo con limite global de ancho de banda.
+
+Suben ZEMPER_SUBIDAS_PARALELAS archivos a la vez (2 por defecto) y todos
+comparten el limite ZEMPER_SUBIDA_MAX_MBPS (megabits por segundo, sin limite
+por defecto). Los cuerpos de cada PUT se entregan a requests como
+CuerpoLimitado, que pide permiso al limitador antes de cada bloque.
+"""
+
+import contextvars
+import os
+import threading
+import time
+
+from core import stop_control
+
+PARALELAS_ENV = "ZEMPER_SUBIDAS_PARALELAS"
+MAX_MBPS_ENV = "ZEMPER_SUBIDA_MAX_MBPS"
+PARALELAS_DEFECTO = 2
+BLOQUE = 64 * 1024
+
+_limitador = None
+_limitador_lock = threading.Lock()
+
+
+class ColaDetenida(Exception):
+    """
+    La lanza fn en ejecutar_cola para que no arranquen mas items (p. ej.
+    cuota agotada); los que ya estan subiendo terminan.
+    """
+
+
+class LimitadorBanda:
+    """
+    Cubeta de tokens compartida por todos los hilos: consumir(n) espera lo
+    necesario para no superar bytes_por_seg en promedio. Sin limite no espera.
+    """
+
+    def __init__(self, bytes_por_seg: float | None = None, rafaga: float = 1.0):
+        self.bytes_por_seg = bytes_por_seg if bytes_por_seg and bytes_por_seg > 0 else None
+        self._capacidad = (self.bytes_por_seg or 0) * rafaga
+        self._tokens = self._capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consumir(self, n: int):
+        if not self.bytes_por_seg or n <= 0:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self._capacidad, self._tokens + (ahora - self._ultimo) * self.bytes_por_seg)
+            self._ultimo = ahora
+            # Se reserva ya: los demas hilos esperan detras de esta deuda.
+            self._tokens -= n
+            espera = -self._tokens / self.bytes_por_seg if self._tokens < 0 else 0.0
+        if espera > 0:
+            time.sleep(espera)
+
+
+def limitador() -> LimitadorBanda:
+    """
+    Limitador global segun ZEMPER_SUBIDA_MAX_MBPS.
+    """
+    global _limitador
+    with _limitador_lock:
+        if _limitador is None:
+            try:
+                mbps = float(os.getenv(MAX_MBPS_ENV, "0") or 0)
+            except ValueError:
+                mbps = 0.0
+            _limitador = LimitadorBanda(mbps * 1_000_000 / 8 if mbps > 0 else None)
+        return _limitador
+
+
+class CuerpoLimitado:
+    """
+    Cuerpo de un PUT sobre un buffer (bytes, memoryview, mmap) que requests
+    envia por bloques: tiene largo conocido (Content-Length) y cada read()
+    devuelve una vista del buffer, sin copiarlo, tras pasar por el limitador.
+    """
+
+    def __init__(self, datos, limitador_banda: LimitadorBanda | None = None):
+        self._vista = memoryview(datos).cast("B")
+        self._pos = 0
+        self._limitador = limitador_banda
+
+    def __len__(self) -> int:
+        return len(self._vista)
+
+    def read(self, n: int = -1):
+        if n is None or n < 0:
+            n = len(self._vista) - self._pos
+        n = min(n, BLOQUE, len(self._vista) - self._pos)
+        if n <= 0:
+            return b""
+        if self._limitador:
+            self._limitador.consumir(n)
+        bloque = self._vista[self._pos:self._pos + n]
+        self._pos += n
+        return bloque
+
+    def liberar(self):
+        """
+        Suelta la vista del buffer (necesario antes de cerrar un mmap).
+        """
+        try:
+            self._vista.release()
+        except BufferError:
+            pass
+
+    def __iter__(self):
+        while True:
+            bloque = self.read(BLOQUE)
+            if not bloque:
+                return
+            yield bloque
+
+
+def max_paralelas(valor=None) -> int:
+    """
+    Subidas simultaneas: valor si es valido, si no ZEMPER_SUBIDAS_PARALELAS.
+    """
+    for candidato in (valor, os.getenv(PARALELAS_ENV)):
+        try:
+            n = int(str(candidato).strip())
+        except (TypeError, ValueError):
+            continue
+        if n > 0:
+            return n
+    return PARALELAS_DEFECTO
+
+
+def ejecutar_cola(fn, items: list, max_paralelo: int | None = None, log_fn=None) -> list:
+    """
+    Ejecuta fn(idx, item) para cada item con hasta max_paralelo a la vez,
+    en el orden de items. Devuelve los resultados en orden; los items que no
+    llegaron a empezar (stop o ColaDetenida) quedan en None. Los errores de
+    cada item son cosa de fn: una excepcion que no sea ColaDetenida se loguea
+    y ese item queda en None.
+    """
+    workers = max(1, min(max_paralelas(max_paralelo), len(items) or 1))
+    resultados = [None] * len(items)
+    siguiente = [0]
+    detenida = threading.Event()
+    lock = threading.Lock()
+
+    def _trabajar():
+        while True:
+            if detenida.is_set() or stop_control.should_stop():
+                return
+            with lock:
+                idx = siguiente[0]
+                if idx >= len(items):
+                    return
+                siguiente[0] += 1
+            try:
+                resultados[idx] = fn(idx, items[idx])
+            except ColaDetenida as exc:
+                detenida.set()
+                if log_fn and str(exc):
+                    log_fn(str(exc))
+            except Exception as exc:
+                if log_fn:
+                    log_fn(f"Error en la cola de subidas: {exc}")
+
+    if log_fn and workers > 1:
+        log_fn(f"Subiendo {len(items)} archivos, {workers} a la vez.")
+    hilos = [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_trabajar,),
+            name=f"subida-{k + 1}",
+            daemon=True,
+        )
+        for k in range(workers)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
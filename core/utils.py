@@ -1,14 +1,17 @@
 import os
-import subprocess
 import re
 import math
 import tempfile
-import threading
 import time
 import uuid
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
+import json
 from datetime import datetime
-from core import stop_control
+from core import composicion, fastcut, ffmpeg_runner, onda, probe_cache, stop_control
+from core.part_pool import args_hilos
+
+FONDOS_CACHE_DIR = os.path.join("output", ".cache", "fondos")
+
 
 def asegurar_dir(path: str):
     if not os.path.exists(path):
@@ -122,39 +125,18 @@ def output_subtitulados_dir(video_path: str) -> str:
     return output_subdir(video_path, "subtitulados")
 
 def obtener_duracion_segundos(path: str) -> float:
-    cmd = [
-        "ffprobe", "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return float(result.stdout.strip())
+    return float(probe_cache.probe(path)["format"].get("duration", ""))
 
 def obtener_tamano_video(path: str) -> tuple[int, int]:
-    cmd = [
-        "ffprobe", "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=p=0:s=x",
-        path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    parts = result.stdout.strip().split("x")
-    if len(parts) != 2:
+    stream = probe_cache.primer_stream(path, "video")
+    try:
+        return (int(stream["width"]), int(stream["height"]))
+    except Exception:
         return (1920, 1080)
-    return (int(parts[0]), int(parts[1]))
 
 def obtener_fps(path: str) -> float:
-    cmd = [
-        "ffprobe", "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=r_frame_rate",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    val = result.stdout.strip()
+    stream = probe_cache.primer_stream(path, "video") or {}
+    val = str(stream.get("r_frame_rate") or "").strip()
     if not val:
         return 30.0
     if "/" in val:
@@ -172,207 +154,22 @@ def obtener_fps(path: str) -> float:
         return 30.0
 
 
-def _pil_color(value: str, fallback: str) -> str:
-    val = (value or "").strip()
-    if not val:
-        val = fallback
-    if val.lower().startswith("0x"):
-        hexval = val[2:]
-        return "#" + hexval.upper()
-    if not val.startswith("#") and all(c in "0123456789abcdefABCDEF" for c in val) and len(val) in (3, 6):
-        return "#" + val.upper()
-    return val
-
-
-def _render_mensajes_on_background(
-    imagen_path: str,
-    target_w: int,
-    target_h: int,
-    mensajes: list[dict],
-    transparent: bool = False,
-) -> str | None:
-    try:
-        if transparent:
-            bg = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
-        else:
-            bg = Image.open(imagen_path).convert("RGBA")
-            bg = bg.resize((target_w, target_h), Image.LANCZOS)
-    except Exception:
-        return None
-    draw = ImageDraw.Draw(bg, "RGBA")
-
-    for m in mensajes:
-        try:
-            left = float(m.get("left_pct", 0)) / 100.0
-            top = float(m.get("top_pct", 0)) / 100.0
-            width = float(m.get("width_pct", 0)) / 100.0
-            height = float(m.get("height_pct", 0)) / 100.0
-        except Exception:
-            continue
-        left_px = int(target_w * left)
-        top_px = int(target_h * top)
-        width_px = max(2, int(target_w * width))
-        height_px = max(2, int(target_h * height))
-
-        bg_color = _pil_color(m.get("bg_color"), "#D91E18")
-        text_color = _pil_color(m.get("text_color"), "#FFFFFF")
-        border_color = _pil_color(m.get("border_color"), "#FFC400")
-        radius_pct = float(m.get("radius_pct", 0.5) or 0.5)
-        border_w = int(float(m.get("border_width", 2) or 2))
-        radius = max(2, int(height_px * radius_pct))
-
-        rect = [left_px, top_px, left_px + width_px, top_px + height_px]
-        draw.rounded_rectangle(rect, radius=radius, fill=bg_color)
-        if border_w > 0 and border_color:
-            draw.rounded_rectangle(rect, radius=radius, outline=border_color, width=border_w)
-
-        text = str(m.get("text", "") or "")
-        fontfile = (m.get("fontfile") or "").strip()
-        font_size = max(14, int(height_px * 0.55))
-        try:
-            if fontfile and os.path.exists(fontfile):
-                font = ImageFont.truetype(fontfile, font_size)
-            else:
-                font = ImageFont.load_default()
-        except Exception:
-            font = ImageFont.load_default()
-        try:
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_w = bbox[2] - bbox[0]
-            text_h = bbox[3] - bbox[1]
-        except Exception:
-            text_w = len(text) * font_size * 0.5
-            text_h = font_size
-        text_x = left_px + (width_px - text_w) / 2
-        text_y = top_px + (height_px - text_h) / 2
-        draw.text((text_x, text_y), text, font=font, fill=text_color)
-
-    tmp_path = os.path.join(tempfile.gettempdir(), f"msg_{uuid.uuid4().hex}.png")
-    try:
-        bg.save(tmp_path, "PNG")
-    except Exception:
-        return None
-    return tmp_path
-
-
-def _render_cintas_on_background(
-    imagen_path: str,
-    target_w: int,
-    target_h: int,
-    cintas: list[dict],
-    transparent: bool = False,
-) -> str | None:
-    try:
-        if transparent:
-            bg = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
-        else:
-            bg = Image.open(imagen_path).convert("RGBA")
-            bg = bg.resize((target_w, target_h), Image.LANCZOS)
-    except Exception:
-        return None
-    draw = ImageDraw.Draw(bg, "RGBA")
-
-    for c in cintas:
-        try:
-            left = float(c.get("left_pct", 0)) / 100.0
-            top = float(c.get("top_pct", 0)) / 100.0
-            width = float(c.get("width_pct", 0)) / 100.0
-            height = float(c.get("height_pct", 0)) / 100.0
-        except Exception:
-            continue
-        left_px = int(target_w * left)
-        top_px = int(target_h * top)
-        width_px = max(2, int(target_w * width))
-        height_px = max(2, int(target_h * height))
-        border_w = max(4, int(height_px * 0.08))
-
-        bg_color = _pil_color(c.get("bg_color"), "#000000")
-        border_color = _pil_color(c.get("border_color"), "#FFC400")
-        text_color = _pil_color(c.get("text_color"), "#FFFFFF")
-
-        rect = [left_px, top_px, left_px + width_px, top_px + height_px]
-        draw.rectangle(rect, fill=bg_color)
-        draw.rectangle(
-            [left_px, top_px, left_px + border_w, top_px + height_px],
-            fill=border_color,
-        )
-
-        name = str(c.get("nombre", "") or "")
-        role = str(c.get("rol", "") or "")
-        name_fontfile = (c.get("fontfile_name") or "").strip()
-        role_fontfile = (c.get("fontfile_role") or "").strip()
-        name_size = max(14, int(height_px * 0.45))
-        role_size = max(12, int(height_px * 0.30))
-        try:
-            if name_fontfile and os.path.exists(name_fontfile):
-                name_font = ImageFont.truetype(name_fontfile, name_size)
-            else:
-                name_font = ImageFont.load_default()
-        except Exception:
-            name_font = ImageFont.load_default()
-        try:
-            if role_fontfile and os.path.exists(role_fontfile):
-                role_font = ImageFont.truetype(role_fontfile, role_size)
-            else:
-                role_font = ImageFont.load_default()
-        except Exception:
-            role_font = ImageFont.load_default()
-
-        pad_x = max(6, int(height_px * 0.12))
-        pad_y = max(4, int(height_px * 0.12))
-        draw.text((left_px + border_w + pad_x, top_px + pad_y), name, font=name_font, fill=text_color)
-        draw.text((left_px + border_w + pad_x, top_px + pad_y + name_size + 2), role, font=role_font, fill=text_color)
-
-    tmp_path = os.path.join(tempfile.gettempdir(), f"cintas_{uuid.uuid4().hex}.png")
-    try:
-        bg.save(tmp_path, "PNG")
-    except Exception:
-        return None
-    return tmp_path
-
 def tiene_audio(path: str) -> bool:
-    cmd = [
-        "ffprobe", "-v", "error",
-        "-select_streams", "a:0",
-        "-show_entries", "stream=codec_type",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.stdout.strip() == "audio"
+    return probe_cache.primer_stream(path, "audio") is not None
 
-def aplicar_musica_fondo(
-    video_path: str,
+def _preparar_musica(
+    video_dur: float,
     music_path: str,
     volumen: float = 0.25,
     music_start: float = 0.0,
     music_end: float | None = None,
     video_start: float = 0.0,
-    output_path: str | None = None,
     log_fn=None,
-):
+) -> dict | None:
     """
-    Mezcla una pista de música de fondo con el audio del video.
-    - music_start / music_end: tramo de la música (segundos)
-    - video_start: segundo del video en que debe iniciar la música
-    - Si la música es más corta que el video, no se fuerza loop.
+    Valida el tramo de musica para un video de video_dur segundos.
+    Devuelve None si la musica debe omitirse.
     """
-    if not os.path.exists(video_path):
-        raise FileNotFoundError(f"No se encontró el video: {video_path}")
-    if not music_path or not os.path.exists(music_path):
-        if log_fn:
-            log_fn("⚠️ Música de fondo no válida. Se omite.")
-        return video_path
-
-    try:
-        video_dur = float(obtener_duracion_segundos(video_path))
-    except Exception:
-        video_dur = 0.0
-    if video_dur <= 0:
-        if log_fn:
-            log_fn("⚠️ Duración del video inválida. Se omite música.")
-        return video_path
-
     try:
         music_dur = float(obtener_duracion_segundos(music_path))
     except Exception:
@@ -380,7 +177,7 @@ def aplicar_musica_fondo(
     if music_dur <= 0:
         if log_fn:
             log_fn("⚠️ Duración de la música inválida. Se omite.")
-        return video_path
+        return None
 
     try:
         music_start = max(0.0, float(music_start or 0.0))
@@ -394,11 +191,11 @@ def aplicar_musica_fondo(
     if music_start >= music_dur:
         if log_fn:
             log_fn("⚠️ Inicio de música supera la duración. Se omite.")
-        return video_path
+        return None
     if video_start >= video_dur:
         if log_fn:
             log_fn("⚠️ Inicio de música en video fuera de rango. Se omite.")
-        return video_path
+        return None
 
     if music_end is not None:
         try:
@@ -415,7 +212,7 @@ def aplicar_musica_fondo(
     if effective <= 0:
         if log_fn:
             log_fn("⚠️ No hay duración efectiva para la música. Se omite.")
-        return video_path
+        return None
 
     try:
         volumen = float(volumen)
@@ -423,20 +220,80 @@ def aplicar_musica_fondo(
         volumen = 0.25
     volumen = max(0.0, min(volumen, 2.0))
 
-    delay_ms = int(video_start * 1000)
-    has_audio = tiene_audio(video_path)
+    return {
+        "music_start": music_start,
+        "effective": effective,
+        "volumen": volumen,
+        "delay_ms": int(video_start * 1000),
+    }
 
-    if has_audio:
-        filtro = (
-            f"[1:a]volume={volumen:.3f},adelay={delay_ms}|{delay_ms}[bg];"
-            f"[0:a][bg]amix=inputs=2:duration=first:dropout_transition=0,"
-            f"apad,atrim=0:{video_dur:.3f}[mix]"
-        )
-    else:
-        filtro = (
-            f"[1:a]volume={volumen:.3f},adelay={delay_ms}|{delay_ms},apad,"
-            f"atrim=0:{video_dur:.3f}[mix]"
+
+def _grafo_musica(musica: dict, audio_in: str | None, music_in: str, out: str, video_dur: float, prefix: str = "") -> str:
+    """
+    Filtergraph que mezcla [music_in] con [audio_in] (o la usa sola si el
+    video no tiene audio) recortado a video_dur.
+    """
+    volumen = musica["volumen"]
+    delay_ms = musica["delay_ms"]
+    if audio_in:
+        return (
+            f"[{music_in}]volume={volumen:.3f},adelay={delay_ms}|{delay_ms}[{prefix}bgm];"
+            f"[{audio_in}][{prefix}bgm]amix=inputs=2:duration=first:dropout_transition=0,"
+            f"apad,atrim=0:{video_dur:.3f}[{out}]"
         )
+    return (
+        f"[{music_in}]volume={volumen:.3f},adelay={delay_ms}|{delay_ms},apad,"
+        f"atrim=0:{video_dur:.3f}[{out}]"
+    )
+
+
+def aplicar_musica_fondo(
+    video_path: str,
+    music_path: str,
+    volumen: float = 0.25,
+    music_start: float = 0.0,
+    music_end: float | None = None,
+    video_start: float = 0.0,
+    output_path: str | None = None,
+    log_fn=None,
+):
+    """
+    Mezcla una pista de música de fondo con el audio del video.
+    - music_start / music_end: tramo de la música (segundos)
+    - video_start: segundo del video en que debe iniciar la música
+    - Si la música es más corta que el video, no se fuerza loop.
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"No se encontró el video: {video_path}")
+    if not music_path or not os.path.exists(music_path):
+        if log_fn:
+            log_fn("⚠️ Música de fondo no válida. Se omite.")
+        return video_path
+
+    try:
+        video_dur = float(obtener_duracion_segundos(video_path))
+    except Exception:
+        video_dur = 0.0
+    if video_dur <= 0:
+        if log_fn:
+            log_fn("⚠️ Duración del video inválida. Se omite música.")
+        return video_path
+
+    musica = _preparar_musica(
+        video_dur,
+        music_path,
+        volumen=volumen,
+        music_start=music_start,
+        music_end=music_end,
+        video_start=video_start,
+        log_fn=log_fn,
+    )
+    if not musica:
+        return video_path
+    music_start = musica["music_start"]
+    effective = musica["effective"]
+    has_audio = tiene_audio(video_path)
+    filtro = _grafo_musica(musica, "0:a" if has_audio else None, "1:a", "mix", video_dur)
 
     final_path = output_path or video_path
     temp_path = final_path
@@ -453,6 +310,7 @@ def aplicar_musica_fondo(
         "-map", "0:v:0",
         "-map", "[mix]",
         "-c:v", "copy",
+        *args_hilos(),
         "-c:a", "aac",
         "-t", f"{video_dur:.3f}",
         "-movflags", "+faststart",
@@ -462,7 +320,7 @@ def aplicar_musica_fondo(
     if log_fn:
         log_fn("🎵 Mezclando música de fondo...")
 
-    result = subprocess.run(cmd, capture_output=True, text=False)
+    result = ffmpeg_runner.run(cmd, text=False)
     if result.returncode != 0:
         err = ""
         out = ""
@@ -542,45 +400,33 @@ def crear_outro_tiktok(
     ]
     if log_fn:
         log_fn(f"🖼️ Creando tarjeta final: {os.path.basename(output_path)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd)
     if result.returncode != 0:
         if log_fn:
             err = (result.stderr or "").strip()
             log_fn(f"❌ Tarjeta final falló: {err[-300:]}")
         raise RuntimeError("No se pudo crear la tarjeta final.")
 
-def dividir_video_ffmpeg(
+def _ejecutar_ffmpeg_con_progreso(cmd: list[str], on_progress=None, duracion: float | None = None):
+    """
+    Ejecuta ffmpeg con core.ffmpeg_runner vigilando stop_control.
+    on_progress recibe los eventos de -progress (ver ffmpeg_runner.run).
+    Devuelve (returncode, stderr_tail, detenido).
+    """
+    result = ffmpeg_runner.run(cmd, duracion=duracion, on_progress=on_progress)
+    detenido = stop_control.should_stop()
+    return result.returncode, (result.stderr or "").strip(), detenido
+
+def _filtro_recorte(
     video_path: str,
-    segundos_por_parte: float,
-    out_dir: str,
-    total_partes: int | None = None,
-    start_sec: float = 0.0,
-    end_sec: float | None = None,
     crop_bars: bool = False,
     crop_top: float = 0.0,
     crop_bottom: float = 0.0,
     crop_scale_back: bool = True,
-    log_fn=None
-):
+) -> str | None:
     """
-    Divide un video en partes de N segundos. Guarda MP4s en out_dir.
+    Filtro -vf de recorte de barras (automatico o manual) o None.
     """
-    asegurar_dir(out_dir)
-    base_name = nombre_base_principal(video_path)
-    duracion = obtener_duracion_segundos(video_path)
-    start_sec = max(0.0, float(start_sec))
-    if end_sec is None:
-        end_sec = duracion
-    else:
-        end_sec = min(duracion, float(end_sec))
-    if end_sec <= start_sec:
-        return []
-    rango = end_sec - start_sec
-    if total_partes is None:
-        total_partes = max(1, math.ceil(rango / segundos_por_parte))
-    else:
-        total_partes = max(1, int(total_partes))
-    paths = []
     crop_filter = None
     manual_crop = None
     try:
@@ -616,42 +462,134 @@ def dividir_video_ffmpeg(
                 crop_filter = f"crop={crop_params}"
     if manual_crop:
         crop_filter = manual_crop
+    return crop_filter
 
-    for i in range(total_partes):
-        if stop_control.should_stop():
-            if log_fn:
-                log_fn("Proceso detenido por el usuario.")
-            break
-        inicio = start_sec + i * segundos_por_parte
-        if inicio >= end_sec:
-            break
-        duracion_parte = min(segundos_por_parte, max(0.1, end_sec - inicio))
-        out_path = os.path.join(out_dir, f"{base_name}_parte_{i+1:03d}.mp4")
 
-        if log_fn:
-            log_fn(f"âœ‚ï¸ Generando video parte {i+1}/{total_partes}...")
+def dividir_video_ffmpeg(
+    video_path: str,
+    segundos_por_parte: float,
+    out_dir: str,
+    total_partes: int | None = None,
+    start_sec: float = 0.0,
+    end_sec: float | None = None,
+    crop_bars: bool = False,
+    crop_top: float = 0.0,
+    crop_bottom: float = 0.0,
+    crop_scale_back: bool = True,
+    log_fn=None,
+    corte: str | None = None
+):
+    """
+    Divide un video en partes de N segundos. Guarda MP4s en out_dir.
+    corte: "exacto", "rapido" o "recodificar" (ver core.fastcut; None usa
+    ZEMPER_MODO_CORTE o rapido). Con recorte siempre se recodifica.
+    """
+    asegurar_dir(out_dir)
+    base_name = nombre_base_principal(video_path)
+    duracion = obtener_duracion_segundos(video_path)
+    start_sec = max(0.0, float(start_sec))
+    if end_sec is None:
+        end_sec = duracion
+    else:
+        end_sec = min(duracion, float(end_sec))
+    if end_sec <= start_sec:
+        return []
+    rango = end_sec - start_sec
+    if total_partes is None:
+        total_partes = max(1, math.ceil(rango / segundos_por_parte))
+    else:
+        total_partes = max(1, int(total_partes))
+    crop_filter = _filtro_recorte(video_path, crop_bars, crop_top, crop_bottom, crop_scale_back)
+
+    # Un solo ffmpeg decodifica la fuente una vez y el muxer segment escribe
+    # todas las partes; los keyframes forzados garantizan cortes exactos.
+    rango = min(rango, total_partes * segundos_por_parte)
+    cortes = []
+    for i in range(1, total_partes):
+        t = i * segundos_por_parte
+        if t >= rango:
+            break
+        cortes.append(t)
+    total_partes = len(cortes) + 1
+    tiempos = ",".join(f"{t:.3f}" for t in cortes)
+    patron = os.path.join(out_dir, f"{base_name.replace('%', '%%')}_parte_%03d.mp4")
+    paths = [
+        os.path.join(out_dir, f"{base_name}_parte_{i+1:03d}.mp4")
+        for i in range(total_partes)
+    ]
 
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", video_path,
-            "-ss", str(inicio),
-            "-t", str(duracion_parte),
+    if not crop_filter:
+        # Sin filtros el video se copia por GOP (ver core.fastcut).
+        limites = [0.0] + cortes + [rango]
+        tramos = [
+            (start_sec + limites[i], limites[i + 1] - limites[i])
+            for i in range(total_partes)
         ]
-        if crop_filter:
-            cmd += ["-vf", crop_filter]
-        cmd += [
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-movflags", "+faststart",
-            out_path
-        ]
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        paths.append(out_path)
+        copiados = fastcut.dividir_tramos(video_path, tramos, paths, modo=corte, log_fn=log_fn)
+        if copiados is not None and (len(copiados) == total_partes or stop_control.should_stop()):
+            return copiados
+        # Fuente no apta o una parte fallo: se recodifica todo como antes.
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", f"{start_sec:.3f}",
+        "-i", video_path,
+        "-t", f"{rango:.3f}",
+    ]
+    if crop_filter:
+        cmd += ["-vf", crop_filter]
+    cmd += [
+        "-c:v", "libx264",
+        "-c:a", "aac",
+    ]
+    if tiempos:
+        cmd += ["-force_key_frames", tiempos]
+    cmd += [
+        "-f", "segment",
+        "-segment_times", tiempos or f"{rango + 1:.3f}",
+        "-segment_start_number", "1",
+        "-reset_timestamps", "1",
+        "-segment_format", "mp4",
+        "-segment_format_options", "movflags=+faststart",
+        "-progress", "pipe:1",
+        "-nostats",
+        patron,
+    ]
+
+    if log_fn:
+        log_fn(f"✂️ Generando {total_partes} partes en una sola pasada...")
+
+    estado = {"listas": 0}
+
+    def _on_progress(evento: dict):
+        listas = sum(1 for t in cortes if t <= evento["out_time"])
+        while estado["listas"] < listas:
+            estado["listas"] += 1
+            if log_fn:
+                idx = estado["listas"]
+                log_fn(f"✔ Video parte {idx}/{total_partes} listo: {paths[idx-1]}")
 
+    code, err, detenido = _ejecutar_ffmpeg_con_progreso(cmd, on_progress=_on_progress)
+    if detenido:
+        if log_fn:
+            log_fn("Proceso detenido por el usuario.")
+        # La parte en curso queda truncada: se descarta.
+        for path in paths[estado["listas"]:]:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception:
+                pass
+        return paths[:estado["listas"]]
+    if code != 0:
         if log_fn:
-            log_fn(f"âœ” Video parte {i+1}/{total_partes} listo: {out_path}")
+            log_fn(f"❌ Error dividiendo video (code {code}): {err[-400:]}")
+        return [p for p in paths if os.path.exists(p) and os.path.getsize(p) > 0]
 
-    return paths
+    _on_progress({"out_time": rango})
+    if log_fn:
+        log_fn(f"✔ Video parte {total_partes}/{total_partes} listo: {paths[-1]}")
+    return [p for p in paths if os.path.exists(p)]
 
 def dividir_video_vertical_individual(
     video_path: str,
@@ -672,11 +610,16 @@ def dividir_video_vertical_individual(
     total_partes: int | None = None,
     start_sec: float = 0.0,
     end_sec: float | None = None,
+    parte_vigente=None,
+    al_terminar_parte=None,
     log_fn=None
 ):
     """
     Divide un video en partes y genera versiones verticales 9:16 recortadas.
     posicion: C (centro), L (izquierda), R (derecha)
+    parte_vigente(out_path, inicio, duracion) -> bool: si es True la parte
+    se reutiliza sin renderizar. al_terminar_parte(out_path, inicio, duracion)
+    se llama tras generar cada parte.
     """
     asegurar_dir(out_dir)
     base_name = nombre_base_principal(video_path)
@@ -761,6 +704,11 @@ def dividir_video_vertical_individual(
             break
         duracion_parte = min(segundos_por_parte, max(0.1, end_sec - inicio))
         out_path = os.path.join(out_dir, f"{base_name}_parte_{i+1:03d}.mp4")
+        if parte_vigente and parte_vigente(out_path, inicio, duracion_parte):
+            if log_fn:
+                log_fn(f"⏭ Vertical parte {i+1}/{total_partes} vigente, se reutiliza")
+            paths.append(out_path)
+            continue
 
         if log_fn:
             log_fn(f"Generando vertical parte {i+1}/{total_partes}...")
@@ -778,88 +726,22 @@ def dividir_video_vertical_individual(
             "-c:v", "libx264",
             "-c:a", "aac",
             "-movflags", "+faststart",
-            "-progress", "pipe:1",
-            "-stats_period", "5",
             temp_path
         ]
-        progress = {"sec": 0.0}
-
-        def _read_stdout():
-            if not proc.stdout:
-                return
-            for raw in proc.stdout:
-                line = raw.strip()
-                if line.startswith("out_time_ms="):
-                    try:
-                        ms = int(line.split("=", 1)[1].strip())
-                        progress["sec"] = ms / 1_000_000.0
-                    except Exception:
-                        continue
+        ultimo = {"log": 0.0, "pct": -1}
 
-        def _read_stderr():
-            if not proc.stderr:
-                return
-            for raw in proc.stderr:
-                line = raw.strip()
-                if "time=" in line:
-                    import re as _re
-                    m = _re.search(r"time=([0-9:.]+)", line)
-                    if not m:
-                        continue
-                    t = m.group(1)
-                    try:
-                        parts = t.split(":")
-                        if len(parts) == 3:
-                            h, m_, s = parts
-                            sec = float(s) + int(m_) * 60 + int(h) * 3600
-                        elif len(parts) == 2:
-                            m_, s = parts
-                            sec = float(s) + int(m_) * 60
-                        else:
-                            sec = float(parts[0])
-                        progress["sec"] = sec
-                    except Exception:
-                        continue
-
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            bufsize=1,
-        )
-        t_out = threading.Thread(target=_read_stdout, daemon=True)
-        t_err = threading.Thread(target=_read_stderr, daemon=True)
-        t_out.start()
-        t_err.start()
-
-        last_log_time = 0.0
-        last_percent = -1
-        while proc.poll() is None:
+        def _on_progress(evento, idx=i):
             now = time.time()
-            if log_fn and progress["sec"] > 0 and (now - last_log_time >= 5):
-                pct = int(min(100.0, (progress["sec"] / duracion_parte) * 100.0))
-                if pct != last_percent:
-                    log_fn(f"Progreso parte {i+1}/{total_partes}: {pct}%")
-                    last_percent = pct
-                    last_log_time = now
-            time.sleep(0.2)
-
-        result_code = proc.wait()
-        try:
-            t_out.join(timeout=2)
-            t_err.join(timeout=2)
-        except Exception:
-            pass
-        try:
-            if proc.stdout:
-                proc.stdout.close()
-            if proc.stderr:
-                proc.stderr.close()
-        except Exception:
-            pass
+            if not log_fn or evento["progreso"] is None or now - ultimo["log"] < 5:
+                return
+            pct = int(evento["progreso"] * 100)
+            if pct != ultimo["pct"]:
+                eta = ffmpeg_runner.formato_eta(evento["eta"])
+                log_fn(f"Progreso parte {idx+1}/{total_partes}: {pct}% (ETA {eta})")
+                ultimo["pct"] = pct
+                ultimo["log"] = now
+
+        result = ffmpeg_runner.run(cmd, duracion=duracion_parte, on_progress=_on_progress)
         if stop_control.should_stop():
             if log_fn:
                 log_fn("Proceso detenido por el usuario.")
@@ -869,15 +751,9 @@ def dividir_video_vertical_individual(
             except Exception:
                 pass
             break
-        if result_code != 0:
+        if result.returncode != 0:
             if log_fn:
-                err = ""
-                try:
-                    if proc.stderr:
-                        err = (proc.stderr.read() or "").strip()
-                except Exception:
-                    err = ""
-                log_fn(f"Error ffmpeg en parte {i+1}: {err[-400:]}")
+                log_fn(f"Error ffmpeg en parte {i+1}: {(result.stderr or '').strip()[-400:]}")
             try:
                 if os.path.exists(out_path):
                     os.remove(out_path)
@@ -937,7 +813,7 @@ def dividir_video_vertical_individual(
                     "-t", f"{total_dur:.3f}",
                     out_path
                 ]
-                video_res = subprocess.run(cmd_outro, capture_output=True, text=True)
+                video_res = ffmpeg_runner.run(cmd_outro)
                 if video_res.returncode != 0:
                     if log_fn:
                         err = (video_res.stderr or "").strip()
@@ -956,7 +832,7 @@ def dividir_video_vertical_individual(
                         "-vn", "-acodec", "aac",
                         audio_path
                     ]
-                    extra_res = subprocess.run(extra_cmd, capture_output=True, text=True)
+                    extra_res = ffmpeg_runner.run(extra_cmd)
                     if extra_res.returncode != 0:
                         if log_fn:
                             err = (extra_res.stderr or "").strip()
@@ -977,7 +853,7 @@ def dividir_video_vertical_individual(
                         "-t", f"{total_dur:.3f}",
                         out_path + ".tmp.mp4"
                     ]
-                    mux_res = subprocess.run(mux_cmd, capture_output=True, text=True)
+                    mux_res = ffmpeg_runner.run(mux_cmd)
                     if mux_res.returncode != 0:
                         if log_fn:
                             err = (mux_res.stderr or "").strip()
@@ -1015,6 +891,8 @@ def dividir_video_vertical_individual(
                 pass
 
         paths.append(out_path)
+        if al_terminar_parte:
+            al_terminar_parte(out_path, inicio, duracion_parte)
         if log_fn:
             log_fn(f"Vertical parte {i+1}/{total_partes} lista: {out_path}")
 
@@ -1047,6 +925,12 @@ def dividir_audio_ffmpeg(
     else:
         total_partes = max(1, int(total_partes))
     paths = []
+    # Fuente MP3: los frames se copian tal cual en vez de recodificar.
+    stream_audio = probe_cache.primer_stream(audio_path, "audio") or {}
+    if stream_audio.get("codec_name") == "mp3":
+        codec_audio = ["-c:a", "copy"]
+    else:
+        codec_audio = ["-acodec", "libmp3lame", "-b:a", "192k"]
 
     for i in range(total_partes):
         if stop_control.should_stop():
@@ -1068,11 +952,14 @@ def dividir_audio_ffmpeg(
             "-ss", str(inicio),
             "-t", str(duracion_parte),
             "-vn",
-            "-acodec", "libmp3lame",
-            "-b:a", "192k",
+            *codec_audio,
             out_path
         ]
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        result = ffmpeg_runner.run(cmd)
+        if result.returncode != 0:
+            if log_fn and not stop_control.should_stop():
+                log_fn(f"❌ Error en audio parte {i+1}: {(result.stderr or '').strip()[-300:]}")
+            continue
         paths.append(out_path)
 
         if log_fn:
@@ -1086,15 +973,7 @@ def dividir_audio_ffmpeg_partes(audio_path: str, partes: int = 5, log_fn=None):
     Devuelve una lista con las rutas de los archivos resultantes.
     log_fn: funciÃ³n opcional para escribir logs en la interfaz.
     """
-    # Obtener duraciÃ³n del audio con ffprobe
-    cmd = [
-        "ffprobe", "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        audio_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    duracion = float(result.stdout.strip())
+    duracion = obtener_duracion_segundos(audio_path)
     duracion_segmento = duracion / partes
 
     base, _ = os.path.splitext(audio_path)
@@ -1121,7 +1000,11 @@ def dividir_audio_ffmpeg_partes(audio_path: str, partes: int = 5, log_fn=None):
             "-b:a", "192k",
             out_path
         ]
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        result = ffmpeg_runner.run(cmd)
+        if result.returncode != 0:
+            if log_fn and not stop_control.should_stop():
+                log_fn(f"❌ Error en fragmento {i+1}: {(result.stderr or '').strip()[-300:]}")
+            continue
 
         paths.append(out_path)
 
@@ -1192,6 +1075,29 @@ def combinar_srt_partes(srt_paths: list[str], offsets: list[float], out_path: st
         log_fn(f"SRT unido: {out_path}")
     return out_path
 
+def escribir_srt_segmentos(segmentos: list[dict], out_path: str, log_fn=None) -> str:
+    """
+    Escribe un SRT a partir de segmentos {"start", "end", "text"} (segundos).
+    """
+    blocks = []
+    for seg in segmentos:
+        text = (seg.get("text") or "").strip()
+        if not text:
+            continue
+        blocks.append(
+            f"{len(blocks) + 1}\n"
+            f"{_format_srt_time(seg['start'])} --> {_format_srt_time(seg['end'])}\n"
+            f"{text}"
+        )
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(blocks))
+    if log_fn:
+        log_fn(f"SRT unido: {out_path}")
+    return out_path
+
 def limpiar_temp(path: str):
     """
     Borra un archivo temporal si existe.
@@ -1227,16 +1133,18 @@ def guardar_resumen_rango(
         f.write(f"Partes generadas: {partes_generadas}\n")
     return path
 
-def generar_vertical_tiktok(
-    input_path: str,
-    output_path: str,
+def _grafo_vertical(
+    in_label: str,
+    out: str,
     orden: str = "LR",
     recorte_top: float = 0.12,
     recorte_bottom: float = 0.12,
-    log_fn=None
-):
+    crop_params: str | None = None,
+    prefix: str = "",
+) -> str:
     """
-    Crea un video vertical 9:16 (1080x1920) apilando izquierda/ derecha del original.
+    Filtergraph del vertical 9:16 (1080x1920): apila las mitades izquierda y
+    derecha de [in_label] en [out].
     """
     top_expr = "left" if orden.upper() == "LR" else "right"
     bottom_expr = "right" if orden.upper() == "LR" else "left"
@@ -1246,11 +1154,10 @@ def generar_vertical_tiktok(
     if recorte_total >= 0.9:
         recorte_top = 0.05
         recorte_bottom = 0.05
-    crop_params = detectar_crop_barras(input_path)
     if crop_params:
-        base_filter = f"[0:v]crop={crop_params}[base];"
+        base_filter = f"[{in_label}]crop={crop_params}[{prefix}base];"
     else:
-        base_filter = f"[0:v]crop=iw:ih*(1-{recorte_total}):0:ih*{recorte_top}[base];"
+        base_filter = f"[{in_label}]crop=iw:ih*(1-{recorte_total}):0:ih*{recorte_top}[{prefix}base];"
 
     recorte_total = recorte_top + recorte_bottom
     if recorte_total >= 0.9:
@@ -1258,26 +1165,46 @@ def generar_vertical_tiktok(
         recorte_bottom = 0.05
         recorte_total = recorte_top + recorte_bottom
 
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", input_path,
-        "-filter_complex",
+    return (
         # Quitar barras negras arriba/abajo si existen
         base_filter +
+        f"[{prefix}base]split=2[{prefix}base_l][{prefix}base_r];"
         # Mitades izquierda/derecha + recorte extra para quitar barras en cada mitad
-        f"[base]crop=iw/2:ih:0:0[left];"
-        f"[base]crop=iw/2:ih:iw/2:0[right];"
-        f"[left]crop=iw:ih*(1-{recorte_total}):0:ih*{recorte_top}[leftb];"
-        f"[right]crop=iw:ih*(1-{recorte_total}):0:ih*{recorte_top}[rightb];"
+        f"[{prefix}base_l]crop=iw/2:ih:0:0[{prefix}left];"
+        f"[{prefix}base_r]crop=iw/2:ih:iw/2:0[{prefix}right];"
+        f"[{prefix}left]crop=iw:ih*(1-{recorte_total}):0:ih*{recorte_top}[{prefix}leftb];"
+        f"[{prefix}right]crop=iw:ih*(1-{recorte_total}):0:ih*{recorte_top}[{prefix}rightb];"
         # Escalar a 1080x960 llenando (cover) y recortar excedente
-        "[leftb]scale=1080:960:force_original_aspect_ratio=increase,"
-        "crop=1080:960[leftc];"
-        "[rightb]scale=1080:960:force_original_aspect_ratio=increase,"
-        "crop=1080:960[rightc];"
-        f"[{top_expr}c][{bottom_expr}c]vstack=inputs=2,setsar=1[v]",
+        f"[{prefix}leftb]scale=1080:960:force_original_aspect_ratio=increase,"
+        f"crop=1080:960[{prefix}leftc];"
+        f"[{prefix}rightb]scale=1080:960:force_original_aspect_ratio=increase,"
+        f"crop=1080:960[{prefix}rightc];"
+        f"[{prefix}{top_expr}c][{prefix}{bottom_expr}c]vstack=inputs=2,setsar=1[{out}]"
+    )
+
+
+def generar_vertical_tiktok(
+    input_path: str,
+    output_path: str,
+    orden: str = "LR",
+    recorte_top: float = 0.12,
+    recorte_bottom: float = 0.12,
+    log_fn=None
+):
+    """
+    Crea un video vertical 9:16 (1080x1920) apilando izquierda/ derecha del original.
+    """
+    crop_params = detectar_crop_barras(input_path)
+    filtro = _grafo_vertical("0:v", "v", orden, recorte_top, recorte_bottom, crop_params)
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", input_path,
+        "-filter_complex", filtro,
         "-map", "[v]",
         "-map", "0:a?",
         "-c:v", "libx264",
+        *args_hilos(),
         "-c:a", "aac",
         "-movflags", "+faststart",
         output_path
@@ -1292,7 +1219,11 @@ def generar_vertical_tiktok(
             log_fn("🔀 Orden: personalizado")
         log_fn("✂️ Recortando mitades y ajustando barras...")
         log_fn("🧩 Apilando en formato 9:16...")
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = ffmpeg_runner.run(cmd)
+    if result.returncode != 0 and not stop_control.should_stop():
+        if log_fn:
+            log_fn(f"❌ Vertical falló: {(result.stderr or '').strip()[-300:]}")
+        raise RuntimeError("No se pudo generar el video vertical.")
 
 def obtener_expresion_overlay(posicion: str, margen: int = 10) -> str:
     """
@@ -1307,6 +1238,52 @@ def obtener_expresion_overlay(posicion: str, margen: int = 10) -> str:
     return f"(W-w)/2:(H-h)/2"
 
 
+def _grafo_onda(
+    audio_in: str,
+    out: str | None,
+    width: int,
+    height: int,
+    estilo: str,
+    color: str,
+    duration: float,
+    margen_horizontal: int = 0,
+    exposicion: float = 0.0,
+    contraste: float = 1.0,
+    saturacion: float = 1.0,
+    temperatura: float = 0.0,
+    prefix: str = "",
+) -> str:
+    """
+    Filtergraph de la onda sobre fondo transparente a partir de [audio_in].
+    Con out=None la ultima salida queda sin etiquetar (salida implicita).
+    """
+    temp_filter = ""
+    if abs(temperatura) > 1e-3:
+        gs = temperatura / 2.0
+        temp_filter = f",colorbalance=rs={temperatura:.3f}:gs={gs:.3f}:bs={-temperatura:.3f}"
+
+    waves_adjust = (
+        f"[{prefix}waves]eq=brightness={exposicion:.3f}:contrast={contraste:.3f}:saturation={saturacion:.3f}"
+        f"{temp_filter}[{prefix}waves_rgba];"
+    )
+
+    margen = max(0, int(margen_horizontal))
+    out_label = f"[{out}]" if out else ""
+    pad_filter = (
+        f"[{prefix}over]pad=iw+{margen*2}:ih:{margen}:0:color=0x00000000[{prefix}pad];[{prefix}pad]format=rgba{out_label}"
+        if margen > 0 else
+        f"[{prefix}over]format=rgba{out_label}"
+    )
+    return (
+        f"[{audio_in}]aformat=channel_layouts=mono,{estilo}=s={width}x{height}:mode=line:colors={color}[{prefix}waves];"
+        f"{waves_adjust}"
+        f"color=color=0x00000000:s={width}x{height}:d={duration:.3f}[{prefix}base];"
+        f"[{prefix}base]format=rgba[{prefix}bg];"
+        f"[{prefix}bg][{prefix}waves_rgba]overlay=format=auto:shortest=1[{prefix}over];"
+        f"{pad_filter}"
+    )
+
+
 def generar_visualizador_audio(
     audio_path: str,
     output_path: str,
@@ -1320,10 +1297,14 @@ def generar_visualizador_audio(
     contraste: float = 1.0,
     saturacion: float = 1.0,
     temperatura: float = 0.0,
-    log_fn=None
+    log_fn=None,
+    inicio: float = 0.0,
+    duracion: float | None = None,
 ):
     """
     Genera un video de visualizador con fondo transparente a partir de un audio.
+    Con inicio/duracion se genera solo ese tramo, leyendo el audio original
+    con -ss/-t (sin extraer un archivo de audio por tramo).
     """
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"No se encontró el audio del visualizador: {audio_path}")
@@ -1340,47 +1321,69 @@ def generar_visualizador_audio(
     color = (color or "#FFFFFF").strip()
     if not color.startswith("#"):
         color = "#" + color
-    duration = obtener_duracion_segundos(audio_path)
+    inicio = max(0.0, float(inicio or 0.0))
+    duration = obtener_duracion_segundos(audio_path) - inicio
+    if duracion is not None:
+        duration = min(duration, float(duracion))
     if duration <= 0:
         duration = 0.1
     exposicion = max(-1.0, min(1.0, float(exposicion)))
     contraste = max(0.2, min(2.5, float(contraste)))
     saturacion = max(0.0, min(3.0, float(saturacion)))
     temperatura = max(-1.0, min(1.0, float(temperatura)))
-
-    temp_filter = ""
-    if abs(temperatura) > 1e-3:
-        gs = temperatura / 2.0
-        temp_filter = f",colorbalance=rs={temperatura:.3f}:gs={gs:.3f}:bs={-temperatura:.3f}"
-
-    waves_adjust = (
-        f"[waves]eq=brightness={exposicion:.3f}:contrast={contraste:.3f}:saturation={saturacion:.3f}"
-        f"{temp_filter}[waves_rgba];"
-    )
-
-    margen = max(0, int(margen_horizontal))
-    pad_filter = (
-        f"[over]pad=iw+{margen*2}:ih:{margen}:0:color=0x00000000[pad];[pad]format=rgba"
-        if margen > 0 else
-        "[over]format=rgba"
-    )
-    filter_complex = (
-        f"[0:a]aformat=channel_layouts=mono,{estilo}=s={width}x{height}:mode=line:colors={color}[waves];"
-        f"{waves_adjust}"
-        f"color=color=0x00000000:s={width}x{height}:d={duration:.3f}[base];"
-        "[base]format=rgba[bg];"
-        "[bg][waves_rgba]overlay=format=auto:shortest=1[over];"
-        f"{pad_filter}"
-    )
     salida_dir = os.path.dirname(output_path)
     if salida_dir:
         asegurar_dir(salida_dir)
+
+    if onda.habilitado(estilo):
+        if log_fn:
+            log_fn(f"🎚 Generando visualizador ({os.path.basename(output_path)})")
+        try:
+            return onda.renderizar_onda(
+                audio_path,
+                output_path,
+                width,
+                height,
+                color,
+                fps,
+                margen_horizontal,
+                exposicion,
+                contraste,
+                saturacion,
+                temperatura,
+                inicio=inicio,
+                duracion=duration if duracion is not None else None,
+            )
+        except RuntimeError as exc:
+            if stop_control.should_stop():
+                raise
+            if log_fn:
+                log_fn(f"⚠️ Render NumPy de la onda falló ({exc}); usando filtros de ffmpeg.")
+
+    filter_complex = _grafo_onda(
+        "0:a",
+        None,
+        width,
+        height,
+        estilo,
+        color,
+        duration,
+        margen_horizontal,
+        exposicion,
+        contraste,
+        saturacion,
+        temperatura,
+    )
+    entrada = ["-i", audio_path]
+    if inicio > 0:
+        entrada = ["-ss", f"{inicio:.3f}"] + entrada
+    if duracion is not None:
+        entrada += ["-t", f"{duration:.3f}"]
     cmd = [
         "ffmpeg", "-y",
-        "-i", audio_path,
+        *entrada,
         "-filter_complex", filter_complex,
-        "-pix_fmt", "yuva420p",
-        "-c:v", "libx264",
+        *onda.args_video_onda(output_path),
         "-r", str(fps),
         "-an",
         "-shortest",
@@ -1388,7 +1391,7 @@ def generar_visualizador_audio(
     ]
     if log_fn:
         log_fn(f"🎚 Generando visualizador ({os.path.basename(output_path)})")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd)
     if result.returncode != 0:
         if log_fn:
             err = (result.stderr or "").strip()
@@ -1397,6 +1400,28 @@ def generar_visualizador_audio(
     return output_path
 
 
+def _grafo_overlay_visualizador(
+    video_in: str,
+    vis_in: str,
+    out: str | None,
+    posicion: str = "centro",
+    margen: int = 10,
+    opacidad: float = 0.75,
+    prefix: str = "",
+) -> str:
+    """
+    Filtergraph que superpone [vis_in] sobre [video_in] con la opacidad dada.
+    """
+    overlay_expr = obtener_expresion_overlay(posicion, margen)
+    opacidad = max(0.0, min(1.0, float(opacidad)))
+    out_label = f"[{out}]" if out else ""
+    return (
+        f"[{vis_in}]format=rgba,colorchannelmixer=aa={opacidad}[{prefix}vis];"
+        f"[{video_in}][{prefix}vis]overlay={overlay_expr}:format=auto:shortest=1[{prefix}over];"
+        f"[{prefix}over]format=yuv420p{out_label}"
+    )
+
+
 def overlay_visualizador(
     video_path: str,
     visual_path: str,
@@ -1417,23 +1442,7 @@ def overlay_visualizador(
     salida_dir = os.path.dirname(output_path)
     if salida_dir:
         asegurar_dir(salida_dir)
-    overlay_expr = obtener_expresion_overlay(posicion, margen)
-    opacidad = max(0.0, min(1.0, float(opacidad)))
-    blend = (modo_combinacion or "lighten").strip().lower()
-    blend_map = {
-        "normal": "normal",
-        "darken": "darken",
-        "multiply": "multiply",
-        "lighten": "lighten",
-        "screen": "screen",
-        "overlay": "overlay",
-    }
-    blend_mode = blend_map.get(blend, "lighten")
-    filtro = (
-        f"[1:v]format=rgba,colorchannelmixer=aa={opacidad}[vis];"
-        f"[0:v][vis]overlay={overlay_expr}:format=auto:shortest=1[over];"
-        f"[over]format=yuv420p"
-    )
+    filtro = _grafo_overlay_visualizador("0:v", "1:v", None, posicion, margen, opacidad)
     cmd = [
         "ffmpeg", "-y",
         "-i", video_path,
@@ -1441,13 +1450,14 @@ def overlay_visualizador(
         "-filter_complex", filtro,
         "-map", "0:a?",
         "-c:v", "libx264",
+        *args_hilos(),
         "-c:a", "aac",
         "-movflags", "+faststart",
         output_path
     ]
     if log_fn:
         log_fn(f"🧩 Aplicando overlay del visualizador ({posicion})")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd)
     if result.returncode != 0:
         if log_fn:
             err = (result.stderr or "").strip()
@@ -1456,6 +1466,28 @@ def overlay_visualizador(
     return output_path
 
 
+def _grafo_imagen_temporizada(
+    video_in: str,
+    img_in: str,
+    out: str,
+    start_sec: float,
+    duration: float,
+    zoom: float = 1.0,
+    prefix: str = "",
+) -> str:
+    """
+    Filtergraph que muestra [img_in] centrada sobre [video_in] entre
+    start_sec y start_sec + duration.
+    """
+    zoom = max(0.1, min(float(zoom or 1.0), 3.0))
+    enable_expr = f"between(t,{max(0, start_sec):.3f},{start_sec+duration:.3f})"
+    return (
+        f"[{img_in}]format=rgba[{prefix}imgsrc];"
+        f"[{prefix}imgsrc][{video_in}]scale2ref=w=iw*{zoom:.3f}:h=ih*{zoom:.3f}:force_original_aspect_ratio=decrease[{prefix}img][{prefix}base];"
+        f"[{prefix}base][{prefix}img]overlay=x=(W-w)/2:y=(H-h)/2:enable='{enable_expr}'[{out}]"
+    )
+
+
 def overlay_image_temporizada(
     video_path: str,
     image_path: str,
@@ -1471,13 +1503,7 @@ def overlay_image_temporizada(
         raise FileNotFoundError(f"No se encontró la imagen overlay: {image_path}")
     if duration <= 0:
         raise ValueError("La duración del overlay debe ser mayor que cero.")
-    zoom = max(0.1, min(float(zoom or 1.0), 3.0))
-    enable_expr = f"between(t,{max(0, start_sec):.3f},{start_sec+duration:.3f})"
-    filtro = (
-        f"[1:v]format=rgba[imgsrc];"
-        f"[imgsrc][0:v]scale2ref=w=iw*{zoom:.3f}:h=ih*{zoom:.3f}:force_original_aspect_ratio=decrease[img][base];"
-        f"[base][img]overlay=x=(W-w)/2:y=(H-h)/2:enable='{enable_expr}'[v]"
-    )
+    filtro = _grafo_imagen_temporizada("0:v", "1:v", "v", start_sec, duration, zoom)
     salida_dir = os.path.dirname(output_path)
     if salida_dir:
         asegurar_dir(salida_dir)
@@ -1490,6 +1516,7 @@ def overlay_image_temporizada(
         "-map", "[v]",
         "-map", "0:a?",
         "-c:v", "libx264",
+        *args_hilos(),
         "-c:a", "aac",
         "-pix_fmt", "yuv420p",
         "-movflags", "+faststart",
@@ -1502,7 +1529,7 @@ def overlay_image_temporizada(
         log_fn(f"Salida: {output_path}")
     if log_fn:
         log_fn("▶️ Ejecutando ffmpeg para overlay de imagen...")
-    result = subprocess.run(cmd, capture_output=True, text=False)
+    result = ffmpeg_runner.run(cmd, text=False)
     if result.returncode != 0:
         err = ""
         out = ""
@@ -1568,7 +1595,7 @@ def append_image_outro(
     ]
     if log_fn:
         log_fn(f"🧩 Agregando imagen final por {duration:.2f}s")
-    result = subprocess.run(cmd, capture_output=True, text=False)
+    result = ffmpeg_runner.run(cmd, text=False)
     if result.returncode != 0:
         err = ""
         try:
@@ -1607,12 +1634,10 @@ def _create_temp_text_file(text: str) -> str:
         f.write(text)
     return _escape_filter_path(path)
 
-def aplicar_fondo_imagen(
-    input_path: str,
-    output_path: str,
+def _preparar_fondo(
     imagen_path: str,
+    target_size: tuple[int, int],
     estilo: str = "fill",
-    target_size: tuple[int, int] | None = None,
     fg_scale: float = 0.92,
     inset_pct: tuple[float, float, float, float] | None = None,
     fg_zoom: float = 1.0,
@@ -1620,18 +1645,14 @@ def aplicar_fondo_imagen(
     mensajes: list[dict] | None = None,
     bg_crop_top: float = 0.0,
     bg_crop_bottom: float = 0.0,
-    log_fn=None
-):
+) -> dict:
     """
-    Aplica una imagen de fondo a un video.
-    estilos: fill | fit | blur
+    Normaliza los parametros del fondo y renderiza cintas/mensajes a un PNG.
     """
     estilo = (estilo or "fill").lower()
     if estilo not in ("fill", "fit", "blur"):
         estilo = "fill"
 
-    if target_size is None:
-        target_size = obtener_tamano_video(input_path)
     w, h = target_size
     # ffmpeg/libx264 requiere dimensiones pares
     if w % 2 != 0:
@@ -1675,23 +1696,12 @@ def aplicar_fondo_imagen(
 
     overlay_path = None
     if mensajes or cintas:
-        overlay = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        overlay_path = os.path.join(tempfile.gettempdir(), f"overlay_{uuid.uuid4().hex}.png")
-        if mensajes:
-            tmp_msg = _render_mensajes_on_background(imagen_path, w, h, mensajes, transparent=True)
-            if not tmp_msg:
-                raise RuntimeError("No se pudo renderizar mensaje con Pillow.")
-            msg_img = Image.open(tmp_msg).convert("RGBA")
-            overlay.alpha_composite(msg_img)
-        if cintas:
-            tmp_c = _render_cintas_on_background(imagen_path, w, h, cintas, transparent=True)
-            if not tmp_c:
-                raise RuntimeError("No se pudo renderizar cintas con Pillow.")
-            c_img = Image.open(tmp_c).convert("RGBA")
-            overlay.alpha_composite(c_img)
-        overlay.save(overlay_path, "PNG")
-
-    bg_filter_part = f"[0:v]scale={w}:{h}"
+        # Una vez por configuracion: todas las partes reutilizan el mismo PNG.
+        try:
+            overlay_path = composicion.png_capa(w, h, cintas, mensajes, FONDOS_CACHE_DIR)
+        except Exception as exc:
+            raise RuntimeError(f"No se pudo renderizar cintas/mensajes con Pillow ({exc}).") from exc
+
     try:
         bg_crop_top = float(bg_crop_top)
         bg_crop_bottom = float(bg_crop_bottom)
@@ -1700,53 +1710,173 @@ def aplicar_fondo_imagen(
         bg_crop_bottom = 0.0
     bg_crop_top = max(0.0, min(bg_crop_top, 0.45))
     bg_crop_bottom = max(0.0, min(bg_crop_bottom, 0.45))
-    bg_crop_total = bg_crop_top + bg_crop_bottom
+
+    fondo = {
+        "estilo": estilo,
+        "w": w,
+        "h": h,
+        "fg_w": fg_w,
+        "fg_h": fg_h,
+        "offset_x": offset_x,
+        "offset_y": offset_y,
+        "overlay_path": overlay_path,
+        "bg_crop_top": bg_crop_top,
+        "bg_crop_bottom": bg_crop_bottom,
+    }
+    fondo["bg_path"] = _prerenderizar_fondo(imagen_path, fondo)
+    return fondo
+
+
+def _huella_json(valor) -> str:
+    data = json.dumps(valor, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def _cadena_fondo(fondo: dict) -> str:
+    """
+    Escalado, recorte y blur de la imagen de fondo (sin etiquetas).
+    """
+    w, h = fondo["w"], fondo["h"]
+    cadena = f"scale={w}:{h}"
+    bg_crop_total = fondo["bg_crop_top"] + fondo["bg_crop_bottom"]
     if bg_crop_total > 0:
         crop_h_expr = f"trunc(ih*(1-{bg_crop_total:.4f})/2)*2"
-        crop_y_expr = f"trunc(ih*{bg_crop_top:.4f}/2)*2"
-        bg_filter_part += f",crop=iw:{crop_h_expr}:0:{crop_y_expr},scale={w}:{h}"
-
-    if estilo == "blur":
-        filtro = (
-            f"{bg_filter_part},boxblur=20:1[bg];"
-            f"[1:v]scale={fg_w}:{fg_h}:force_original_aspect_ratio=decrease[fg];"
-            f"[bg][fg]overlay={offset_x}:{offset_y},setsar=1[v]"
-        )
-    elif estilo == "fit":
-        filtro = (
-            f"{bg_filter_part}[bg];"
-            f"[1:v]scale={fg_w}:{fg_h}:force_original_aspect_ratio=decrease[fg];"
-            f"[bg][fg]overlay={offset_x}:{offset_y},setsar=1[v]"
-        )
-    else:  # fill
-        filtro = (
-            f"{bg_filter_part}[bg];"
-            f"[1:v]scale={fg_w}:{fg_h}:force_original_aspect_ratio=decrease[fg];"
-            f"[bg][fg]overlay={offset_x}:{offset_y},setsar=1[v]"
-        )
+        crop_y_expr = f"trunc(ih*{fondo['bg_crop_top']:.4f}/2)*2"
+        cadena += f",crop=iw:{crop_h_expr}:0:{crop_y_expr},scale={w}:{h}"
+    if fondo["estilo"] == "blur":
+        cadena += ",boxblur=20:1"
+    return cadena
+
+
+def _prerenderizar_fondo(imagen_path: str, fondo: dict) -> str | None:
+    """
+    Renderiza una sola vez el fondo final (escalado/recortado/blur) al tamano
+    de salida y lo cachea por configuracion. None si no se pudo (se usa el
+    grafo completo por frame).
+    """
+    try:
+        st = os.stat(imagen_path)
+    except OSError:
+        return None
+    clave = _huella_json([
+        os.path.abspath(imagen_path), st.st_size, st.st_mtime_ns, _cadena_fondo(fondo),
+    ])
+    out_path = os.path.join(FONDOS_CACHE_DIR, f"fondo_{clave}.png")
+    if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
+        return out_path
+    asegurar_dir(FONDOS_CACHE_DIR)
+    tmp_path = os.path.join(FONDOS_CACHE_DIR, f"fondo_{clave}.{uuid.uuid4().hex}.png")
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", imagen_path,
+        "-vf", _cadena_fondo(fondo),
+        "-frames:v", "1",
+        tmp_path
+    ]
+    result = ffmpeg_runner.run(cmd)
+    if result.returncode != 0 or not os.path.exists(tmp_path):
+        limpiar_temp(tmp_path)
+        return None
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _entradas_fondo(fondo: dict) -> tuple[list[str], list[str] | None]:
+    """
+    Argumentos ffmpeg de las entradas del fondo y del PNG de cintas/mensajes.
+    Las imagenes ya renderizadas se leen una vez y se repiten en memoria
+    (filtro loop en _grafo_fondo) en vez de decodificarse en cada frame.
+    """
+    if fondo.get("bg_path"):
+        bg = ["-i", fondo["bg_path"]]
+    else:
+        bg = ["-loop", "1", "-i", fondo["path"]]
+    overlay = ["-i", fondo["overlay_path"]] if fondo.get("overlay_path") else None
+    return bg, overlay
+
+
+def _grafo_fondo(fondo: dict, bg_in: str, fg_in: str, out: str, overlay_in: str | None = None, prefix: str = "") -> str:
+    """
+    Filtergraph del fondo: [bg_in] imagen de fondo, [fg_in] video y
+    [overlay_in] PNG de cintas/mensajes (opcional). Produce [out].
+    Las entradas salen de _entradas_fondo: con el fondo pre-renderizado por
+    frame solo se escala el video y se superponen las imagenes.
+    """
+    if fondo.get("bg_path"):
+        bg_filter_part = f"[{bg_in}]loop=loop=-1:size=1"
+    else:
+        bg_filter_part = f"[{bg_in}]{_cadena_fondo(fondo)}"
 
+    compuesto = f"{prefix}base" if overlay_in else out
+    filtro = (
+        f"{bg_filter_part}[{prefix}bg];"
+        f"[{fg_in}]scale={fondo['fg_w']}:{fondo['fg_h']}:force_original_aspect_ratio=decrease[{prefix}fg];"
+        f"[{prefix}bg][{prefix}fg]overlay={fondo['offset_x']}:{fondo['offset_y']}:shortest=1,setsar=1[{compuesto}]"
+    )
     # Cintas y mensajes renderizados en overlay PNG (frente).
+    if overlay_in:
+        filtro += (
+            f";[{overlay_in}]loop=loop=-1:size=1[{prefix}ov]"
+            f";[{compuesto}][{prefix}ov]overlay=0:0:format=auto:shortest=1[{out}]"
+        )
+    return filtro
+
+
+def aplicar_fondo_imagen(
+    input_path: str,
+    output_path: str,
+    imagen_path: str,
+    estilo: str = "fill",
+    target_size: tuple[int, int] | None = None,
+    fg_scale: float = 0.92,
+    inset_pct: tuple[float, float, float, float] | None = None,
+    fg_zoom: float = 1.0,
+    cintas: list[dict] | None = None,
+    mensajes: list[dict] | None = None,
+    bg_crop_top: float = 0.0,
+    bg_crop_bottom: float = 0.0,
+    log_fn=None
+):
+    """
+    Aplica una imagen de fondo a un video.
+    estilos: fill | fit | blur
+    """
+    if target_size is None:
+        target_size = obtener_tamano_video(input_path)
+    fondo = _preparar_fondo(
+        imagen_path,
+        target_size,
+        estilo=estilo,
+        fg_scale=fg_scale,
+        inset_pct=inset_pct,
+        fg_zoom=fg_zoom,
+        cintas=cintas,
+        mensajes=mensajes,
+        bg_crop_top=bg_crop_top,
+        bg_crop_bottom=bg_crop_bottom,
+    )
+    fondo["path"] = imagen_path
+    bg_args, overlay_args = _entradas_fondo(fondo)
 
-    cmd = ["ffmpeg", "-y", "-loop", "1", "-i", imagen_path, "-i", input_path]
-    if overlay_path:
-        cmd += ["-loop", "1", "-i", overlay_path]
-        filtro = filtro.replace("[v]", "[base]")
-        filtro = filtro.replace("[bg][fg]overlay=", "[bg][fg]overlay=")
-        filtro += ";[base][2:v]overlay=0:0:format=auto[v]"
+    cmd = ["ffmpeg", "-y", *bg_args, "-i", input_path]
+    if overlay_args:
+        cmd += overlay_args
+    filtro = _grafo_fondo(fondo, "0:v", "1:v", "v", overlay_in="2:v" if overlay_args else None)
     cmd += [
         "-filter_complex", filtro,
         "-map", "[v]",
         "-map", "1:a?",
         "-shortest",
         "-c:v", "libx264",
+        *args_hilos(),
         "-c:a", "aac",
         "-movflags", "+faststart",
         output_path
     ]
     if log_fn:
-        log_fn(f"🖼️ Aplicando fondo ({estilo}): {os.path.basename(output_path)}")
+        log_fn(f"🖼️ Aplicando fondo ({fondo['estilo']}): {os.path.basename(output_path)}")
         log_fn(f"Filtro fondo: {filtro}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd)
     if result.returncode != 0 and log_fn:
         err = (result.stderr or "").strip()
         log_fn(f"❌ Fondo falló: {err[-1000:]}")
@@ -1782,7 +1912,7 @@ def detectar_crop_barras(path: str) -> str | None:
             "-vf", "cropdetect=12:16:0",
             "-f", "null", "NUL"
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = ffmpeg_runner.run(cmd)
         salida = result.stderr or ""
         matches = re.findall(r"crop=\\d+:\\d+:\\d+:\\d+", salida)
         if not matches:
@@ -1933,7 +2063,7 @@ def quemar_srt_en_video(
                 "-i", srt_use_path,
                 tmp_ass
             ]
-            conv_res = subprocess.run(conv_cmd, capture_output=True, text=True)
+            conv_res = ffmpeg_runner.run(conv_cmd)
             if log_fn and conv_res.returncode != 0:
                 log_fn(f"ASS convert error: {(conv_res.stderr or '')[-300:]}")
             ass_lines = []
@@ -2023,7 +2153,7 @@ def quemar_srt_en_video(
     ]
     if log_fn:
         log_fn(f"Quemando SRT: {os.path.basename(output_path)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = ffmpeg_runner.run(cmd)
     if result.returncode != 0:
         err = (result.stderr or "").strip()
         if log_fn:
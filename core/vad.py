@@ -0,0 +1,146 @@
+"""
+Segmentacion por actividad de voz para transcripcion.
+
+Calcula una envolvente RMS vectorizada sobre el PCM de core.pcm, marca como
+voz las ventanas por encima de un umbral adaptativo (piso de ruido + margen)
+y arma tramos que terminan en pausas. Los silencios largos quedan fuera de
+los tramos, asi Whisper no procesa silencio ni corta palabras al medio.
+"""
+
+import numpy as np
+
+from core.pcm import SAMPLE_RATE
+
+VENTANA_SEG = 0.03
+BLOQUE_SEG = 60.0
+
+
+def envolvente_rms(audio: np.ndarray, ventana: float = VENTANA_SEG) -> np.ndarray:
+    """
+    RMS por ventana (en dBFS). Se procesa por bloques para no duplicar en
+    memoria audios largos abiertos con memmap.
+    """
+    frame = max(1, int(round(ventana * SAMPLE_RATE)))
+    n = len(audio) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames_bloque = max(1, int(BLOQUE_SEG * SAMPLE_RATE) // frame)
+    rms = np.empty(n, dtype=np.float32)
+    for i in range(0, n, frames_bloque):
+        j = min(n, i + frames_bloque)
+        bloque = np.asarray(audio[i * frame:j * frame], dtype=np.float32).reshape(j - i, frame)
+        rms[i:j] = np.sqrt(np.mean(np.square(bloque), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def _rachas(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Inicios y fines (exclusivos) de las rachas True de mask.
+    """
+    bordes = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(bordes == 1), np.flatnonzero(bordes == -1)
+
+
+def detectar_voz(
+    audio: np.ndarray,
+    margen_db: float = 10.0,
+    umbral_min_db: float = -50.0,
+    pausa_min: float = 0.3,
+    voz_min: float = 0.1,
+) -> list[tuple[float, float]]:
+    """
+    Regiones de voz (inicio, fin) en segundos. Pausas mas cortas que
+    pausa_min se unen a la region; regiones mas cortas que voz_min se
+    descartan como ruido.
+    """
+    db = envolvente_rms(audio)
+    if not len(db):
+        return []
+    piso, techo = (float(v) for v in np.percentile(db, [10, 90]))
+    if techo < umbral_min_db:
+        return []
+    if techo - piso < margen_db:
+        # Sin pausas marcadas (voz o musica continua): todo es voz.
+        return [(0.0, len(db) * VENTANA_SEG)]
+    umbral = max(piso + margen_db, umbral_min_db)
+    inicios, fines = _rachas(db > umbral)
+    if not len(inicios):
+        return []
+
+    frames_pausa = pausa_min / VENTANA_SEG
+    regiones = []
+    a, b = int(inicios[0]), int(fines[0])
+    for ini, fin in zip(inicios[1:], fines[1:]):
+        if ini - b < frames_pausa:
+            b = int(fin)
+            continue
+        regiones.append((a, b))
+        a, b = int(ini), int(fin)
+    regiones.append((a, b))
+
+    frames_voz = voz_min / VENTANA_SEG
+    return [(a * VENTANA_SEG, b * VENTANA_SEG) for a, b in regiones if b - a >= frames_voz]
+
+
+def _corte_mas_silencioso(db: np.ndarray, desde: float, hasta: float) -> float:
+    a = max(0, int(desde / VENTANA_SEG))
+    b = min(len(db), max(a + 1, int(hasta / VENTANA_SEG)))
+    return (a + int(np.argmin(db[a:b]))) * VENTANA_SEG
+
+
+def segmentar_por_pausas(
+    audio: np.ndarray,
+    largo_objetivo: float = 600.0,
+    largo_minimo: float = 120.0,
+    silencio_largo: float = 2.0,
+    silencio_max: float = 15.0,
+    relleno: float = 0.2,
+) -> list[tuple[float, float]]:
+    """
+    Tramos (inicio, fin) en segundos para transcribir:
+    - cada tramo termina en una pausa entre regiones de voz
+    - se cierra al superar largo_objetivo, ante un silencio de mas de
+      silencio_largo si ya dura largo_minimo, o ante cualquier silencio de
+      mas de silencio_max (el silencio queda afuera)
+    - una region de voz sin pausas mas larga que 1.5x largo_objetivo se
+      parte en su ventana mas silenciosa
+    """
+    regiones = detectar_voz(audio)
+    if not regiones:
+        return []
+    total = len(audio) / SAMPLE_RATE
+    db = None
+
+    # Partir regiones demasiado largas (musica, voz sin pausas).
+    partidas = []
+    for a, b in regiones:
+        while b - a > 1.5 * largo_objetivo:
+            if db is None:
+                db = envolvente_rms(audio)
+            corte = _corte_mas_silencioso(db, a + 0.8 * largo_objetivo, a + 1.2 * largo_objetivo)
+            partidas.append((a, corte))
+            a = corte
+        partidas.append((a, b))
+
+    tramos = []
+    inicio, fin = partidas[0]
+    for a, b in partidas[1:]:
+        silencio = a - fin
+        largo = fin - inicio
+        if (
+            b - inicio > largo_objetivo
+            or silencio > silencio_max
+            or (silencio > silencio_largo and largo >= largo_minimo)
+        ):
+            tramos.append((inicio, fin))
+            inicio = a
+        fin = b
+    tramos.append((inicio, fin))
+
+    # Relleno en los bordes sin pisar el tramo vecino.
+    resultado = []
+    for i, (a, b) in enumerate(tramos):
+        previo = resultado[-1][1] if resultado else 0.0
+        limite = (b + tramos[i + 1][0]) / 2 if i + 1 < len(tramos) else total
+        resultado.append((max(previo, a - relleno), min(limite, b + relleno)))
+    return resultado
@@ -2,14 +2,38 @@ from __future__ import annotations
 
 import os
 import re
-from typing import Optional, Tuple
+from typing import Optional
 
-from core.extractor import extraer_audio
-from core.transcriber import transcribir, transcribir_srt
-from core.utils import output_base_dir, output_subtitulados_dir
+from core import transcript_store
+from core.transcriber import transcribir_resultado
+from core.utils import escribir_srt_segmentos, output_subtitulados_dir
 
 MAX_TRANSCRIPTION_CHARS = 9000
-DEFAULT_SRT_MODEL = "base"
+DEFAULT_MODEL = "small"
+
+
+def obtener_segmentos_para_video(
+    video_path: str,
+    idioma: str = "es",
+    logs=None,
+    model_size: str = DEFAULT_MODEL,
+) -> list[dict]:
+    """
+    Segmentos de la transcripcion del video. Se reutiliza la guardada en
+    core.transcript_store (propia o recortada de la fuente del corte); si no
+    hay, se transcribe una vez con tiempos por palabra y se guarda.
+    """
+    segmentos = transcript_store.buscar(video_path, idioma=idioma)
+    if segmentos is not None:
+        if logs:
+            logs("Usando transcripción guardada...")
+        return segmentos
+    if logs:
+        logs("Transcribiendo video...")
+    resultado = transcribir_resultado(video_path, idioma=idioma, model_size=model_size, palabras=True)
+    segmentos = transcript_store.segmentos_de_resultado(resultado)
+    transcript_store.guardar(video_path, segmentos, idioma=idioma or resultado.get("language", ""), modelo=model_size)
+    return segmentos
 
 
 def obtener_transcripcion_para_video(
@@ -17,10 +41,11 @@ def obtener_transcripcion_para_video(
     idioma: str = "es",
     logs=None,
     max_chars: int = MAX_TRANSCRIPTION_CHARS,
+    segmentos: list[dict] | None = None,
 ) -> str:
-    if logs:
-        logs("Transcribiendo video para IA...")
-    texto = transcribir(video_path, idioma=idioma, model_size="small")
+    if segmentos is None:
+        segmentos = obtener_segmentos_para_video(video_path, idioma, logs=logs)
+    texto = transcript_store.texto(segmentos)
     if not texto:
         raise RuntimeError("La transcripción no devolvió texto válido.")
     if len(texto) > max_chars:
@@ -30,38 +55,27 @@ def obtener_transcripcion_para_video(
     return texto
 
 
-def extraer_audio_y_subtitulos(
+def generar_srt_para_video(
     video_path: str,
-    idioma: str,
+    idioma: str = "es",
     logs=None,
-    model_size: str = DEFAULT_SRT_MODEL,
-) -> Tuple[str, Optional[str]]:
-    base_dir = output_base_dir(video_path)
-    audio_dir = os.path.join(base_dir, "audios")
-    os.makedirs(audio_dir, exist_ok=True)
+    segmentos: list[dict] | None = None,
+) -> Optional[str]:
+    """
+    Escribe el SRT del video (en output_subtitulados_dir) a partir de la
+    misma transcripcion que usa la IA.
+    """
     video_name = os.path.splitext(os.path.basename(video_path))[0]
     safe_name = re.sub(r"[<>:\"/\\|?*]", "_", video_name)
-    audio_name = f"{safe_name}_whatsapp_audio.mp3"
-    audio_path = os.path.join(audio_dir, audio_name)
-    if os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
-        if logs:
-            logs(f"Usando audio existente para subtítulos: {audio_path}")
-    else:
-        extraer_audio(video_path, audio_path, log_fn=logs)
-
-    subs_dir = output_subtitulados_dir(video_path)
-    os.makedirs(subs_dir, exist_ok=True)
-    srt_path = None
+    srt_path = os.path.join(output_subtitulados_dir(video_path), f"{safe_name}.srt")
     try:
-        srt_path = transcribir_srt(
-            audio_path,
-            subs_dir,
-            idioma=idioma,
-            model_size=model_size,
-        )
+        if segmentos is None:
+            segmentos = obtener_segmentos_para_video(video_path, idioma, logs=logs)
+        escribir_srt_segmentos(segmentos, srt_path)
         if logs:
             logs(f"SRT generado: {srt_path}")
+        return srt_path
     except Exception as exc:
         if logs:
             logs(f"Advertencia: no se pudo generar el SRT ({exc})")
-    return audio_path, srt_path
+        return None
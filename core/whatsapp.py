@@ -7,10 +7,10 @@ import time
 from pathlib import Path
 from typing import Iterable, Sequence
 
-import requests
-
+from core import http_client
 from core.video_transcription import (
-    extraer_audio_y_subtitulos,
+    generar_srt_para_video,
+    obtener_segmentos_para_video,
     obtener_transcripcion_para_video,
 )
 from core.google_drive import delete_file, upload_and_share_file
@@ -90,8 +90,9 @@ def generar_mensajes_whatsapp(
     api_key = _fetch_api_key(api_key)
     if not api_key:
         raise RuntimeError("Falta la API key de OpenAI (OPENAI_API_KEY).")
-    texto = obtener_transcripcion_para_video(video_path, idioma, logs=logs)
-    extraer_audio_y_subtitulos(video_path, idioma, logs=logs)
+    segmentos = obtener_segmentos_para_video(video_path, idioma, logs=logs)
+    texto = obtener_transcripcion_para_video(video_path, idioma, logs=logs, segmentos=segmentos)
+    generar_srt_para_video(video_path, idioma, logs=logs, segmentos=segmentos)
     system = (
         "Eres un redactor que convierte contenido de video en mensajes cortos "
         "para WhatsApp que transmiten el mismo mensaje informativo."
@@ -119,7 +120,7 @@ def generar_mensajes_whatsapp(
     }
     if logs:
         logs("Llamando a OpenAI para construir mensajes de WhatsApp...")
-    response = requests.post(
+    response = http_client.post(
         OPENAI_API_URL,
         headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
         json=payload,
@@ -146,7 +147,7 @@ def upload_media_to_transfer(path: str, logs=None, max_attempts: int = 3) -> str
                 logs(f"Subiendo {path_obj.name} a transfer.sh (intento {attempt}/{max_attempts})...")
             try:
                 url = TRANSFER_TEMPLATE.format(filename=path_obj.name)
-                response = requests.put(
+                response = http_client.put(
                     url,
                     data=source,
                     timeout=120,
@@ -176,7 +177,7 @@ def _upload_to_fileio(path: str, logs=None) -> str:
     if logs:
         logs(f"Subiendo {path_obj.name} a file.io...")
     with path_obj.open("rb") as source:
-        response = requests.post(
+        response = http_client.post(
             FILE_IO_URL,
             files={"file": (path_obj.name, source)},
             timeout=120,
@@ -259,7 +260,7 @@ def send_whatsapp_message(
     payload = {"number": number, "message": message}
     if media_url:
         payload["urlMedia"] = media_url
-    response = requests.post(endpoint, json=payload, timeout=30)
+    response = http_client.post(endpoint, json=payload, timeout=30)
     response.raise_for_status()
     text = response.text.strip()
     if not text:
@@ -1,12 +1,12 @@
 import os
 import math
-import subprocess
+import threading
 import uuid
 from core.extractor import extraer_audio
 from core.utils import (
     dividir_audio_ffmpeg,
-    dividir_audio_ffmpeg_partes,
-    combinar_srt_partes,
+    escribir_srt_segmentos,
+    limpiar_temp,
     dividir_video_ffmpeg,
     dividir_video_vertical_individual,
     quemar_srt_en_video,
@@ -24,10 +24,225 @@ from core.utils import (
     overlay_visualizador,
     overlay_image_temporizada,
     aplicar_musica_fondo,
+    tiene_audio,
+    detectar_crop_barras,
+    _filtro_recorte,
+    _preparar_fondo,
+    _preparar_musica,
+)
+from core.filtergraph import compilar_parte, renderizar_parte, tamano_tras_recorte
+from core.manifest import Manifiesto
+from core.part_pool import args_hilos, ejecutar_partes
+from core.transcriber import (
+    transcribir_resultado,
+    transcribir_tramos,
+    largo_tramo,
+    planificar_tramos,
+    procesos_transcripcion,
+    tramos_por_pausas,
+    unir_segmentos_tramos,
 )
-from core.transcriber import transcribir_srt
 import re
-from core import stop_control
+from core import fastcut, ffmpeg_runner, pcm, stop_control, transcript_store, vad
+
+
+def _procesar_partes_fusionado(
+    video_path: str,
+    base_name: str,
+    base_dir: str,
+    segundos_por_parte: float,
+    start_sec: float,
+    end_sec: float | None,
+    vertical_tiktok: bool,
+    vertical_orden: str,
+    recorte_top: float,
+    recorte_bottom: float,
+    recorte_bordes: bool,
+    recorte_manual_top: float,
+    recorte_manual_bottom: float,
+    fondo: dict | None,
+    visualizador: dict | None,
+    imagen: dict | None,
+    musica: dict | None,
+    max_paralelo: int | None = None,
+    manifiesto: Manifiesto | None = None,
+    al_terminar_parte=None,
+    barra=None,
+    logs=None,
+):
+    """
+    Ruta fusionada de procesar_video: un solo ffmpeg por parte con todos los
+    efectos compilados en un filtergraph. Si una parte falla devuelve
+    "videos": None (con los directorios usados) para que el llamador siga
+    por etapas en el mismo directorio. Con manifiesto, las partes ya
+    renderizadas con los mismos parametros se reutilizan.
+    al_terminar_parte(i, path) se llama con cada parte final apenas existe.
+    barra recibe el avance agregado de todas las partes; el log muestra el ETA.
+    """
+    duracion_total = obtener_duracion_segundos(video_path)
+    fin = duracion_total if end_sec is None else min(duracion_total, end_sec)
+    tramos = []
+    inicio = start_sec
+    while inicio < fin:
+        tramos.append((inicio, min(segundos_por_parte, max(0.1, fin - inicio))))
+        inicio += segundos_por_parte
+    if not tramos:
+        return None
+
+    params = {
+        "vertical_tiktok": vertical_tiktok,
+        "vertical_orden": vertical_orden,
+        "recorte": [recorte_top, recorte_bottom, recorte_bordes, recorte_manual_top, recorte_manual_bottom],
+        "fondo": fondo,
+        "visualizador": visualizador,
+        "imagen": imagen,
+        "musica": musica,
+    }
+    entradas = [
+        video_path,
+        fondo["opciones"]["imagen_path"] if fondo else None,
+        imagen["path"] if imagen else None,
+        musica["path"] if musica else None,
+    ]
+
+    src_w, src_h = obtener_tamano_video(video_path)
+    con_audio = tiene_audio(video_path)
+    if vertical_tiktok:
+        recorte = None
+        principal_size = (1080, 1920)
+        if manifiesto:
+            vertical_dir = manifiesto.directorio(
+                "vertical-corte",
+                manifiesto.huella_etapa("vertical-corte", [params, segundos_por_parte, start_sec, end_sec], entradas),
+                lambda: next_correlative_dir(base_dir, "verticales", "vertical-corte"),
+            )
+        else:
+            vertical_dir = next_correlative_dir(base_dir, "verticales", "vertical-corte")
+        cortes_dir = None
+        out_dir = vertical_dir
+        crop_params = detectar_crop_barras(video_path)
+    else:
+        recorte = _filtro_recorte(
+            video_path,
+            crop_bars=recorte_bordes,
+            crop_top=recorte_manual_top,
+            crop_bottom=recorte_manual_bottom,
+            crop_scale_back=(recorte_manual_top == 0 and recorte_manual_bottom == 0),
+        )
+        principal_size = tamano_tras_recorte(src_w, src_h, recorte)
+        vertical_dir = None
+        cortes_dir = os.path.join(base_dir, "cortes")
+        out_dir = cortes_dir
+        crop_params = None
+    os.makedirs(out_dir, exist_ok=True)
+
+    fondo_base = fondo_vertical = None
+    if fondo:
+        os.makedirs(os.path.join(out_dir, "background"), exist_ok=True)
+        base_size = (src_w, src_h) if vertical_tiktok else principal_size
+        fondo_base = dict(_preparar_fondo(target_size=fondo["target"] or base_size, **fondo["opciones"]))
+        fondo_base["path"] = fondo["opciones"]["imagen_path"]
+        if vertical_tiktok:
+            fondo_vertical = dict(_preparar_fondo(target_size=fondo["target"] or (1080, 1920), **fondo["opciones"]))
+            fondo_vertical["path"] = fondo["opciones"]["imagen_path"]
+
+    visual_dir = os.path.join(base_dir, "visualizador")
+    if visualizador:
+        os.makedirs(visual_dir, exist_ok=True)
+        width, height = principal_size
+        visualizador = dict(visualizador, width=width, height=max(64, min(height, int(height * 0.18))))
+
+    if logs: logs(f"🧬 Grafo fusionado: {len(tramos)} partes, un solo encode por parte")
+    progreso = ffmpeg_runner.ProgresoAgregado(sum(d for _, d in tramos), barra, logs)
+    finales = []
+
+    def _render(i, tramo):
+        inicio, duracion_parte = tramo
+        idx = i + 1
+        vertical = None
+        if vertical_tiktok:
+            orden_actual = vertical_orden
+            if vertical_orden == "ALT":
+                orden_actual = "LR" if (i % 2 == 0) else "RL"
+            vertical = {
+                "orden": orden_actual,
+                "recorte_top": recorte_top,
+                "recorte_bottom": recorte_bottom,
+                "crop_params": crop_params,
+            }
+        musica_parte = None
+        if musica:
+            musica_parte = _preparar_musica(duracion_parte, musica["path"], log_fn=logs, **musica["opciones"])
+            if musica_parte:
+                musica_parte["path"] = musica["path"]
+        compilado = compilar_parte(
+            duracion_parte,
+            recorte=recorte,
+            vertical=vertical,
+            fondo=fondo_base,
+            fondo_vertical=fondo_vertical,
+            visualizador=visualizador,
+            imagen=imagen,
+            musica=musica_parte,
+            con_audio=con_audio,
+        )
+        nombre = f"{base_name}_parte_{idx:03d}"
+        rutas = {}
+        if vertical_tiktok:
+            rutas["principal"] = os.path.join(out_dir, f"{nombre}_vertical.mp4")
+            rutas["fondo"] = os.path.join(out_dir, "background", f"{nombre}_tmp_bg.mp4")
+            rutas["fondo_vertical"] = os.path.join(out_dir, "background", f"{nombre}_vertical_bg.mp4")
+        else:
+            rutas["principal"] = os.path.join(out_dir, f"{nombre}.mp4")
+            rutas["fondo"] = os.path.join(out_dir, "background", f"{nombre}_bg.mp4")
+        final = rutas["principal"]
+        if "final" in compilado["salidas"]:
+            sufijo = "image" if imagen else "wave_out"
+            final = rutas["final"] = os.path.join(visual_dir, f"{nombre}_{sufijo}.mp4")
+        huella_parte = None
+        if manifiesto:
+            huella_parte = manifiesto.huella_etapa("fusionado", [params, inicio, duracion_parte], entradas)
+            if manifiesto.vigente("fusionado", final, huella_parte):
+                if logs: logs(f"⏭ Parte {idx}/{len(tramos)} vigente, se reutiliza: {final}")
+                finales.append(final)
+                progreso.terminar(i, duracion_parte)
+                if al_terminar_parte:
+                    al_terminar_parte(i, final)
+                return final
+            manifiesto.invalidar("fusionado", final)
+        if logs: logs(f"🎬 Renderizando parte {idx}/{len(tramos)}...")
+        ok, detenido = renderizar_parte(
+            video_path, inicio, duracion_parte, compilado, rutas,
+            log_fn=logs, on_progress=progreso.callback(i),
+        )
+        if detenido:
+            return None
+        if not ok:
+            raise RuntimeError(f"parte {idx}")
+        progreso.terminar(i, duracion_parte)
+        finales.append(final)
+        if manifiesto:
+            manifiesto.registrar("fusionado", final, huella_parte, list(rutas.values()))
+        if logs: logs(f"✔ Parte {idx}/{len(tramos)} lista: {final}")
+        if al_terminar_parte:
+            al_terminar_parte(i, final)
+        return final
+
+    try:
+        output_videos = ejecutar_partes(_render, tramos, max_paralelo, logs)
+    except Exception as exc:
+        if logs: logs(f"⚠️ Grafo fusionado falló ({exc}). Se usa la ruta por etapas.")
+        if manifiesto:
+            # La ruta por etapas rehace todas las partes en este directorio y
+            # pisa estos archivos con otro contenido (p. ej. sin musica).
+            for final in finales:
+                manifiesto.invalidar("fusionado", final)
+        return {"videos": None, "cortes_dir": cortes_dir, "vertical_dir": vertical_dir}
+    return {
+        "videos": [v for v in output_videos if v],
+        "cortes_dir": cortes_dir,
+        "vertical_dir": vertical_dir,
+    }
 
 
 def procesar_video(
@@ -77,17 +292,30 @@ def procesar_video(
     musica_inicio: float = 0.0,
     musica_fin: float | None = None,
     musica_inicio_video: float = 0.0,
+    max_paralelo: int | None = None,
+    fusionar: bool = True,
+    reanudar: bool = True,
+    al_terminar_parte=None,
 ):
     """
     Procesa un archivo (video o audio):
     - Extrae audio si es video
     - Divide en N partes (sin transcripcion)
+    max_paralelo: ffmpeg simultaneos por etapa (None = ZEMPER_MAX_FFMPEG / auto).
+    fusionar: compila todos los efectos de cada parte en un solo ffmpeg;
+    si falla se usa la ruta por etapas.
+    reanudar: reutiliza las salidas registradas en output/<base>/manifest.json
+    que siguen vigentes (mismas entradas y parametros).
+    al_terminar_parte(path): se llama con cada parte final (una vez por
+    parte); en la ruta fusionada apenas se renderiza, para que la
+    publicacion empiece sin esperar al resto.
     """
 
     try:
         if logs: logs("Iniciando procesamiento...")
         base_name = nombre_base_principal(video_path)
         base_dir = output_base_dir(video_path)
+        manifiesto = Manifiesto(base_dir, reanudar=reanudar)
         output_videos = []
         cortes_dir = None
         vertical_dir = None
@@ -98,6 +326,17 @@ def procesar_video(
         if end_sec is not None and end_sec <= start_sec:
             if logs: logs("Rango invalido: el minuto final debe ser mayor al inicial.")
             return
+        partes_enviadas = set()
+        lock_partes = threading.Lock()
+
+        def _parte_final(i, path):
+            with lock_partes:
+                if i in partes_enviadas:
+                    return
+                partes_enviadas.add(i)
+            _registrar_origen(path, video_path, i, segundos_por_parte, start_sec, end_sec)
+            if al_terminar_parte:
+                al_terminar_parte(path)
 
         if es_youtube:
             if logs: logs("YouTube desactivado por ahora.")
@@ -115,75 +354,245 @@ def procesar_video(
                 audio_dir_base = os.path.join(base_dir, "audios")
                 os.makedirs(audio_dir_base, exist_ok=True)
                 audio_path = os.path.join(audio_dir_base, f"{base_name}_original.mp3")
-                audio_path = extraer_audio(video_path, audio_path, logs if logs else None)
-                if logs: logs(f"Audio original guardado: {audio_path}")
+                huella_audio = manifiesto.huella_etapa("audio", {}, [video_path])
+                if manifiesto.vigente("audio", audio_path, huella_audio):
+                    audio_path = manifiesto.salidas("audio", audio_path)[0]
+                    if logs: logs(f"⏭ Audio original vigente, se reutiliza: {audio_path}")
+                else:
+                    manifiesto.invalidar("audio", audio_path)
+                    clave_audio = audio_path
+                    audio_path = extraer_audio(video_path, audio_path, logs if logs else None)
+                    manifiesto.registrar("audio", clave_audio, huella_audio, [audio_path])
+                    if logs: logs(f"Audio original guardado: {audio_path}")
         else:
             if logs: logs(f"Video seleccionado: {video_path}")
 
         # 2. Dividir video (opcional, solo local)
-        if not es_audio and dividir_video:
+        fusionado = None
+        vertical_dir_fallido = None
+        if fusionar and not es_audio and dividir_video:
+            fondo = None
+            if fondo_path and os.path.exists(fondo_path):
+                fondo_target = None
+                if fondo_usar_tamano_imagen:
+                    try:
+                        fondo_target = obtener_tamano_video(fondo_path)
+                    except Exception:
+                        fondo_target = None
+                fondo = {
+                    "target": fondo_target,
+                    "opciones": {
+                        "imagen_path": fondo_path,
+                        "estilo": fondo_estilo,
+                        "fg_scale": fondo_escala,
+                        "inset_pct": fondo_inset_pct,
+                        "fg_zoom": fondo_zoom,
+                        "cintas": fondo_cintas,
+                        "mensajes": fondo_mensajes,
+                        "bg_crop_top": fondo_bg_crop_top,
+                        "bg_crop_bottom": fondo_bg_crop_bottom,
+                    },
+                }
+            visual = None
+            imagen = None
+            if visualizador and not solo_video:
+                visual = {
+                    "color": color_visualizador,
+                    "margen": margen_visualizador,
+                    "exposicion": exposicion_visualizador,
+                    "contraste": contraste_visualizador,
+                    "saturacion": saturacion_visualizador,
+                    "temperatura": temperatura_visualizador,
+                    "posicion": posicion_visualizador,
+                    "opacidad": opacidad_visualizador,
+                }
+                if overlay_image and os.path.exists(overlay_image) and overlay_duration > 0:
+                    imagen = {
+                        "path": overlay_image,
+                        "start": overlay_start,
+                        "duration": overlay_duration,
+                    }
+            musica = None
+            if musica_path and os.path.exists(musica_path):
+                musica = {
+                    "path": musica_path,
+                    "opciones": {
+                        "volumen": musica_volumen,
+                        "music_start": musica_inicio,
+                        "music_end": musica_fin,
+                        "video_start": musica_inicio_video,
+                    },
+                }
+            resultado_fusion = _procesar_partes_fusionado(
+                video_path,
+                base_name,
+                base_dir,
+                segundos_por_parte,
+                start_sec,
+                end_sec,
+                vertical_tiktok,
+                vertical_orden,
+                recorte_top,
+                recorte_bottom,
+                recorte_bordes,
+                recorte_manual_top,
+                recorte_manual_bottom,
+                fondo,
+                visual,
+                imagen,
+                musica,
+                max_paralelo=max_paralelo,
+                manifiesto=manifiesto,
+                al_terminar_parte=_parte_final,
+                barra=barra,
+                logs=logs,
+            )
+            if stop_control.should_stop():
+                if logs: logs("Proceso detenido por el usuario.")
+                return
+            if resultado_fusion and resultado_fusion["videos"] is not None:
+                fusionado = resultado_fusion
+                output_videos = fusionado["videos"]
+                cortes_dir = fusionado["cortes_dir"]
+                vertical_dir = fusionado["vertical_dir"]
+            elif resultado_fusion:
+                vertical_dir_fallido = resultado_fusion["vertical_dir"]
+
+        if fusionado:
+            pass
+        elif not es_audio and dividir_video:
+            fondo_activo = bool(fondo_path and os.path.exists(fondo_path))
+            fondo_target = None
+            if fondo_activo and fondo_usar_tamano_imagen:
+                try:
+                    fondo_target = obtener_tamano_video(fondo_path)
+                except Exception:
+                    fondo_target = None
+            inset = fondo_inset_pct
+            params_fondo = [
+                fondo_estilo, fondo_target, fondo_escala, inset, fondo_zoom,
+                fondo_cintas, fondo_mensajes, fondo_bg_crop_top, fondo_bg_crop_bottom,
+            ]
+
+            def _ruta_fondo(parte):
+                nombre = os.path.splitext(os.path.basename(parte))[0]
+                return os.path.join(os.path.dirname(parte), "background", f"{nombre}_bg.mp4")
+
+            def _huella_fondo(parte):
+                return manifiesto.huella_etapa("fondo", params_fondo, [parte, fondo_path])
+
             if vertical_tiktok:
                 if logs: logs("Generando vertical TikTok sin cortes normales...")
-                vertical_dir = next_correlative_dir(base_dir, "verticales", "vertical-corte")
-                partes_video = []
-                total_partes = max(1, math.ceil((end_sec - start_sec) / segundos_por_parte)) if end_sec else None
-                for i in range(total_partes or 0):
-                    if stop_control.should_stop():
-                        if logs: logs("Proceso detenido por el usuario.")
-                        return
+                params_vertical = [segundos_por_parte, start_sec, end_sec, vertical_orden, recorte_top, recorte_bottom]
+                # Si el grafo fusionado fallo, se sigue en su directorio en vez de abrir otro.
+                vertical_dir = vertical_dir_fallido or manifiesto.directorio(
+                    "vertical-corte",
+                    manifiesto.huella_etapa("vertical-corte", params_vertical, [video_path]),
+                    lambda: next_correlative_dir(base_dir, "verticales", "vertical-corte"),
+                )
+                fin_rango = end_sec if end_sec is not None else obtener_duracion_segundos(video_path)
+                total_partes = max(1, math.ceil((fin_rango - start_sec) / segundos_por_parte))
+                tramos = []
+                for i in range(total_partes):
                     inicio = start_sec + i * segundos_por_parte
-                    if end_sec is not None and inicio >= end_sec:
+                    if inicio >= fin_rango:
                         break
-                    duracion_parte = min(segundos_por_parte, max(0.1, (end_sec - inicio) if end_sec else segundos_por_parte))
-                    if logs: logs(f"Generando vertical: parte {i+1}")
+                    duracion_parte = min(segundos_por_parte, max(0.1, fin_rango - inicio))
+                    tramos.append((inicio, duracion_parte))
+
+                def _ruta_vertical(parte):
+                    nombre = os.path.splitext(os.path.basename(parte))[0]
+                    if nombre.endswith("_tmp"):
+                        nombre = nombre[:-4]
+                    return os.path.join(os.path.dirname(parte), f"{nombre}_vertical.mp4")
+
+                def _huella_vertical(idx, parte):
+                    orden_actual = vertical_orden
+                    if vertical_orden == "ALT":
+                        orden_actual = "LR" if (idx % 2 == 0) else "RL"
+                    return manifiesto.huella_etapa("vertical", [orden_actual, recorte_top, recorte_bottom], [parte])
+
+                def _cortar_base(i, tramo):
+                    inicio, duracion_parte = tramo
                     tmp_out = os.path.join(vertical_dir, f"{base_name}_parte_{i+1:03d}_tmp.mp4")
+                    huella_corte = manifiesto.huella_etapa("corte_base", [inicio, duracion_parte, fastcut.modo_corte()], [video_path])
+                    # El corte base es temporal: se rehace solo si algo que lo consume no esta vigente.
+                    if (
+                        manifiesto.registrado("corte_base", tmp_out, huella_corte)
+                        and manifiesto.vigente("vertical", _ruta_vertical(tmp_out), _huella_vertical(i, tmp_out))
+                        and (not fondo_activo or manifiesto.vigente("fondo", _ruta_fondo(tmp_out), _huella_fondo(tmp_out)))
+                    ):
+                        if logs: logs(f"⏭ Vertical parte {i+1} vigente, se reutiliza")
+                        return tmp_out
+                    if logs: logs(f"Generando vertical: parte {i+1}")
+                    # La base se vuelve a codificar al armar el vertical: copiarla alcanza.
+                    if fastcut.cortar_tramo(video_path, inicio, duracion_parte, tmp_out, log_fn=logs):
+                        manifiesto.registrar("corte_base", tmp_out, huella_corte, [tmp_out])
+                        return tmp_out
                     cmd = [
                         "ffmpeg", "-y",
                         "-i", video_path,
                         "-ss", str(inicio),
                         "-t", str(duracion_parte),
                         "-c:v", "libx264",
+                        *args_hilos(),
                         "-c:a", "aac",
                         "-movflags", "+faststart",
                         tmp_out
                     ]
-                    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    partes_video.append(tmp_out)
+                    result = ffmpeg_runner.run(cmd)
+                    if result.returncode != 0:
+                        if stop_control.should_stop():
+                            return None
+                        if logs: logs(f"❌ Corte base parte {i+1} falló: {(result.stderr or '').strip()[-300:]}")
+                        raise RuntimeError(f"No se pudo cortar la parte {i+1}.")
+                    manifiesto.registrar("corte_base", tmp_out, huella_corte, [tmp_out])
+                    return tmp_out
+
+                partes_video = ejecutar_partes(_cortar_base, tramos, max_paralelo, logs)
+                if stop_control.should_stop():
+                    if logs: logs("Proceso detenido por el usuario.")
+                    return
                 if logs: logs(f"Vertical TikTok: partes base {len(partes_video)}")
             else:
-                if logs: logs("Dividiendo video en partes...")
                 cortes_dir = os.path.join(base_dir, "cortes")
-                partes_video = dividir_video_ffmpeg(
-                    video_path,
-                    segundos_por_parte=segundos_por_parte,
-                    out_dir=cortes_dir,
-                    start_sec=start_sec,
-                    end_sec=end_sec,
-                    crop_bars=recorte_bordes,
-                    crop_top=recorte_manual_top,
-                    crop_bottom=recorte_manual_bottom,
-                    crop_scale_back=(recorte_manual_top == 0 and recorte_manual_bottom == 0),
-                    log_fn=logs if logs else None,
-                )
-                if logs: logs(f"Video dividido en {len(partes_video)} fragmentos")
+                params_cortes = [
+                    segundos_por_parte, start_sec, end_sec,
+                    recorte_bordes, recorte_manual_top, recorte_manual_bottom,
+                ]
+                huella_cortes = manifiesto.huella_etapa("cortes", params_cortes, [video_path])
+                if manifiesto.vigente("cortes", cortes_dir, huella_cortes):
+                    partes_video = manifiesto.salidas("cortes", cortes_dir)
+                    if logs: logs(f"⏭ Cortes vigentes, se reutilizan {len(partes_video)} fragmentos")
+                else:
+                    manifiesto.invalidar("cortes", cortes_dir)
+                    if logs: logs("Dividiendo video en partes...")
+                    partes_video = dividir_video_ffmpeg(
+                        video_path,
+                        segundos_por_parte=segundos_por_parte,
+                        out_dir=cortes_dir,
+                        start_sec=start_sec,
+                        end_sec=end_sec,
+                        crop_bars=recorte_bordes,
+                        crop_top=recorte_manual_top,
+                        crop_bottom=recorte_manual_bottom,
+                        crop_scale_back=(recorte_manual_top == 0 and recorte_manual_bottom == 0),
+                        log_fn=logs if logs else None,
+                    )
+                    if partes_video and not stop_control.should_stop():
+                        manifiesto.registrar("cortes", cortes_dir, huella_cortes, partes_video)
+                    if logs: logs(f"Video dividido en {len(partes_video)} fragmentos")
                 output_videos = partes_video
 
-            if fondo_path and os.path.exists(fondo_path) and partes_video:
-                fondo_dir = os.path.join(os.path.dirname(partes_video[0]), "background")
-                os.makedirs(fondo_dir, exist_ok=True)
-                fondo_target = None
-                if fondo_usar_tamano_imagen:
-                    try:
-                        fondo_target = obtener_tamano_video(fondo_path)
-                    except Exception:
-                        fondo_target = None
-                inset = fondo_inset_pct
-                for parte in partes_video:
-                    if stop_control.should_stop():
-                        if logs: logs("Proceso detenido por el usuario.")
+            if fondo_activo and partes_video:
+                os.makedirs(os.path.join(os.path.dirname(partes_video[0]), "background"), exist_ok=True)
+
+                def _aplicar_fondo(_idx, parte):
+                    out_path = _ruta_fondo(parte)
+                    huella_parte = _huella_fondo(parte)
+                    if manifiesto.vigente("fondo", out_path, huella_parte):
                         return
-                    nombre = os.path.splitext(os.path.basename(parte))[0]
-                    out_path = os.path.join(fondo_dir, f"{nombre}_bg.mp4")
+                    manifiesto.invalidar("fondo", out_path)
                     aplicar_fondo_imagen(
                         parte,
                         out_path,
@@ -199,52 +608,58 @@ def procesar_video(
                         bg_crop_bottom=fondo_bg_crop_bottom,
                         log_fn=logs if logs else None
                     )
+                    manifiesto.registrar("fondo", out_path, huella_parte, [out_path])
+
+                ejecutar_partes(_aplicar_fondo, partes_video, max_paralelo, logs)
+                if stop_control.should_stop():
+                    if logs: logs("Proceso detenido por el usuario.")
+                    return
 
             if vertical_tiktok and partes_video:
-                for idx, parte in enumerate(partes_video):
-                    if stop_control.should_stop():
-                        if logs: logs("Proceso detenido por el usuario.")
-                        return
-                    nombre = os.path.splitext(os.path.basename(parte))[0]
-                    if nombre.endswith("_tmp"):
-                        nombre = nombre[:-4]
-                    out_path = os.path.join(os.path.dirname(parte), f"{nombre}_vertical.mp4")
-                    orden_actual = vertical_orden
-                    if vertical_orden == "ALT":
-                        orden_actual = "LR" if (idx % 2 == 0) else "RL"
-                    generar_vertical_tiktok(
-                        parte,
-                        out_path,
-                        orden=orden_actual,
-                        recorte_top=recorte_top,
-                        recorte_bottom=recorte_bottom,
-                        log_fn=logs if logs else None
-                    )
-                    output_videos.append(out_path)
+                def _generar_vertical(idx, parte):
+                    out_path = _ruta_vertical(parte)
+                    huella_parte = _huella_vertical(idx, parte)
+                    if not manifiesto.vigente("vertical", out_path, huella_parte):
+                        manifiesto.invalidar("vertical", out_path)
+                        orden_actual = vertical_orden
+                        if vertical_orden == "ALT":
+                            orden_actual = "LR" if (idx % 2 == 0) else "RL"
+                        generar_vertical_tiktok(
+                            parte,
+                            out_path,
+                            orden=orden_actual,
+                            recorte_top=recorte_top,
+                            recorte_bottom=recorte_bottom,
+                            log_fn=logs if logs else None
+                        )
+                        manifiesto.registrar("vertical", out_path, huella_parte, [out_path])
                     if os.path.basename(parte).endswith("_tmp.mp4"):
                         try:
                             os.remove(parte)
                         except Exception:
                             pass
-                if fondo_path and os.path.exists(fondo_path):
+                    return out_path
+
+                verticales = ejecutar_partes(_generar_vertical, partes_video, max_paralelo, logs)
+                output_videos.extend(v for v in verticales if v)
+                if stop_control.should_stop():
+                    if logs: logs("Proceso detenido por el usuario.")
+                    return
+                if fondo_activo:
                     vertical_bg_dir = os.path.join(os.path.dirname(partes_video[0]), "background")
                     os.makedirs(vertical_bg_dir, exist_ok=True)
-                    fondo_target = None
-                    if fondo_usar_tamano_imagen:
-                        try:
-                            fondo_target = obtener_tamano_video(fondo_path)
-                        except Exception:
-                            fondo_target = None
-                    inset = fondo_inset_pct
-                    for parte in partes_video:
-                        if stop_control.should_stop():
-                            if logs: logs("Proceso detenido por el usuario.")
-                            return
+                    params_fondo_vertical = params_fondo[:1] + [fondo_target or (1080, 1920)] + params_fondo[2:]
+
+                    def _aplicar_fondo_vertical(_idx, parte):
                         nombre = os.path.splitext(os.path.basename(parte))[0]
                         if nombre.endswith("_tmp"):
                             nombre = nombre[:-4]
-                        in_path = os.path.join(os.path.dirname(parte), f"{nombre}_vertical.mp4")
+                        in_path = _ruta_vertical(parte)
                         out_path = os.path.join(vertical_bg_dir, f"{nombre}_vertical_bg.mp4")
+                        huella_parte = manifiesto.huella_etapa("fondo_vertical", params_fondo_vertical, [in_path, fondo_path])
+                        if manifiesto.vigente("fondo_vertical", out_path, huella_parte):
+                            return
+                        manifiesto.invalidar("fondo_vertical", out_path)
                         aplicar_fondo_imagen(
                             in_path,
                             out_path,
@@ -260,6 +675,12 @@ def procesar_video(
                             bg_crop_bottom=fondo_bg_crop_bottom,
                             log_fn=logs if logs else None
                         )
+                        manifiesto.registrar("fondo_vertical", out_path, huella_parte, [out_path])
+
+                    ejecutar_partes(_aplicar_fondo_vertical, partes_video, max_paralelo, logs)
+                    if stop_control.should_stop():
+                        if logs: logs("Proceso detenido por el usuario.")
+                        return
 
         elif not es_audio:
             output_videos = [video_path]
@@ -267,25 +688,79 @@ def procesar_video(
         partes_audio = []
         if not solo_video:
             # 3. Dividir audio en MP3
-            if logs: logs("Dividiendo audio en partes...")
             audio_dir = os.path.join(base_dir, "audios")
-            partes_audio = dividir_audio_ffmpeg(
-                audio_path,
-                segundos_por_parte=segundos_por_parte,
-                out_dir=audio_dir,
-                start_sec=start_sec,
-                end_sec=end_sec,
-                log_fn=logs if logs else None,
+            huella_partes = manifiesto.huella_etapa(
+                "audio_partes", [segundos_por_parte, start_sec, end_sec], [audio_path]
             )
-            if logs: logs(f"Audio dividido en {len(partes_audio)} fragmentos")
+            if manifiesto.vigente("audio_partes", audio_dir, huella_partes):
+                partes_audio = manifiesto.salidas("audio_partes", audio_dir)
+                if logs: logs(f"⏭ Audio ya dividido en {len(partes_audio)} fragmentos, se reutiliza")
+            else:
+                manifiesto.invalidar("audio_partes", audio_dir)
+                if logs: logs("Dividiendo audio en partes...")
+                partes_audio = dividir_audio_ffmpeg(
+                    audio_path,
+                    segundos_por_parte=segundos_por_parte,
+                    out_dir=audio_dir,
+                    start_sec=start_sec,
+                    end_sec=end_sec,
+                    log_fn=logs if logs else None,
+                )
+                if partes_audio and not stop_control.should_stop():
+                    manifiesto.registrar("audio_partes", audio_dir, huella_partes, partes_audio)
+                if logs: logs(f"Audio dividido en {len(partes_audio)} fragmentos")
 
             # 4. Subtitulos (SRT)
             if generar_srt and partes_audio:
                 subs_dir = os.path.join(base_dir, "subtitulos")
+                pendientes = []
                 for idx, parte in enumerate(partes_audio, start=1):
-                    if logs: logs(f"Generando SRT {idx}/{len(partes_audio)}...")
-                    srt_path = transcribir_srt(parte, subs_dir, idioma="es", model_size="base")
-                    if logs: logs(f"SRT listo: {srt_path}")
+                    inicio = start_sec + (idx - 1) * segundos_por_parte
+                    duracion_parte = segundos_por_parte
+                    if end_sec is not None:
+                        duracion_parte = min(duracion_parte, end_sec - inicio)
+                    nombre = os.path.splitext(os.path.basename(parte))[0]
+                    srt_path = os.path.join(subs_dir, f"{nombre}.srt")
+                    huella_srt = manifiesto.huella_etapa("srt", ["base", "es", inicio, duracion_parte], [video_path])
+                    if manifiesto.vigente("srt", srt_path, huella_srt):
+                        continue
+                    manifiesto.invalidar("srt", srt_path)
+                    pendientes.append((idx, nombre, inicio, duracion_parte, srt_path, huella_srt))
+                if len(pendientes) < len(partes_audio) and logs:
+                    logs(f"⏭ {len(partes_audio) - len(pendientes)} SRT vigentes, se reutilizan")
+                if pendientes:
+                    # Whisper lee tramos del PCM decodificado una vez, no los MP3.
+                    pcm_path = pcm.decodificar_pcm(
+                        video_path,
+                        os.path.join(audio_dir, f"{base_name}_16k.f32"),
+                        log_fn=logs if logs else None
+                    )
+                    try:
+                        for idx, nombre, inicio, duracion_parte, srt_esperado, huella_srt in pendientes:
+                            if stop_control.should_stop():
+                                if logs: logs("Proceso detenido por el usuario.")
+                                return
+                            if logs: logs(f"Generando SRT {idx}/{len(partes_audio)}...")
+                            resultado = transcribir_resultado(
+                                pcm.tramo(pcm_path, inicio, duracion_parte, nombre=nombre),
+                                idioma="es",
+                                model_size="base",
+                                srt_dir=subs_dir,
+                            )
+                            srt_path = resultado["srt"]
+                            # Los cortes de este rango la reutilizan al subir (ver transcript_store).
+                            transcript_store.guardar(
+                                video_path,
+                                transcript_store.segmentos_de_resultado(resultado, inicio),
+                                inicio,
+                                inicio + duracion_parte,
+                                idioma="es",
+                                modelo="base",
+                            )
+                            manifiesto.registrar("srt", srt_esperado, huella_srt, [srt_path])
+                            if logs: logs(f"SRT listo: {srt_path}")
+                    finally:
+                        limpiar_temp(pcm_path)
 
         # 5. Guardar resumen
         resumen_path = guardar_resumen_rango(
@@ -304,17 +779,38 @@ def procesar_video(
                 if logs: logs(f"Parte {idx}/{len(partes_audio)} lista (sin transcripcion).")
                 if barra: barra.set(idx / len(partes_audio))
 
-            if visualizador and partes_audio and output_videos:
+            if visualizador and partes_audio and output_videos and not fusionado:
                 original_outputs = output_videos[:]
-                visualizado = []
                 visual_dir = os.path.join(base_dir, "visualizador")
                 if logs:
                     logs("Visualizador activado: generando onda y aplicando overlay...")
-                for idx, (audio_seg, video_seg) in enumerate(zip(partes_audio, original_outputs), start=1):
+
+                usar_imagen = bool(overlay_image and os.path.exists(overlay_image) and overlay_duration > 0)
+                params_visual = [
+                    color_visualizador, margen_visualizador, exposicion_visualizador,
+                    contraste_visualizador, saturacion_visualizador, temperatura_visualizador,
+                    posicion_visualizador, opacidad_visualizador, modo_visualizador,
+                    usar_imagen and [overlay_start, overlay_duration],
+                    # Onda intermedia con alfa (.mov): invalida overlays viejos con fondo negro.
+                    "onda-alfa",
+                ]
+
+                def _aplicar_visualizador(idx, pares):
+                    audio_seg, video_seg = pares
+                    idx += 1
+                    clave = os.path.join(visual_dir, f"{base_name}_parte_{idx:03d}_wave_out.mp4")
+                    huella_parte = manifiesto.huella_etapa(
+                        "visualizador",
+                        params_visual,
+                        [audio_seg, video_seg, overlay_image if usar_imagen else None],
+                    )
+                    if manifiesto.vigente("visualizador", clave, huella_parte):
+                        return manifiesto.salidas("visualizador", clave)[0]
+                    manifiesto.invalidar("visualizador", clave)
                     try:
                         width, height = obtener_tamano_video(video_seg)
                         wave_height = max(64, min(height, int(height * 0.18)))
-                        wave_path = os.path.join(visual_dir, f"{base_name}_parte_{idx:03d}_wave.mp4")
+                        wave_path = os.path.join(visual_dir, f"{base_name}_parte_{idx:03d}_wave.mov")
                         overlay_path = os.path.join(visual_dir, f"{base_name}_parte_{idx:03d}_wave_out.mp4")
                         generar_visualizador_audio(
                             audio_path=audio_seg,
@@ -340,7 +836,7 @@ def procesar_video(
                         )
                         final_path = overlay_path
                         try:
-                            if overlay_image and os.path.exists(overlay_image) and overlay_duration > 0:
+                            if usar_imagen:
                                 image_overlay_path = os.path.join(
                                     visual_dir,
                                     f"{base_name}_parte_{idx:03d}_image.mp4"
@@ -357,41 +853,47 @@ def procesar_video(
                         except Exception as exc:
                             if logs:
                                 logs(f"Advertencia: no se pudo agregar imagen en parte {idx} ({exc})")
-                        visualizado.append(final_path)
+                        manifiesto.registrar("visualizador", clave, huella_parte, [final_path])
+                        return final_path
                     except Exception as exc:
                         if logs:
                             logs(f"Advertencia: visualizador parte {idx} no se aplicó ({exc})")
-                        visualizado.append(video_seg)
-            if len(original_outputs) > len(visualizado):
-                visualizado.extend(original_outputs[len(visualizado):])
-            output_videos = visualizado
+                        return video_seg
 
-        if musica_path and os.path.exists(musica_path) and output_videos:
+                pares = list(zip(partes_audio, original_outputs))
+                resultados = ejecutar_partes(_aplicar_visualizador, pares, max_paralelo, logs)
+                visualizado = [r if r else video for r, (_a, video) in zip(resultados, pares)]
+                if len(original_outputs) > len(visualizado):
+                    visualizado.extend(original_outputs[len(visualizado):])
+                output_videos = visualizado
+
+        if musica_path and os.path.exists(musica_path) and output_videos and not fusionado:
             if logs:
                 logs("🎵 Aplicando música de fondo...")
-            mezclados = []
-            for idx, video_seg in enumerate(output_videos, start=1):
-                if stop_control.should_stop():
-                    if logs: logs("Proceso detenido por el usuario.")
-                    return
+            total_videos = len(output_videos)
+
+            params_musica = [musica_volumen, musica_inicio, musica_fin, musica_inicio_video]
+
+            def _mezclar_musica(idx, video_seg):
+                idx += 1
                 try:
                     if logs:
-                        logs(f"Mezclando música en parte {idx}/{len(output_videos)}...")
-                    aplicar_musica_fondo(
-                        video_seg,
-                        musica_path,
-                        volumen=musica_volumen,
-                        music_start=musica_inicio,
-                        music_end=musica_fin,
-                        video_start=musica_inicio_video,
-                        log_fn=logs,
-                    )
-                    mezclados.append(video_seg)
+                        logs(f"Mezclando música en parte {idx}/{total_videos}...")
+                    return _mezclar_musica_parte(manifiesto, video_seg, musica_path, params_musica, logs)
                 except Exception as exc:
                     if logs:
                         logs(f"Advertencia: música no aplicada en parte {idx} ({exc})")
-                    mezclados.append(video_seg)
-            output_videos = mezclados
+                return video_seg
+
+            mezclados = ejecutar_partes(_mezclar_musica, output_videos, max_paralelo, logs)
+            output_videos = [m or video for m, video in zip(mezclados, output_videos)]
+            if stop_control.should_stop():
+                if logs: logs("Proceso detenido por el usuario.")
+                return
+
+        if not es_audio and dividir_video:
+            for i, video in enumerate(output_videos):
+                _parte_final(i, video)
 
         return {
             "videos": output_videos,
@@ -431,14 +933,20 @@ def procesar_corte_individual(
     musica_inicio_video: float = 0.0,
     barra=None,
     logs=None,
+    reanudar: bool = True,
+    al_terminar_parte=None,
 ):
     """
     Corta un video en partes y genera versiones verticales 9:16.
     posicion: C (centro), L (izquierda), R (derecha)
+    reanudar: reutiliza las partes vigentes de output/<base>/manifest.json.
+    al_terminar_parte(path): se llama con cada parte terminada (musica
+    incluida) sin esperar a las siguientes.
     """
     try:
         if logs: logs("Iniciando corte individual...")
         base_dir = output_base_dir(video_path)
+        manifiesto = Manifiesto(base_dir, reanudar=reanudar)
         output_videos = []
         cortes_dir = None
         vertical_dir = None
@@ -449,7 +957,60 @@ def procesar_corte_individual(
             if logs: logs("Rango invalido: el minuto final debe ser mayor al inicial.")
             return
 
-        vertical_dir = next_correlative_dir(base_dir, "verticales", "vertical-individual")
+        outro_valido = bool(outro_enabled and outro_image and os.path.exists(outro_image))
+        params = [
+            posicion, zoom, bg_color, motion, motion_amount, motion_period,
+            outro_valido and [outro_text, outro_seconds, outro_font_size, outro_color],
+        ]
+        entradas = [video_path, outro_image if outro_valido else None]
+        vertical_dir = manifiesto.directorio(
+            "vertical-individual",
+            manifiesto.huella_etapa("vertical-individual", [params, segundos_por_parte, start_sec, end_sec], entradas),
+            lambda: next_correlative_dir(base_dir, "verticales", "vertical-individual"),
+        )
+
+        def _huella_parte(inicio, duracion_parte):
+            return manifiesto.huella_etapa("corte_individual", [params, inicio, duracion_parte], entradas)
+
+        musica_activa = bool(musica_path and os.path.exists(musica_path))
+        params_musica = [musica_volumen, musica_inicio, musica_fin, musica_inicio_video]
+        if musica_activa and logs:
+            logs("🎵 Se aplicará música de fondo en cada parte.")
+
+        publicadas: dict[str, str] = {}
+
+        def _mezclar_musica(video_seg):
+            try:
+                if logs:
+                    logs(f"Mezclando música en {os.path.basename(video_seg)}...")
+                return _mezclar_musica_parte(manifiesto, video_seg, musica_path, params_musica, logs)
+            except Exception as exc:
+                if logs:
+                    logs(f"Advertencia: música no aplicada en {os.path.basename(video_seg)} ({exc})")
+                return video_seg
+
+        def _parte_final(out_path, inicio, duracion_parte):
+            # Cada parte se termina (musica incluida) antes de cortar la siguiente.
+            publicada = _mezclar_musica(out_path) if musica_activa else out_path
+            publicadas[out_path] = publicada
+            try:
+                transcript_store.registrar_origen(publicada, video_path, inicio, duracion_parte)
+            except Exception:
+                pass
+            if al_terminar_parte:
+                al_terminar_parte(publicada)
+
+        def _parte_vigente(out_path, inicio, duracion_parte):
+            if manifiesto.vigente("corte_individual", out_path, _huella_parte(inicio, duracion_parte)):
+                _parte_final(out_path, inicio, duracion_parte)
+                return True
+            manifiesto.invalidar("corte_individual", out_path)
+            return False
+
+        def _parte_lista(out_path, inicio, duracion_parte):
+            manifiesto.registrar("corte_individual", out_path, _huella_parte(inicio, duracion_parte), [out_path])
+            _parte_final(out_path, inicio, duracion_parte)
+
         partes = dividir_video_vertical_individual(
             video_path,
             segundos_por_parte=segundos_por_parte,
@@ -468,36 +1029,15 @@ def procesar_corte_individual(
             outro_color=outro_color,
             start_sec=start_sec,
             end_sec=end_sec,
+            parte_vigente=_parte_vigente,
+            al_terminar_parte=_parte_lista,
             log_fn=logs if logs else None,
         )
         if logs: logs(f"Corte individual generado: {len(partes)} partes")
-        output_videos = partes
-        if musica_path and os.path.exists(musica_path) and output_videos:
-            if logs:
-                logs("🎵 Aplicando música de fondo...")
-            mezclados = []
-            for idx, video_seg in enumerate(output_videos, start=1):
-                if stop_control.should_stop():
-                    if logs: logs("Proceso detenido por el usuario.")
-                    return
-                try:
-                    if logs:
-                        logs(f"Mezclando música en parte {idx}/{len(output_videos)}...")
-                    aplicar_musica_fondo(
-                        video_seg,
-                        musica_path,
-                        volumen=musica_volumen,
-                        music_start=musica_inicio,
-                        music_end=musica_fin,
-                        video_start=musica_inicio_video,
-                        log_fn=logs,
-                    )
-                    mezclados.append(video_seg)
-                except Exception as exc:
-                    if logs:
-                        logs(f"Advertencia: música no aplicada en parte {idx} ({exc})")
-                    mezclados.append(video_seg)
-            output_videos = mezclados
+        output_videos = [publicadas.get(p, p) for p in partes]
+        if stop_control.should_stop():
+            if logs: logs("Proceso detenido por el usuario.")
+            return
         return {
             "videos": output_videos,
             "base_dir": base_dir,
@@ -511,26 +1051,50 @@ def procesar_corte_individual(
         if barra: barra.set(0)
 
 
-def _ffmpeg_escape_path(path: str) -> str:
-    return path.replace("'", r"'\\''")
+def _mezclar_musica_parte(manifiesto, video_seg: str, musica_path: str, params_musica: list, logs=None) -> str:
+    """
+    Mezcla la musica en <parte>_musica.mp4 y devuelve esa ruta (o la parte si
+    no hubo nada que mezclar). La parte queda sin musica, asi que cambiar o
+    quitar la musica nunca la mezcla dos veces.
+    """
+    raiz, ext = os.path.splitext(video_seg)
+    out_path = f"{raiz}_musica{ext or '.mp4'}"
+    huella_musica = manifiesto.huella_etapa("musica", params_musica, [video_seg, musica_path])
+    if manifiesto.vigente("musica", out_path, huella_musica):
+        return out_path
+    manifiesto.invalidar("musica", out_path)
+    resultado = aplicar_musica_fondo(
+        video_seg,
+        musica_path,
+        volumen=params_musica[0],
+        music_start=params_musica[1],
+        music_end=params_musica[2],
+        video_start=params_musica[3],
+        output_path=out_path,
+        log_fn=logs,
+    )
+    if resultado != out_path:
+        return video_seg
+    manifiesto.registrar("musica", out_path, huella_musica, [out_path])
+    return out_path
 
 
-def _extraer_segmento_audio(source: str, dest: str, start: float, duration: float, logs=None):
-    if duration <= 0:
-        raise ValueError("La duración del segmento debe ser mayor que cero.")
-    cmd = ["ffmpeg", "-y"]
-    if start > 0:
-        cmd += ["-ss", f"{start:.3f}"]
-    cmd += ["-i", source]
-    cmd += ["-t", f"{duration:.3f}"]
-    cmd += ["-acodec", "libmp3lame", "-b:a", "192k", dest]
-    os.makedirs(os.path.dirname(dest), exist_ok=True) if os.path.dirname(dest) else None
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        err = (result.stderr or "").strip()
-        if logs: logs(f"❌ Creación de segmento de audio falló: {err[-300:]}")
-        raise RuntimeError("No se pudo generar el segmento de audio.")
-    return dest
+def _registrar_origen(video: str, fuente: str, i: int, segundos_por_parte: float, start_sec: float, end_sec: float | None):
+    """
+    Anota en transcript_store de que rango de la fuente sale la parte i
+    (una por tramo de segundos_por_parte desde start_sec).
+    """
+    try:
+        fin = end_sec if end_sec is not None else obtener_duracion_segundos(fuente)
+        inicio = start_sec + i * segundos_por_parte
+        if inicio < fin:
+            transcript_store.registrar_origen(video, fuente, inicio, min(segundos_por_parte, fin - inicio))
+    except Exception:
+        pass
+
+
+def _ffmpeg_escape_path(path: str) -> str:
+    return path.replace("'", r"'\\''")
 
 
 def _concat_visualizadores(sources: list[str], output_path: str, logs=None):
@@ -557,7 +1121,7 @@ def _concat_visualizadores(sources: list[str], output_path: str, logs=None):
             "copy",
             output_path,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = ffmpeg_runner.run(cmd)
         if result.returncode != 0:
             err = (result.stderr or "").strip()
             if logs: logs(f"❌ Concatenación falló: {err[-300:]}")
@@ -589,32 +1153,41 @@ def _generar_visualizador_segmentado(
     logs=None,
     progress_callback=None,
 ):
+    """
+    Genera el visualizador por segmentos de segmento_segundos en paralelo
+    (core.part_pool) y los une con una sola concatenacion al final. Cada
+    segmento lee su tramo del audio original y se escribe una sola vez.
+    progress_callback(hechos, total) se llama al terminar cada segmento.
+    """
     duration = obtener_duracion_segundos(audio_path)
     if duration <= 0:
         duration = 0.1
     segmento_segundos = max(10.0, min(segmento_segundos or 60.0, duration))
     total_segments = max(1, int(math.ceil(duration / segmento_segundos)))
-    acumulado = None
-    start = 0.0
+    tramos = []
     for idx in range(total_segments):
-        if stop_control.should_stop():
-            raise RuntimeError("Proceso detenido por el usuario.")
+        start = idx * segmento_segundos
         parte_duracion = min(segmento_segundos, duration - start)
         if parte_duracion <= 0:
             break
-        segmento_audio = os.path.join(
-            visual_dir,
-            f"{base_name}_segmento_audio_{idx+1:03d}.mp3",
-        )
-        _extraer_segmento_audio(audio_path, segmento_audio, start, parte_duracion, logs=logs)
+        tramos.append((start, parte_duracion))
+
+    lock = threading.Lock()
+    hechos = [0]
+    creados = []
+
+    def _segmento(idx, tramo):
+        start, parte_duracion = tramo
         if logs:
             logs(f"🧱 Segmento {idx+1}/{total_segments}: {parte_duracion:.2f}s (desde {start:.2f}s)")
         segmento_video = os.path.join(
             visual_dir,
             f"{base_name}_segmento_vis_{idx+1:03d}.mp4",
         )
+        with lock:
+            creados.append(segmento_video)
         generar_visualizador_audio(
-            segmento_audio,
+            audio_path,
             segmento_video,
             width,
             height,
@@ -627,32 +1200,29 @@ def _generar_visualizador_segmentado(
             saturacion=saturacion,
             temperatura=temperatura,
             log_fn=logs,
+            inicio=start,
+            duracion=parte_duracion,
         )
-        if acumulado is None:
-            acumulado = segmento_video
-        else:
-            unido = os.path.join(visual_dir, f"{base_name}_acumulado_{idx+1:03d}.mp4")
-            _concat_visualizadores([acumulado, segmento_video], unido, logs=logs)
-            try:
-                os.remove(acumulado)
-            except Exception:
-                pass
-            try:
-                os.remove(segmento_video)
-            except Exception:
-                pass
-            acumulado = unido
-        try:
-            os.remove(segmento_audio)
-        except Exception:
-            pass
         if progress_callback:
-            progress_callback(idx + 1, total_segments)
-        start += parte_duracion
-    if not acumulado:
-        raise RuntimeError("No se generó ningún segmento del visualizador.")
-    if acumulado != salida_visual:
-        os.replace(acumulado, salida_visual)
+            with lock:
+                hechos[0] += 1
+                progress_callback(hechos[0], total_segments)
+        return segmento_video
+
+    try:
+        segmentos = ejecutar_partes(_segmento, tramos, log_fn=logs)
+        if stop_control.should_stop() or any(s is None for s in segmentos):
+            raise RuntimeError("Proceso detenido por el usuario.")
+        if not segmentos:
+            raise RuntimeError("No se generó ningún segmento del visualizador.")
+        _concat_visualizadores(segmentos, salida_visual, logs=logs)
+    finally:
+        for segmento_video in creados:
+            if segmento_video != salida_visual and os.path.exists(segmento_video):
+                try:
+                    os.remove(segmento_video)
+                except Exception:
+                    pass
     return salida_visual
 
 
@@ -715,7 +1285,7 @@ def generar_visualizador_solo(
             if duration and duration > 0:
                 cmd += ["-t", f"{duration:.3f}"]
             cmd += ["-acodec", "libmp3lame", "-b:a", "192k", trimmed_audio]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = ffmpeg_runner.run(cmd)
             if result.returncode != 0:
                 err = (result.stderr or "").strip()
                 if logs: logs(f"❌ Recorte de audio falló: {err[-300:]}")
@@ -765,62 +1335,58 @@ def procesar_srt(
         file_base = os.path.splitext(os.path.basename(path))[0]
         base_dir = output_base_dir(path)
         if es_audio:
-            audio_path = path
+            nombre_srt = file_base
             if logs: logs(f"Audio seleccionado: {path}")
         else:
+            nombre_srt = f"{file_base}_srt_source"
             if logs: logs(f"Video seleccionado: {path}")
-            audio_dir_base = os.path.join(base_dir, "audios")
-            os.makedirs(audio_dir_base, exist_ok=True)
-            audio_path = os.path.join(audio_dir_base, f"{file_base}_srt_source.mp3")
-            if logs: logs("Extrayendo audio para SRT...")
-            extraer_audio(path, audio_path, logs if logs else None)
+            if not tiene_audio(path):
+                raise RuntimeError("El video no tiene pista de audio.")
         subs_dir = os.path.join(base_dir, "subtitulos")
-        dur = obtener_duracion_segundos(audio_path)
-        if dur > 300:
-            partes = 6
-            if logs: logs(f"Duracion > 5 min. Dividiendo audio en {partes} partes...")
-            partes_paths = dividir_audio_ffmpeg_partes(audio_path, partes=partes, log_fn=logs if logs else None)
-            srt_parts = []
-            offsets = []
-            offset = 0.0
-            for idx, parte in enumerate(partes_paths, start=1):
-                if stop_control.should_stop():
-                    if logs: logs("Proceso detenido por el usuario.")
-                    return
-                if logs: logs(f"Transcribiendo parte {idx}/{len(partes_paths)}...")
-                srt_p = transcribir_srt(
-                    parte,
-                    subs_dir,
-                    idioma=idioma or "",
-                    model_size=model_size,
-                    temperature=temperature,
-                    beam_size=beam_size
-                )
-                srt_parts.append(srt_p)
-                offsets.append(offset)
-                try:
-                    offset += obtener_duracion_segundos(parte)
-                except Exception:
-                    pass
-            out_path = os.path.join(subs_dir, f"{file_base}_completo.srt")
-            combinar_srt_partes(srt_parts, offsets, out_path, log_fn=logs if logs else None)
-            if logs: logs(f"SRT final listo: {out_path}")
-            return out_path
-        else:
+        pcm_path = pcm.decodificar_pcm(
+            path,
+            os.path.join(base_dir, "audios", f"{file_base}_srt_16k.f32"),
+            log_fn=logs if logs else None
+        )
+        try:
+            dur = pcm.duracion_pcm(pcm_path)
             if stop_control.should_stop():
                 if logs: logs("Proceso detenido por el usuario.")
                 return
+            procesos = procesos_transcripcion()
+            largo = largo_tramo(dur, procesos) if dur > 300 else dur
+            # Tramos que terminan en pausas; los silencios largos no van a Whisper.
+            tramos = tramos_por_pausas(vad.segmentar_por_pausas(pcm.abrir_pcm(pcm_path), largo_objetivo=largo))
+            if not tramos:
+                if logs: logs("No se detectaron pausas de voz; se usan tramos fijos.")
+                tramos = planificar_tramos(dur, procesos) if dur > 300 else planificar_tramos(dur, 1, largo_objetivo=dur)
+            elif logs:
+                voz = sum(t["duracion"] for t in tramos)
+                logs(f"Voz detectada: {len(tramos)} tramos, {voz / 60:.1f} de {dur / 60:.1f} min.")
             if logs: logs("Transcribiendo...")
-            srt_path = transcribir_srt(
-                audio_path,
-                subs_dir,
+            resultados = transcribir_tramos(
+                [pcm.tramo(pcm_path, t["inicio"], t["duracion"]) for t in tramos],
                 idioma=idioma or "",
                 model_size=model_size,
                 temperature=temperature,
-                beam_size=beam_size
+                beam_size=beam_size,
+                procesos=procesos,
+                log_fn=logs if logs else None
             )
-            if logs: logs(f"SRT listo: {srt_path}")
-            return srt_path
+            if stop_control.should_stop() or any(r is None for r in resultados):
+                if logs: logs("Proceso detenido por el usuario.")
+                return
+            if dur > 300:
+                out_path = os.path.join(subs_dir, f"{file_base}_completo.srt")
+            else:
+                out_path = os.path.join(subs_dir, f"{nombre_srt}.srt")
+            segmentos = unir_segmentos_tramos(resultados, tramos)
+            escribir_srt_segmentos(segmentos, out_path, log_fn=logs if logs else None)
+            transcript_store.guardar(path, segmentos, 0.0, dur, idioma=idioma or "", modelo=model_size)
+            if logs: logs(f"SRT listo: {out_path}")
+            return out_path
+        finally:
+            limpiar_temp(pcm_path)
     except Exception as e:
         if logs: logs(f"Error: {e}")
         raise e
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
+import hashlib
+import json
+import os
 import re
+import time
 from typing import Any
 
-import requests
 from requests.exceptions import HTTPError, ReadTimeout, RequestException
 
+from core import http_client, youtube_store
 from core.api_endpoints import get_primary_endpoint_url
+from core.youtube_credentials import load_active_credentials
 from core.youtube_upload import obtener_token_activo
 
 YOUTUBE_API_BASE = get_primary_endpoint_url("YouTube Data")
@@ -22,6 +28,31 @@ YOUTUBE_ANALYTICS_REPORTS_URL = get_primary_endpoint_url("YouTube Analytics repo
 DEFAULT_ANALYTICS_METRICS = ("views", "estimatedMinutesWatched", "averageViewDuration")
 YOUTUBE_REQUEST_TIMEOUT = (10, 90)
 YOUTUBE_MAX_RETRIES = 2
+YOUTUBE_VIDEO_PARTS = "snippet,contentDetails,status,statistics"
+
+# Almacen local (core/youtube_store.py): lo sincronizado hace menos de
+# ZEMPER_YOUTUBE_SYNC_MIN minutos se sirve sin consultar la API.
+SYNC_MIN_ENV = "ZEMPER_YOUTUBE_SYNC_MIN"
+SYNC_MIN_DEFECTO = 15
+DETALLES_TTL = 24 * 3600
+SYNC_COMPLETA_TTL = 7 * 24 * 3600
+MAX_SUBIDAS = 5000
+# Analytics consolida los datos con unos dias de atraso: los reportes que
+# incluyen esos dias se guardan como provisorios y se vuelven a pedir.
+DIAS_PROVISORIOS = 3
+MAX_DIAS_PENDIENTES = 92
+MAX_FILAS_DIA = 200
+HILOS_ANALITICA = 4
+HILOS_DATA = 6
+METRICAS_ADITIVAS = frozenset(
+    {
+        "views", "comments", "likes", "dislikes", "shares",
+        "estimatedMinutesWatched", "subscribersGained", "subscribersLost",
+        "videosAddedToPlaylists", "videosRemovedFromPlaylists",
+    }
+)
+# Promedios que se recalculan desde las sumas: metrica -> (numerador, denominador, factor).
+METRICAS_DERIVADAS = {"averageViewDuration": ("estimatedMinutesWatched", "views", 60.0)}
 
 
 def _parse_duration(duration: str) -> float:
@@ -35,15 +66,19 @@ def _parse_duration(duration: str) -> float:
     return hours * 3600 + minutes * 60 + seconds
 
 
-def _request(url: str, params: dict[str, Any], log_fn=None) -> dict[str, Any]:
+def _get(url: str, params: dict[str, Any], log_fn=None, etag: str | None = None):
     token = obtener_token_activo(log_fn=log_fn)
     headers = {"Authorization": f"Bearer {token}"}
+    if etag:
+        headers["If-None-Match"] = etag
     last_exc: Exception | None = None
     for attempt in range(1, YOUTUBE_MAX_RETRIES + 1):
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=YOUTUBE_REQUEST_TIMEOUT)
+            response = http_client.get(url, params=params, headers=headers, timeout=YOUTUBE_REQUEST_TIMEOUT)
+            if response.status_code == 304:
+                return response
             response.raise_for_status()
-            return response.json()
+            return response
         except ReadTimeout as exc:
             last_exc = exc
             if log_fn:
@@ -56,6 +91,177 @@ def _request(url: str, params: dict[str, Any], log_fn=None) -> dict[str, Any]:
     raise last_exc  # pragma: no cover
 
 
+def _request(url: str, params: dict[str, Any], log_fn=None) -> dict[str, Any]:
+    return _get(url, params, log_fn=log_fn).json()
+
+
+def _request_condicional(
+    url: str, params: dict[str, Any], etag: str | None, log_fn=None
+) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    GET con If-None-Match: (None, etag) si no cambio (304, no gasta cuota de
+    lectura), si no (payload, etag nuevo).
+    """
+    response = _get(url, params, log_fn=log_fn, etag=etag)
+    if response.status_code == 304:
+        return None, etag
+    payload = response.json()
+    return payload, payload.get("etag") or response.headers.get("ETag")
+
+
+def _en_paralelo(fn, items: list, hilos: int) -> list:
+    """
+    fn(item) para cada item con hasta hilos pedidos a la vez; resultados en
+    el orden de items. El primer error se relanza.
+    """
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(hilos, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+def _ttl_sync() -> float:
+    try:
+        minutos = float(os.getenv(SYNC_MIN_ENV, "") or SYNC_MIN_DEFECTO)
+    except ValueError:
+        minutos = SYNC_MIN_DEFECTO
+    return max(0.0, minutos) * 60
+
+
+def _cuenta_activa() -> str:
+    creds = load_active_credentials()
+    return hashlib.sha1(f"{creds.client_id}|{creds.refresh_token}".encode("utf-8")).hexdigest()[:16]
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value)
+    except Exception:
+        return 0
+
+
+def _fila_video(video: dict[str, Any]) -> dict[str, Any]:
+    snippet = video.get("snippet") or {}
+    stats = video.get("statistics") or {}
+    return {
+        "video_id": str(video.get("id") or ""),
+        "title": snippet.get("title") or "",
+        "published_at": snippet.get("publishedAt"),
+        "duration_seconds": _parse_duration((video.get("contentDetails") or {}).get("duration", "")),
+        "privacy_status": (video.get("status") or {}).get("privacyStatus") or "",
+        "view_count": _to_int(stats.get("viewCount")),
+        "like_count": _to_int(stats.get("likeCount")),
+        "comment_count": _to_int(stats.get("commentCount")),
+    }
+
+
+def _asset(fila: dict[str, Any]) -> dict[str, Any]:
+    duration_seconds = float(fila.get("duration_seconds") or 0)
+    return {
+        "video_id": fila.get("video_id"),
+        "title": fila.get("title") or "",
+        "duration_seconds": duration_seconds,
+        "duration_formatted": f"{int(duration_seconds // 60):02d}:{int(duration_seconds % 60):02d}",
+        "is_short": duration_seconds <= 60,
+        "published_at": fila.get("published_at"),
+        "privacy_status": fila.get("privacy_status") or "",
+    }
+
+
+def _sincronizar_detalles(video_ids: list[str], log_fn=None, ttl: float = DETALLES_TTL):
+    """
+    Trae snippet/duracion/estado/estadisticas de los videos que faltan en el
+    almacen o tienen mas de ttl segundos, en lotes de 50 pedidos en paralelo
+    (HILOS_DATA a la vez). Cada lote guarda su ETag: si YouTube responde 304
+    el lote solo se marca como vigente. Conviene pasar los ids en un orden
+    estable (subidas de la mas vieja a la mas nueva) para que los lotes, y
+    sus ETag, se repitan entre sincronizaciones.
+    """
+    guardados = youtube_store.videos(video_ids)
+    ahora = time.time()
+    pendientes = [
+        chunk
+        for chunk in (video_ids[i : i + 50] for i in range(0, len(video_ids), 50))
+        if not all(v in guardados and ahora - guardados[v]["actualizado"] < ttl for v in chunk)
+    ]
+
+    def _consultar_lote(chunk: list[str]):
+        lote = ",".join(chunk)
+        etag = youtube_store.etag_lote(lote) if all(v in guardados for v in chunk) else None
+        payload, etag = _request_condicional(
+            YOUTUBE_VIDEOS_URL, {"part": YOUTUBE_VIDEO_PARTS, "id": lote}, etag, log_fn=log_fn
+        )
+        if payload is None:
+            youtube_store.tocar_videos(chunk)
+            return
+        youtube_store.guardar_videos([_fila_video(v) for v in payload.get("items") or [] if v.get("id")])
+        youtube_store.guardar_etag_lote(lote, etag)
+
+    if len(pendientes) > 1 and log_fn:
+        log_fn(f"YouTube: actualizando detalles de {len(pendientes)} lote(s) de videos...")
+    _en_paralelo(_consultar_lote, pendientes, HILOS_DATA)
+
+
+def _sincronizar_subidas(cuenta_id: str, log_fn=None):
+    """
+    Pagina el playlist "uploads" (mas nuevo primero) hasta el primer video ya
+    guardado. Cada SYNC_COMPLETA_TTL se recorre entero para sacar los videos
+    borrados del canal.
+    """
+    info = youtube_store.cuenta(cuenta_id)
+    completa = not info or youtube_store.antiguedad(cuenta_id, "subidas_completa") > SYNC_COMPLETA_TTL
+    if info:
+        uploads_id = info["uploads"]
+    else:
+        channels = _request(YOUTUBE_CHANNELS_URL, {"part": "contentDetails", "mine": True}, log_fn=log_fn)
+        items = channels.get("items") or []
+        if not items:
+            raise RuntimeError("No se encontró ningún canal activo.")
+        uploads_id = items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+        youtube_store.guardar_cuenta(cuenta_id, items[0].get("id") or "", uploads_id)
+
+    conocidos = set() if completa else youtube_store.ids_subidas(cuenta_id)
+    nuevos: list[tuple[str, str]] = []
+    page_token: str | None = None
+    while len(nuevos) < MAX_SUBIDAS:
+        params: dict[str, Any] = {"part": "snippet", "playlistId": uploads_id, "maxResults": 50}
+        if page_token:
+            params["pageToken"] = page_token
+        playlist_items = _request(YOUTUBE_PLAYLIST_ITEMS_URL, params, log_fn=log_fn)
+        alcanzado = False
+        for item in playlist_items.get("items", []) or []:
+            snippet = item.get("snippet") or {}
+            vid = ((snippet.get("resourceId") or {}).get("videoId")) or None
+            if not vid:
+                continue
+            if str(vid) in conocidos:
+                alcanzado = True
+                break
+            nuevos.append((str(vid), snippet.get("publishedAt") or ""))
+        page_token = playlist_items.get("nextPageToken")
+        if alcanzado or not page_token:
+            break
+
+    youtube_store.guardar_subidas(cuenta_id, nuevos, reemplazar=completa)
+    youtube_store.marcar_sync(cuenta_id, "subidas")
+    if completa:
+        youtube_store.marcar_sync(cuenta_id, "subidas_completa")
+    elif nuevos and log_fn:
+        log_fn(f"YouTube: {len(nuevos)} video(s) nuevo(s) en el canal.")
+    ids = [fila["video_id"] for fila in reversed(youtube_store.subidas(cuenta_id))]
+    _sincronizar_detalles(ids, log_fn=log_fn)
+
+
+def _detalles(video_ids: list[str], log_fn=None) -> dict[str, dict[str, Any]]:
+    """
+    Metadatos (mismo formato que listar_videos_subidos) desde el almacen,
+    trayendo antes los que falten.
+    """
+    ids = sorted(set(video_ids))
+    _sincronizar_detalles(ids, log_fn=log_fn)
+    return {vid: _asset(fila) for vid, fila in youtube_store.videos(ids).items()}
+
+
 def _to_iso_date(value: str | date | datetime | None) -> str | None:
     if not value:
         return None
@@ -76,73 +282,164 @@ def _parse_video_dimension(value: str | None) -> str | None:
     return text
 
 
-def listar_videos_subidos(max_results: int = 25, *, only_public: bool = False, log_fn=None) -> list[dict[str, Any]]:
+def listar_videos_subidos(
+    max_results: int = 25,
+    *,
+    only_public: bool = False,
+    forzar: bool = False,
+    log_fn=None,
+) -> list[dict[str, Any]]:
     """
     Lista videos del playlist "uploads" del canal autenticado.
 
     - `max_results`: cantidad a devolver. Si <= 0, intenta traer todos (paginando).
     - `only_public`: filtra por `privacyStatus == public`.
+    - `forzar`: sincroniza con YouTube aunque el almacen local este vigente.
     """
     limit = int(max_results)
     fetch_all = limit <= 0
     if fetch_all:
         # guardrail: YouTube uploads playlist can be huge; keep it large but bounded.
-        limit = 5000
+        limit = MAX_SUBIDAS
 
-    channels = _request(YOUTUBE_CHANNELS_URL, {"part": "contentDetails", "mine": True}, log_fn=log_fn)
-    items = channels.get("items") or []
-    if not items:
-        raise RuntimeError("No se encontró ningún canal activo.")
-    uploads_id = items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+    cuenta_id = _cuenta_activa()
+    if forzar or youtube_store.antiguedad(cuenta_id, "subidas") > _ttl_sync():
+        _sincronizar_subidas(cuenta_id, log_fn=log_fn)
 
-    video_ids: list[str] = []
-    page_token: str | None = None
-    while len(video_ids) < limit:
-        batch = min(50, limit - len(video_ids))
-        params: dict[str, Any] = {"part": "snippet", "playlistId": uploads_id, "maxResults": batch}
-        if page_token:
-            params["pageToken"] = page_token
-        playlist_items = _request(YOUTUBE_PLAYLIST_ITEMS_URL, params, log_fn=log_fn)
-        for item in playlist_items.get("items", []) or []:
-            vid = (((item.get("snippet") or {}).get("resourceId") or {}).get("videoId")) or None
-            if vid:
-                video_ids.append(str(vid))
-                if len(video_ids) >= limit:
-                    break
-        page_token = playlist_items.get("nextPageToken")
-        if not page_token:
-            break
+    assets: list[dict[str, Any]] = []
+    for fila in youtube_store.subidas(cuenta_id)[:limit]:
+        if fila.get("actualizado") is None:
+            # Sin detalles: YouTube ya no devuelve el video.
+            continue
+        asset = _asset(fila)
+        if only_public and asset["privacy_status"] != "public":
+            continue
+        assets.append(asset)
+    return assets
 
-    if not video_ids:
-        return []
 
-    # Fetch video details in batches of 50 (API limit).
-    assets: list[dict[str, Any]] = []
-    for i in range(0, len(video_ids), 50):
-        chunk = video_ids[i : i + 50]
-        videos = _request(
-            YOUTUBE_VIDEOS_URL,
-            {"part": "snippet,contentDetails,status", "id": ",".join(chunk)},
-            log_fn=log_fn,
+def _reporte(params: dict[str, Any], log_fn=None) -> list[dict[str, Any]]:
+    response = _request(YOUTUBE_ANALYTICS_REPORTS_URL, params, log_fn=log_fn)
+    headers = response.get("columnHeaders") or []
+    rows = response.get("rows") or []
+    column_names = [
+        header.get("name") or f"column_{idx}"
+        for idx, header in enumerate(headers)
+    ]
+    return [dict(zip(column_names, row)) for row in rows]
+
+
+class _DiaTruncado(Exception):
+    pass
+
+
+def _clave_consulta(*valores) -> str:
+    return hashlib.sha1(json.dumps([_cuenta_activa(), *valores], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _reporte_rango(params: dict[str, Any], log_fn=None) -> list[dict[str, Any]]:
+    """
+    Reporte del rango completo en un solo pedido, guardado por rango (mismos
+    parametros). Si el rango toca los dias provisorios vence a los
+    ZEMPER_YOUTUBE_SYNC_MIN minutos.
+    """
+    consulta = _clave_consulta(params)
+    filas = youtube_store.reporte(consulta, _ttl_sync())
+    if filas is None:
+        filas = _reporte(params, log_fn=log_fn)
+        provisorio_desde = (date.today() - timedelta(days=DIAS_PROVISORIOS)).isoformat()
+        youtube_store.guardar_reporte(consulta, filas, final=str(params["endDate"]) < provisorio_desde)
+    return filas
+
+
+def _reporte_por_dias(params: dict[str, Any], log_fn=None) -> list[dict[str, Any]] | None:
+    """
+    Arma el reporte sumando reportes de un dia guardados en el almacen y pide
+    solo los dias que faltan (o los provisorios vencidos). Solo para
+    consultas que un dia no puede truncar: dimension=day (un solo pedido por
+    rango, cada fila ya es un dia), o filtradas por video (p. ej. vistas por
+    pais de un video; un pedido por dia). None si no se puede descomponer
+    (metricas no aditivas, varias dimensiones, demasiados dias sin guardar,
+    algun dia con MAX_FILAS_DIA filas): entonces se pide el rango completo.
+    """
+    metrics = params["metrics"].split(",")
+    dimension = params["dimensions"]
+    orden = params["sort"].lstrip("-")
+    if "," in dimension or (orden not in metrics and not (dimension == "day" and orden == "day")):
+        return None
+    if dimension != "day" and "video==" not in (params.get("filters") or ""):
+        return None
+    for metrica in metrics:
+        derivada = METRICAS_DERIVADAS.get(metrica)
+        if metrica not in METRICAS_ADITIVAS and not (derivada and all(m in metrics for m in derivada[:2])):
+            return None
+    try:
+        desde = date.fromisoformat(params["startDate"])
+        hasta = date.fromisoformat(params["endDate"])
+    except ValueError:
+        return None
+    if hasta < desde:
+        return None
+
+    dias = [(desde + timedelta(days=i)).isoformat() for i in range((hasta - desde).days + 1)]
+    # Sin el orden: los dias guardados no dependen de el.
+    consulta = _clave_consulta(params["ids"], sorted(metrics), dimension, params.get("filters"))
+    pendientes = youtube_store.dias_pendientes(consulta, dias, _ttl_sync())
+    if dimension != "day" and len(pendientes) > MAX_DIAS_PENDIENTES:
+        return None
+
+    aditivas = [m for m in metrics if m in METRICAS_ADITIVAS]
+    provisorio_desde = (date.today() - timedelta(days=DIAS_PROVISORIOS)).isoformat()
+
+    def _bajar_dia(dia: str):
+        filas = _reporte({**params, "startDate": dia, "endDate": dia, "maxResults": MAX_FILAS_DIA}, log_fn=log_fn)
+        if len(filas) >= MAX_FILAS_DIA:
+            raise _DiaTruncado(dia)
+        youtube_store.guardar_dia(
+            consulta,
+            dia,
+            {str(fila.get(dimension)): {m: fila.get(m) for m in aditivas} for fila in filas},
+            final=dia < provisorio_desde,
         )
-        for video in videos.get("items", []) or []:
-            privacy = (video.get("status", {}) or {}).get("privacyStatus") or ""
-            if only_public and privacy != "public":
-                continue
-            duration_seconds = _parse_duration(video.get("contentDetails", {}).get("duration", ""))
-            assets.append(
-                {
-                    "video_id": video.get("id"),
-                    "title": video.get("snippet", {}).get("title", ""),
-                    "duration_seconds": duration_seconds,
-                    "duration_formatted": f"{int(duration_seconds // 60):02d}:{int(duration_seconds % 60):02d}",
-                    "is_short": duration_seconds <= 60,
-                    "published_at": video.get("snippet", {}).get("publishedAt"),
-                    "privacy_status": privacy,
-                }
+
+    if pendientes and dimension == "day":
+        # Un solo pedido desde el primer dia pendiente hasta el ultimo.
+        tramo = dias[dias.index(pendientes[0]): dias.index(pendientes[-1]) + 1]
+        if log_fn:
+            log_fn(f"Analytics: consultando {len(tramo)} día(s) sin guardar...")
+        pedido = {clave: valor for clave, valor in params.items() if clave != "maxResults"}
+        por_dia = {
+            str(fila.get("day")): fila
+            for fila in _reporte({**pedido, "startDate": tramo[0], "endDate": tramo[-1]}, log_fn=log_fn)
+        }
+        for dia in tramo:
+            fila = por_dia.get(dia)
+            youtube_store.guardar_dia(
+                consulta,
+                dia,
+                {dia: {m: fila.get(m) for m in aditivas}} if fila else {},
+                final=dia < provisorio_desde,
             )
+    elif pendientes:
+        if log_fn:
+            log_fn(f"Analytics: consultando {len(pendientes)} día(s) sin guardar...")
+        try:
+            _en_paralelo(_bajar_dia, pendientes, HILOS_ANALITICA)
+        except _DiaTruncado:
+            return None
 
-    return assets
+    filas: list[dict[str, Any]] = []
+    for valor, sumas in youtube_store.sumar_dias(consulta, dias[0], dias[-1]).items():
+        fila: dict[str, Any] = {dimension: valor}
+        for metrica in metrics:
+            if metrica in METRICAS_DERIVADAS:
+                numerador, denominador, factor = METRICAS_DERIVADAS[metrica]
+                fila[metrica] = sumas.get(numerador, 0) * factor / sumas[denominador] if sumas.get(denominador) else 0
+            else:
+                fila[metrica] = sumas.get(metrica, 0)
+        filas.append(fila)
+    filas.sort(key=lambda f: f.get(orden) or 0, reverse=params["sort"].startswith("-"))
+    return filas[: max(0, int(params["maxResults"]))]
 
 
 def obtener_analitica_videos(
@@ -159,6 +456,8 @@ def obtener_analitica_videos(
 ) -> list[dict[str, Any]]:
     """
     Llama al endpoint de YouTube Analytics Reports y devuelve cada fila como dict.
+    Los reportes quedan en el almacen local: por rango, o dia por dia cuando
+    se pueden sumar sin truncar (ver _reporte_por_dias).
     """
     if not metrics:
         raise ValueError("Debe especificarse al menos una métrica para el reporte.")
@@ -174,14 +473,10 @@ def obtener_analitica_videos(
     }
     if filters:
         params["filters"] = filters
-    response = _request(YOUTUBE_ANALYTICS_REPORTS_URL, params, log_fn=log_fn)
-    headers = response.get("columnHeaders") or []
-    rows = response.get("rows") or []
-    column_names = [
-        header.get("name") or f"column_{idx}"
-        for idx, header in enumerate(headers)
-    ]
-    return [dict(zip(column_names, row)) for row in rows]
+    rows = _reporte_por_dias(params, log_fn=log_fn)
+    if rows is None:
+        rows = _reporte_rango(params, log_fn=log_fn)
+    return rows
 
 
 def obtener_analitica_videos_y_shorts(
@@ -233,35 +528,36 @@ def obtener_estadisticas_video(video_id: str, log_fn=None) -> dict[str, Any]:
     Obtiene estadísticas básicas del video mediante YouTube Data API.
 
     Devuelve: title, published_at, view_count, like_count, comment_count.
+    Desde el almacen local si se consultaron hace menos de ZEMPER_YOUTUBE_SYNC_MIN.
     """
     video_id = (video_id or "").strip()
     if not video_id:
         raise ValueError("video_id requerido.")
-    payload = _request(
-        YOUTUBE_VIDEOS_URL,
-        {"part": "snippet,statistics", "id": video_id},
-        log_fn=log_fn,
-    )
-    items = payload.get("items") or []
-    if not items:
-        raise RuntimeError("Video no encontrado en YouTube Data API.")
-    video = items[0]
-    snippet = video.get("snippet") or {}
-    stats = video.get("statistics") or {}
-
-    def _to_int(value: Any) -> int:
-        try:
-            return int(value)
-        except Exception:
-            return 0
+    fila = youtube_store.videos([video_id]).get(video_id)
+    if not fila or time.time() - fila["actualizado"] > _ttl_sync():
+        payload, etag = _request_condicional(
+            YOUTUBE_VIDEOS_URL,
+            {"part": YOUTUBE_VIDEO_PARTS, "id": video_id},
+            youtube_store.etag_lote(video_id) if fila else None,
+            log_fn=log_fn,
+        )
+        if payload is None:
+            youtube_store.tocar_videos([video_id])
+        else:
+            items = payload.get("items") or []
+            if not items:
+                raise RuntimeError("Video no encontrado en YouTube Data API.")
+            fila = _fila_video(items[0])
+            youtube_store.guardar_videos([fila])
+            youtube_store.guardar_etag_lote(video_id, etag)
 
     return {
         "video_id": video_id,
-        "title": snippet.get("title") or "",
-        "published_at": snippet.get("publishedAt"),
-        "view_count": _to_int(stats.get("viewCount")),
-        "like_count": _to_int(stats.get("likeCount")),
-        "comment_count": _to_int(stats.get("commentCount")),
+        "title": fila.get("title") or "",
+        "published_at": fila.get("published_at"),
+        "view_count": _to_int(fila.get("view_count")),
+        "like_count": _to_int(fila.get("like_count")),
+        "comment_count": _to_int(fila.get("comment_count")),
     }
 
 
@@ -280,92 +576,72 @@ def obtener_vistas_por_pais(
     video_id = (video_id or "").strip()
     if not video_id:
         raise ValueError("video_id requerido.")
-    today = date.today()
-    params = {
-        "startDate": _to_iso_date(start_date) or (today - timedelta(days=30)).isoformat(),
-        "endDate": _to_iso_date(end_date) or today.isoformat(),
-        "ids": ids,
-        "metrics": "views",
-        "dimensions": "country",
-        "filters": f"video=={video_id}",
-        "maxResults": max_results,
-        "sort": "-views",
+    rows = obtener_analitica_videos(
+        start_date=start_date,
+        end_date=end_date,
+        ids=ids,
+        metrics=("views",),
+        dimension="country",
+        filters=f"video=={video_id}",
+        max_results=max_results,
+        sort="-views",
+        log_fn=log_fn,
+    )
+    return [{"country": row.get("country"), "views": row.get("views")} for row in rows]
+
+
+def _comentario(comment: dict[str, Any]) -> dict[str, Any]:
+    snippet = comment.get("snippet") or {}
+    return {
+        "comment_id": comment.get("id"),
+        "author": snippet.get("authorDisplayName") or "",
+        "text": snippet.get("textDisplay") or snippet.get("textOriginal") or "",
+        "like_count": snippet.get("likeCount") or 0,
+        "published_at": snippet.get("publishedAt"),
+        "updated_at": snippet.get("updatedAt"),
     }
-    response = _request(YOUTUBE_ANALYTICS_REPORTS_URL, params, log_fn=log_fn)
-    rows = response.get("rows") or []
-    out: list[dict[str, Any]] = []
-    for row in rows:
-        if not isinstance(row, list) or len(row) < 2:
-            continue
-        out.append({"country": row[0], "views": row[1]})
-    return out
 
 
-def listar_comentarios_video(
-    *,
+def _fecha_publicacion(value: Any) -> date | None:
+    if not value:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    # Typical: 2026-02-03T12:34:56Z
+    try:
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        return datetime.fromisoformat(text).date()
+    except Exception:
+        try:
+            return date.fromisoformat(text[:10])
+        except Exception:
+            return None
+
+
+def _descargar_comentarios(
     video_id: str,
-    max_results: int = 20,
-    order: str = "time",
-    include_replies: bool = False,
-    start_date: str | date | datetime | None = None,
-    end_date: str | date | datetime | None = None,
+    *,
+    limit: int,
+    order: str,
+    include_replies: bool,
+    start_cut: date | None = None,
+    end_cut: date | None = None,
+    conocidos: set[str] | None = None,
     log_fn=None,
-) -> list[dict[str, Any]]:
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]], bool]:
     """
-    Lista comentarios (top-level) de un video (YouTube Data API).
-
-    Limitaciones:
-    - Si los comentarios están deshabilitados, la API devuelve error.
-    - No incluye comentarios "held for review" / moderados.
-    - Por defecto devuelve solo top-level; `include_replies=True` añade respuestas cuando existan.
+    Baja comentarios desde la primera pagina. Devuelve (resultados filtrados,
+    top-level vistos sin filtrar, agotado: se recorrieron todas las paginas).
+    Con conocidos, corta en el primer comentario ya guardado (que queda
+    como ultimo de vistos).
     """
-    video_id = (video_id or "").strip()
-    if not video_id:
-        raise ValueError("video_id requerido.")
-    limit = int(max_results)
-    if limit <= 0:
-        # "Todos" con guardrail para evitar UI/requests infinitos.
-        limit = 5000
-    else:
-        limit = min(limit, 5000)
-
     results: list[dict[str, Any]] = []
+    vistos: list[dict[str, Any]] = []
     page_token: str | None = None
     part = "snippet,replies" if include_replies else "snippet"
-
-    def _extract_comment(comment: dict[str, Any]) -> dict[str, Any]:
-        snippet = comment.get("snippet") or {}
-        return {
-            "comment_id": comment.get("id"),
-            "author": snippet.get("authorDisplayName") or "",
-            "text": snippet.get("textDisplay") or snippet.get("textOriginal") or "",
-            "like_count": snippet.get("likeCount") or 0,
-            "published_at": snippet.get("publishedAt"),
-            "updated_at": snippet.get("updatedAt"),
-        }
-
-    start_iso = _to_iso_date(start_date)
-    end_iso = _to_iso_date(end_date)
-    start_cut = date.fromisoformat(start_iso) if start_iso else None
-    end_cut = date.fromisoformat(end_iso) if end_iso else None
-
-    def _published_date(value: Any) -> date | None:
-        if not value:
-            return None
-        text = str(value).strip()
-        if not text:
-            return None
-        # Typical: 2026-02-03T12:34:56Z
-        try:
-            if text.endswith("Z"):
-                text = text[:-1] + "+00:00"
-            return datetime.fromisoformat(text).date()
-        except Exception:
-            try:
-                return date.fromisoformat(text[:10])
-            except Exception:
-                return None
-
+    cortado = False
     while len(results) < limit:
         batch = min(100, limit - len(results))
         params: dict[str, Any] = {
@@ -382,8 +658,11 @@ def listar_comentarios_video(
         for item in payload.get("items") or []:
             top = (((item.get("snippet") or {}).get("topLevelComment")) or {})
             if top:
-                entry = _extract_comment(top)
-                published = _published_date(entry.get("published_at"))
+                entry = _comentario(top)
+                vistos.append(entry)
+                if conocidos is not None and entry.get("comment_id") in conocidos:
+                    return results, vistos, False
+                published = _fecha_publicacion(entry.get("published_at"))
                 if start_cut and published and published < start_cut:
                     stop_early = True
                 if (start_cut and published and published < start_cut) or (end_cut and published and published > end_cut):
@@ -391,12 +670,13 @@ def listar_comentarios_video(
                 else:
                     results.append(entry)
                 if len(results) >= limit:
+                    cortado = True
                     break
             if include_replies:
                 replies = ((item.get("replies") or {}).get("comments")) or []
                 for reply in replies:
-                    entry = _extract_comment(reply)
-                    published = _published_date(entry.get("published_at"))
+                    entry = _comentario(reply)
+                    published = _fecha_publicacion(entry.get("published_at"))
                     if start_cut and published and published < start_cut:
                         stop_early = True
                     if (start_cut and published and published < start_cut) or (end_cut and published and published > end_cut):
@@ -405,10 +685,101 @@ def listar_comentarios_video(
                     if len(results) >= limit:
                         break
         if stop_early and order == "time":
-            break
+            return results, vistos, False
         page_token = payload.get("nextPageToken")
         if not page_token:
-            break
+            return results, vistos, not cortado
+    return results, vistos, False
+
+
+def _guardar_comentarios(video_id: str, vistos: list[dict[str, Any]], agotado: bool, estado: dict | None):
+    # vistos es un tramo contiguo desde el comentario mas nuevo: si llega a uno
+    # ya guardado se suma a la cobertura anterior, si no la reemplaza.
+    conocidos = youtube_store.ids_comentarios(video_id) if estado else set()
+    if agotado:
+        completo, desde = True, None
+    elif estado and (not vistos or any(c.get("comment_id") in conocidos for c in vistos)):
+        completo, desde = bool(estado["completo"]), estado["desde"]
+    else:
+        completo, desde = False, (vistos[-1].get("published_at") if vistos else None)
+    youtube_store.guardar_comentarios(video_id, vistos, completo=completo, desde=desde)
+
+
+def listar_comentarios_video(
+    *,
+    video_id: str,
+    max_results: int = 20,
+    order: str = "time",
+    include_replies: bool = False,
+    start_date: str | date | datetime | None = None,
+    end_date: str | date | datetime | None = None,
+    log_fn=None,
+) -> list[dict[str, Any]]:
+    """
+    Lista comentarios (top-level) de un video (YouTube Data API).
+
+    Limitaciones:
+    - Si los comentarios están deshabilitados, la API devuelve error.
+    - No incluye comentarios "held for review" / moderados.
+    - Por defecto devuelve solo top-level; `include_replies=True` añade respuestas cuando existan.
+
+    Con order="time" y sin respuestas, los comentarios quedan en el almacen
+    local y las consultas siguientes solo piden los nuevos.
+    """
+    video_id = (video_id or "").strip()
+    if not video_id:
+        raise ValueError("video_id requerido.")
+    limit = int(max_results)
+    if limit <= 0:
+        # "Todos" con guardrail para evitar UI/requests infinitos.
+        limit = 5000
+    else:
+        limit = min(limit, 5000)
+
+    start_iso = _to_iso_date(start_date)
+    end_iso = _to_iso_date(end_date)
+    start_cut = date.fromisoformat(start_iso) if start_iso else None
+    end_cut = date.fromisoformat(end_iso) if end_iso else None
+
+    if order != "time" or include_replies:
+        return _descargar_comentarios(
+            video_id,
+            limit=limit,
+            order=order,
+            include_replies=include_replies,
+            start_cut=start_cut,
+            end_cut=end_cut,
+            log_fn=log_fn,
+        )[0]
+
+    estado = youtube_store.estado_comentarios(video_id)
+    if estado:
+        if time.time() - estado["actualizado"] > _ttl_sync():
+            _, nuevos, agotado = _descargar_comentarios(
+                video_id,
+                limit=5000,
+                order="time",
+                include_replies=False,
+                conocidos=youtube_store.ids_comentarios(video_id),
+                log_fn=log_fn,
+            )
+            _guardar_comentarios(video_id, nuevos, agotado, estado)
+            estado = youtube_store.estado_comentarios(video_id)
+        cubierto = None if estado["completo"] else estado["desde"]
+        locales = youtube_store.comentarios(video_id, limit, start_iso, end_iso, cubierto_desde=cubierto)
+        if estado["completo"] or (cubierto and start_iso and cubierto[:10] < start_iso) or len(locales) >= limit:
+            return locales
+
+    results, vistos, agotado = _descargar_comentarios(
+        video_id,
+        limit=limit,
+        order="time",
+        include_replies=False,
+        start_cut=start_cut,
+        end_cut=end_cut,
+        log_fn=log_fn,
+    )
+    _guardar_comentarios(video_id, vistos, agotado, estado)
     return results
 
 
@@ -454,23 +825,8 @@ def obtener_videos_mas_comentados(
         videos = listar_videos_subidos(max_results=0, only_public=only_public, log_fn=log_fn)
         if not videos:
             return []
-        ids_list = [str(v.get("video_id") or "") for v in videos if v.get("video_id")]
-        comment_counts: dict[str, int] = {}
-        for i in range(0, len(ids_list), 50):
-            chunk = ids_list[i : i + 50]
-            payload = _request(
-                YOUTUBE_VIDEOS_URL,
-                {"part": "statistics", "id": ",".join(chunk)},
-                log_fn=log_fn,
-            )
-            for item in payload.get("items", []) or []:
-                vid = item.get("id")
-                if not vid:
-                    continue
-                try:
-                    comment_counts[str(vid)] = int((item.get("statistics") or {}).get("commentCount") or 0)
-                except Exception:
-                    comment_counts[str(vid)] = 0
+        guardados = youtube_store.videos([str(v.get("video_id") or "") for v in videos if v.get("video_id")])
+        comment_counts = {vid: _to_int(fila.get("comment_count")) for vid, fila in guardados.items()}
         ranked: list[dict[str, Any]] = []
         for v in videos:
             vid = str(v.get("video_id") or "")
@@ -500,29 +856,8 @@ def obtener_videos_mas_comentados(
     if not video_ids:
         return []
 
-    # Fetch title/duration/privacy in batches using Data API.
-    meta: dict[str, dict[str, Any]] = {}
-    for i in range(0, len(video_ids), 50):
-        chunk = video_ids[i : i + 50]
-        payload = _request(
-            YOUTUBE_VIDEOS_URL,
-            {"part": "snippet,contentDetails,status", "id": ",".join(chunk)},
-            log_fn=log_fn,
-        )
-        for video in payload.get("items", []) or []:
-            vid = video.get("id")
-            if not vid:
-                continue
-            privacy = (video.get("status", {}) or {}).get("privacyStatus") or ""
-            duration_seconds = _parse_duration(video.get("contentDetails", {}).get("duration", ""))
-            meta[str(vid)] = {
-                "title": video.get("snippet", {}).get("title", "") or "",
-                "published_at": video.get("snippet", {}).get("publishedAt"),
-                "duration_seconds": duration_seconds,
-                "duration_formatted": f"{int(duration_seconds // 60):02d}:{int(duration_seconds % 60):02d}",
-                "is_short": duration_seconds <= 60,
-                "privacy_status": privacy,
-            }
+    # Title/duration/privacy from the local store (missing ones via Data API).
+    meta = _detalles(video_ids, log_fn=log_fn)
 
     out: list[dict[str, Any]] = []
     for item in items:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import math
 import os
 import re
 import shutil
@@ -7,8 +8,8 @@ import tempfile
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 
+from core import pcm
 from core.transcriber import transcribir_srt
-from core.utils import dividir_audio_ffmpeg, obtener_duracion_segundos
 from core.youtube_downloader import descargar_audio_youtube
 
 
@@ -71,12 +72,13 @@ def generar_subtitulos_por_minuto_desde_youtube(
     max_doc_chars: int = 800_000,
 ) -> str:
     """
-    Descarga el audio (mp3) desde YouTube, lo divide en partes de 1 minuto,
-    transcribe cada parte a SRT y devuelve un texto listo para pegar en Google Docs.
+    Descarga el audio (mp3) desde YouTube, lo decodifica una vez a PCM 16 kHz,
+    transcribe cada minuto (un tramo del PCM, sin cortes MP3) a SRT y devuelve
+    un texto listo para pegar en Google Docs.
 
     Limpieza:
-    - Los cortes de audio y los .srt temporales se eliminan a medida que se procesan.
-    - El mp3 original descargado se mantiene (se usa una copia temporal).
+    - Los .srt temporales se eliminan a medida que se procesan.
+    - El PCM temporal se borra al final; el mp3 original descargado se mantiene.
     """
     url = (youtube_url or "").strip()
     if not url:
@@ -84,70 +86,46 @@ def generar_subtitulos_por_minuto_desde_youtube(
 
     video_id = _extract_video_id(url) or "video"
     tmp_root = Path(tempfile.gettempdir()) / f"transcriptor_ytdoc_{os.getpid()}_{video_id}"
-    parts_dir = tmp_root / "parts"
     srt_dir = tmp_root / "srt"
     tmp_root.mkdir(parents=True, exist_ok=True)
-    parts_dir.mkdir(parents=True, exist_ok=True)
     srt_dir.mkdir(parents=True, exist_ok=True)
 
     if log_fn:
         log_fn("Descargando MP3 desde YouTube (puede tardar)...")
     audio_path = descargar_audio_youtube(url, log_fn=log_fn)
 
-    # Work on a local temp copy so we can cleanup safely.
-    tmp_audio_path = tmp_root / "audio.mp3"
-    try:
-        shutil.copy2(audio_path, tmp_audio_path)
-    except Exception:
-        # Fallback to using the downloaded file directly if copy fails.
-        tmp_audio_path = Path(audio_path)
-
     if log_fn:
-        log_fn("Dividiendo audio en partes de 1 minuto...")
-    part_paths = dividir_audio_ffmpeg(
-        str(tmp_audio_path),
-        float(segundos_por_parte),
-        str(parts_dir),
-        log_fn=log_fn,
-    )
-    if not part_paths:
-        raise RuntimeError("No se pudieron generar partes de audio.")
-
-    total_seconds = 0.0
-    try:
-        total_seconds = float(obtener_duracion_segundos(str(tmp_audio_path)))
-    except Exception:
-        total_seconds = float(len(part_paths) * segundos_por_parte)
+        log_fn("Decodificando audio a PCM 16 kHz...")
+    pcm_path = pcm.decodificar_pcm(audio_path, str(tmp_root / "audio_16k.f32"))
+    total_seconds = pcm.duracion_pcm(pcm_path)
+    total_partes = max(1, math.ceil(total_seconds / segundos_por_parte))
 
     out_lines: list[str] = []
     out_lines.append("Subtitulos (transcripcion por minutos)")
     out_lines.append(f"Video: {url}")
     out_lines.append("")
 
-    for idx, part_path in enumerate(part_paths, start=1):
+    for idx in range(1, total_partes + 1):
         start_sec = (idx - 1) * segundos_por_parte
         end_sec = min(idx * segundos_por_parte, int(total_seconds + 0.999))
         start_txt = _format_mm_ss(start_sec)
         end_txt = _format_mm_ss(end_sec)
 
         if log_fn:
-            log_fn(f"Transcribiendo {idx}/{len(part_paths)}: {start_txt} a {end_txt} ...")
+            log_fn(f"Transcribiendo {idx}/{total_partes}: {start_txt} a {end_txt} ...")
 
         srt_path = ""
         try:
-            srt_path = transcribir_srt(part_path, str(srt_dir), idioma=idioma, model_size=model_size)
+            tramo = pcm.tramo(pcm_path, start_sec, segundos_por_parte, nombre=f"part_{idx:03d}")
+            srt_path = transcribir_srt(tramo, str(srt_dir), idioma=idioma, model_size=model_size)
             text = _extract_text_from_srt(srt_path)
         finally:
-            # Delete the temp SRT and audio cut regardless of read errors.
+            # Delete the temp SRT regardless of read errors.
             if srt_path:
                 try:
                     Path(srt_path).unlink(missing_ok=True)
                 except Exception:
                     pass
-            try:
-                Path(part_path).unlink(missing_ok=True)
-            except Exception:
-                pass
 
         out_lines.append(f"Del minuto {start_txt} al {end_txt}:")
         out_lines.append(text if text else "(sin texto)")
@@ -160,12 +138,7 @@ def generar_subtitulos_por_minuto_desde_youtube(
             out_lines.append("")
             break
 
-    # Cleanup temp dirs and temp audio copy (original download remains).
-    try:
-        if tmp_audio_path.exists() and tmp_audio_path.is_file() and tmp_audio_path.parent == tmp_root:
-            tmp_audio_path.unlink(missing_ok=True)
-    except Exception:
-        pass
+    # Cleanup temp dirs and the PCM buffer (original download remains).
     try:
         shutil.rmtree(tmp_root, ignore_errors=True)
     except Exception:
@@ -1,18 +1,17 @@
 ﻿import os
 import sys
-import subprocess
 import time
 import shutil
 import yt_dlp
 from yt_dlp.utils import DownloadError
-from core import stop_control
+from core import ffmpeg_runner, stop_control
 from core.utils import output_base_dir
 
 def _actualizar_yt_dlp(log_fn=None):
     if log_fn:
         log_fn("Actualizando yt-dlp...")
     cmd = [sys.executable, "-m", "yt_dlp", "-U"]
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ffmpeg_runner.run(cmd)
 
 def _descargar_youtube(
     url: str,
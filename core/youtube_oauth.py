@@ -2,8 +2,7 @@ from __future__ import annotations
 
 import urllib.parse
 
-import requests
-
+from core import http_client
 from core.api_endpoints import get_primary_endpoint_url
 
 TOKEN_URL = get_primary_endpoint_url("YouTube token refresh")
@@ -28,7 +27,7 @@ def exchange_code_for_tokens(
     code: str,
     redirect_uri: str,
 ) -> dict[str, str]:
-    response = requests.post(
+    response = http_client.post(
         TOKEN_URL,
         data={
             "client_id": client_id,
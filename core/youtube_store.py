@@ -0,0 +1,398 @@
+"""
+Almacen local (SQLite) de la analitica de YouTube.
+
+Guarda por cuenta la lista de subidas, los detalles de cada video (y el
+ETag de cada consulta de detalles), los reportes de Analytics (por rango o
+dia por dia) y los comentarios, para que core.youtube_api sincronice solo
+lo nuevo y las vistas se sirvan desde disco.
+
+Archivo: output/.cache/youtube.sqlite3. Sin dependencias de la API: esto
+es solo lectura/escritura de la base.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH = os.path.join("output", ".cache", "youtube.sqlite3")
+
+_lock = threading.Lock()
+_inicializada = False
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cuentas (
+    cuenta TEXT PRIMARY KEY,
+    canal TEXT,
+    uploads TEXT
+);
+CREATE TABLE IF NOT EXISTS sync (
+    cuenta TEXT,
+    clave TEXT,
+    actualizado REAL,
+    PRIMARY KEY (cuenta, clave)
+);
+CREATE TABLE IF NOT EXISTS subidas (
+    cuenta TEXT,
+    video_id TEXT,
+    agregado TEXT,
+    PRIMARY KEY (cuenta, video_id)
+);
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    published_at TEXT,
+    duration_seconds REAL,
+    privacy_status TEXT,
+    view_count INTEGER,
+    like_count INTEGER,
+    comment_count INTEGER,
+    actualizado REAL
+);
+CREATE TABLE IF NOT EXISTS lotes (
+    lote TEXT PRIMARY KEY,
+    etag TEXT
+);
+CREATE TABLE IF NOT EXISTS analitica_dias (
+    consulta TEXT,
+    dia TEXT,
+    final INTEGER,
+    actualizado REAL,
+    PRIMARY KEY (consulta, dia)
+);
+CREATE TABLE IF NOT EXISTS analitica (
+    consulta TEXT,
+    dia TEXT,
+    clave TEXT,
+    valores TEXT,
+    PRIMARY KEY (consulta, dia, clave)
+);
+CREATE TABLE IF NOT EXISTS reportes (
+    consulta TEXT PRIMARY KEY,
+    filas TEXT,
+    final INTEGER,
+    actualizado REAL
+);
+CREATE TABLE IF NOT EXISTS comentarios (
+    comment_id TEXT PRIMARY KEY,
+    video_id TEXT,
+    author TEXT,
+    text TEXT,
+    like_count INTEGER,
+    published_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS comentarios_video ON comentarios (video_id, published_at);
+CREATE TABLE IF NOT EXISTS comentarios_estado (
+    video_id TEXT PRIMARY KEY,
+    completo INTEGER,
+    desde TEXT,
+    actualizado REAL
+);
+"""
+
+_COLUMNAS_VIDEO = (
+    "video_id", "title", "published_at", "duration_seconds", "privacy_status",
+    "view_count", "like_count", "comment_count",
+)
+
+
+@contextmanager
+def _conexion():
+    global _inicializada
+    with _lock:
+        if not _inicializada:
+            os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        con = sqlite3.connect(DB_PATH, timeout=30)
+        try:
+            con.row_factory = sqlite3.Row
+            if not _inicializada:
+                con.execute("PRAGMA journal_mode=WAL")
+                con.executescript(_ESQUEMA)
+                _inicializada = True
+            with con:
+                yield con
+        finally:
+            con.close()
+
+
+def cuenta(cuenta_id: str) -> dict | None:
+    with _conexion() as con:
+        fila = con.execute("SELECT canal, uploads FROM cuentas WHERE cuenta = ?", (cuenta_id,)).fetchone()
+    return dict(fila) if fila else None
+
+
+def guardar_cuenta(cuenta_id: str, canal: str, uploads: str):
+    with _conexion() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO cuentas (cuenta, canal, uploads) VALUES (?, ?, ?)",
+            (cuenta_id, canal, uploads),
+        )
+
+
+def antiguedad(cuenta_id: str, clave: str) -> float:
+    """
+    Segundos desde la ultima sincronizacion de clave (infinito si nunca).
+    """
+    with _conexion() as con:
+        fila = con.execute(
+            "SELECT actualizado FROM sync WHERE cuenta = ? AND clave = ?", (cuenta_id, clave)
+        ).fetchone()
+    return time.time() - fila["actualizado"] if fila else float("inf")
+
+
+def marcar_sync(cuenta_id: str, clave: str):
+    with _conexion() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO sync (cuenta, clave, actualizado) VALUES (?, ?, ?)",
+            (cuenta_id, clave, time.time()),
+        )
+
+
+def invalidar(clave: str):
+    """
+    Fuerza a sincronizar clave en la proxima consulta, en todas las cuentas.
+    """
+    with _conexion() as con:
+        con.execute("DELETE FROM sync WHERE clave = ?", (clave,))
+
+
+def ids_subidas(cuenta_id: str) -> set[str]:
+    with _conexion() as con:
+        filas = con.execute("SELECT video_id FROM subidas WHERE cuenta = ?", (cuenta_id,)).fetchall()
+    return {f["video_id"] for f in filas}
+
+
+def guardar_subidas(cuenta_id: str, subidas: list[tuple[str, str]], reemplazar: bool = False):
+    """
+    subidas: [(video_id, agregado)]. Con reemplazar, las que no estan se
+    borran (videos eliminados del canal).
+    """
+    with _conexion() as con:
+        if reemplazar:
+            con.execute("DELETE FROM subidas WHERE cuenta = ?", (cuenta_id,))
+        con.executemany(
+            "INSERT OR REPLACE INTO subidas (cuenta, video_id, agregado) VALUES (?, ?, ?)",
+            [(cuenta_id, vid, agregado) for vid, agregado in subidas],
+        )
+
+
+def subidas(cuenta_id: str) -> list[dict]:
+    """
+    Subidas de la cuenta, de la mas nueva a la mas vieja, con los detalles
+    guardados (las columnas del video quedan en None si faltan).
+    """
+    with _conexion() as con:
+        filas = con.execute(
+            f"""
+            SELECT s.video_id AS video_id, s.agregado AS agregado,
+                   {", ".join(f"v.{c} AS {c}" for c in _COLUMNAS_VIDEO[1:])}, v.actualizado AS actualizado
+            FROM subidas s LEFT JOIN videos v ON v.video_id = s.video_id
+            WHERE s.cuenta = ?
+            ORDER BY s.agregado DESC, s.video_id
+            """,
+            (cuenta_id,),
+        ).fetchall()
+    return [dict(f) for f in filas]
+
+
+def videos(ids: list[str]) -> dict[str, dict]:
+    if not ids:
+        return {}
+    out = {}
+    with _conexion() as con:
+        for i in range(0, len(ids), 500):
+            parte = ids[i:i + 500]
+            filas = con.execute(
+                f"SELECT * FROM videos WHERE video_id IN ({','.join('?' * len(parte))})", parte
+            ).fetchall()
+            out.update({f["video_id"]: dict(f) for f in filas})
+    return out
+
+
+def guardar_videos(filas: list[dict]):
+    """
+    filas: dicts con las columnas de videos.
+    """
+    ahora = time.time()
+    with _conexion() as con:
+        con.executemany(
+            f"""
+            INSERT OR REPLACE INTO videos ({", ".join(_COLUMNAS_VIDEO)}, actualizado)
+            VALUES ({", ".join("?" * len(_COLUMNAS_VIDEO))}, ?)
+            """,
+            [tuple(f.get(c) for c in _COLUMNAS_VIDEO) + (ahora,) for f in filas],
+        )
+
+
+def tocar_videos(ids: list[str]):
+    """
+    Marca los videos como vigentes sin cambiarlos (respuesta 304).
+    """
+    with _conexion() as con:
+        con.executemany("UPDATE videos SET actualizado = ? WHERE video_id = ?", [(time.time(), v) for v in ids])
+
+
+def etag_lote(lote: str) -> str | None:
+    with _conexion() as con:
+        fila = con.execute("SELECT etag FROM lotes WHERE lote = ?", (lote,)).fetchone()
+    return fila["etag"] if fila else None
+
+
+def guardar_etag_lote(lote: str, etag: str | None):
+    with _conexion() as con:
+        con.execute("INSERT OR REPLACE INTO lotes (lote, etag) VALUES (?, ?)", (lote, etag))
+
+
+def dias_pendientes(consulta: str, dias: list[str], ttl_provisorio: float) -> list[str]:
+    """
+    Dias de dias que faltan en la consulta, o que estan guardados como
+    provisorios y tienen mas de ttl_provisorio segundos.
+    """
+    with _conexion() as con:
+        filas = con.execute(
+            "SELECT dia, final, actualizado FROM analitica_dias WHERE consulta = ?", (consulta,)
+        ).fetchall()
+    guardados = {f["dia"]: f for f in filas}
+    ahora = time.time()
+    pendientes = []
+    for dia in dias:
+        fila = guardados.get(dia)
+        if fila is None or (not fila["final"] and ahora - fila["actualizado"] > ttl_provisorio):
+            pendientes.append(dia)
+    return pendientes
+
+
+def guardar_dia(consulta: str, dia: str, filas: dict[str, dict], final: bool):
+    """
+    filas: {valor de la dimension: {metrica: valor}} de un dia.
+    """
+    with _conexion() as con:
+        con.execute("DELETE FROM analitica WHERE consulta = ? AND dia = ?", (consulta, dia))
+        con.executemany(
+            "INSERT INTO analitica (consulta, dia, clave, valores) VALUES (?, ?, ?, ?)",
+            [(consulta, dia, clave, json.dumps(valores)) for clave, valores in filas.items()],
+        )
+        con.execute(
+            "INSERT OR REPLACE INTO analitica_dias (consulta, dia, final, actualizado) VALUES (?, ?, ?, ?)",
+            (consulta, dia, int(final), time.time()),
+        )
+
+
+def sumar_dias(consulta: str, desde: str, hasta: str) -> dict[str, dict]:
+    """
+    {clave: {metrica: suma}} de los dias guardados en [desde, hasta].
+    """
+    with _conexion() as con:
+        filas = con.execute(
+            "SELECT clave, valores FROM analitica WHERE consulta = ? AND dia BETWEEN ? AND ?",
+            (consulta, desde, hasta),
+        ).fetchall()
+    total: dict[str, dict] = {}
+    for fila in filas:
+        acumulado = total.setdefault(fila["clave"], {})
+        for metrica, valor in json.loads(fila["valores"]).items():
+            acumulado[metrica] = acumulado.get(metrica, 0) + (valor or 0)
+    return total
+
+
+def reporte(consulta: str, ttl_provisorio: float) -> list[dict] | None:
+    """
+    Filas guardadas de un reporte por rango, o None si falta o es provisorio
+    y tiene mas de ttl_provisorio segundos.
+    """
+    with _conexion() as con:
+        fila = con.execute(
+            "SELECT filas, final, actualizado FROM reportes WHERE consulta = ?", (consulta,)
+        ).fetchone()
+    if fila is None or (not fila["final"] and time.time() - fila["actualizado"] > ttl_provisorio):
+        return None
+    return json.loads(fila["filas"])
+
+
+def guardar_reporte(consulta: str, filas: list[dict], final: bool):
+    with _conexion() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO reportes (consulta, filas, final, actualizado) VALUES (?, ?, ?, ?)",
+            (consulta, json.dumps(filas), int(final), time.time()),
+        )
+
+
+def estado_comentarios(video_id: str) -> dict | None:
+    with _conexion() as con:
+        fila = con.execute(
+            "SELECT completo, desde, actualizado FROM comentarios_estado WHERE video_id = ?", (video_id,)
+        ).fetchone()
+    return dict(fila) if fila else None
+
+
+def ids_comentarios(video_id: str) -> set[str]:
+    with _conexion() as con:
+        filas = con.execute("SELECT comment_id FROM comentarios WHERE video_id = ?", (video_id,)).fetchall()
+    return {f["comment_id"] for f in filas}
+
+
+def guardar_comentarios(video_id: str, comentarios: list[dict], completo: bool, desde: str | None):
+    """
+    Inserta o actualiza comentarios y la cobertura del video: la base tiene
+    todos los comentarios publicados desde desde (ISO) hasta hoy, o todos si
+    completo.
+    """
+    with _conexion() as con:
+        con.executemany(
+            """
+            INSERT OR REPLACE INTO comentarios
+                (comment_id, video_id, author, text, like_count, published_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    c.get("comment_id"), video_id, c.get("author"), c.get("text"),
+                    c.get("like_count"), c.get("published_at"), c.get("updated_at"),
+                )
+                for c in comentarios
+                if c.get("comment_id")
+            ],
+        )
+        con.execute(
+            "INSERT OR REPLACE INTO comentarios_estado (video_id, completo, desde, actualizado) VALUES (?, ?, ?, ?)",
+            (video_id, int(completo), desde, time.time()),
+        )
+
+
+def comentarios(
+    video_id: str,
+    limite: int,
+    desde: str | None = None,
+    hasta: str | None = None,
+    cubierto_desde: str | None = None,
+) -> list[dict]:
+    """
+    Comentarios guardados del video, del mas nuevo al mas viejo, filtrados
+    por fecha de publicacion (desde/hasta YYYY-MM-DD, inclusive) y, con
+    cubierto_desde, solo los del tramo que la base tiene completo.
+    """
+    condiciones = ["video_id = ?"]
+    args: list = [video_id]
+    if cubierto_desde:
+        condiciones.append("published_at >= ?")
+        args.append(cubierto_desde)
+    if desde:
+        condiciones.append("substr(published_at, 1, 10) >= ?")
+        args.append(desde)
+    if hasta:
+        condiciones.append("substr(published_at, 1, 10) <= ?")
+        args.append(hasta)
+    args.append(limite)
+    with _conexion() as con:
+        filas = con.execute(
+            f"""
+            SELECT comment_id, author, text, like_count, published_at, updated_at
+            FROM comentarios WHERE {" AND ".join(condiciones)}
+            ORDER BY published_at DESC LIMIT ?
+            """,
+            args,
+        ).fetchall()
+    return [dict(f) for f in filas]
@@ -1,20 +1,37 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import mimetypes
 import os
 import re
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Iterable, List, Optional
+from typing import Callable, List, Optional
 
 import requests
 
+from core import chunk_source, http_client, stop_control, transcript_store, upload_queue, youtube_store
 from core.youtube_credentials import YouTubeCredentials, load_active_credentials
 from core.api_endpoints import get_all_endpoint_urls
 
 UPLOAD_INIT_URL, THUMBNAIL_UPLOAD_URL = get_all_endpoint_urls("YouTube upload")
 CHUNK_SIZE = 256 * 1024
+# 10MB por pedazo (debe ser múltiplo de 256KB)
+UPLOAD_CHUNK_SIZE = 40 * CHUNK_SIZE
+SESIONES_PATH = os.path.join("output", ".cache", "youtube_uploads.json")
+# YouTube mantiene una sesión resumable alrededor de una semana.
+SESION_VIGENCIA = 6 * 24 * 3600
+_sesiones_lock = threading.Lock()
+CUOTA_PATH = os.path.join("output", ".cache", "youtube_cuota.json")
+# Tope local opcional de unidades por dia y proyecto (sin valor no hay tope:
+# solo se corta cuando YouTube responde quotaExceeded/uploadLimitExceeded).
+CUOTA_ENV = "ZEMPER_YOUTUBE_CUOTA_DIARIA"
+# videos.insert cuesta 1600 unidades de la cuota diaria de la API.
+COSTO_SUBIDA = 1600
+_cuota_lock = threading.Lock()
 _token_lock = threading.Lock()
 _token_cache: dict[str, object] = {}
 
@@ -23,6 +40,10 @@ class YouTubeUploadError(Exception):
     pass
 
 
+class YouTubeCuotaAgotada(YouTubeUploadError):
+    pass
+
+
 YOUTUBE_TITLE_MAX_LEN = 100
 _ZERO_WIDTH_CHARS = ("\u200b", "\u200c", "\u200d", "\ufeff", "\u00ad")
 
@@ -52,15 +73,6 @@ def _guess_mime_type(path: Path) -> str:
     return mime or "video/mp4"
 
 
-def _chunked_reader(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterable[bytes]:
-    with path.open("rb") as source:
-        while True:
-            chunk = source.read(chunk_size)
-            if not chunk:
-                break
-            yield chunk
-
-
 def _cache_token(creds: YouTubeCredentials, access_token: str, expires_in: int) -> None:
     expires_at = time.time() + expires_in
     _token_cache.update(
@@ -89,7 +101,7 @@ def _refresh_access_token(creds: YouTubeCredentials) -> str:
         cached = _get_cached_token(creds)
         if cached:
             return cached
-        response = requests.post(
+        response = http_client.post(
             creds.token_uri,
             data={
                 "client_id": creds.client_id,
@@ -147,13 +159,26 @@ def _init_resumable_upload(
         "X-Upload-Content-Type": content_type,
         "Content-Type": "application/json; charset=UTF-8",
     }
-    response = requests.post(
-        UPLOAD_INIT_URL,
-        params={"uploadType": "resumable", "part": "snippet,status"},
-        json={"snippet": snippet, "status": {"privacyStatus": privacy}},
-        headers=headers,
-        timeout=30,
-    )
+    for intento in range(chunk_source.MAX_REINTENTOS):
+        response = http_client.post(
+            UPLOAD_INIT_URL,
+            params={"uploadType": "resumable", "part": "snippet,status"},
+            json={"snippet": snippet, "status": {"privacyStatus": privacy}},
+            headers=headers,
+            timeout=30,
+        )
+        if response.status_code in (403, 429) and re.search(r"quotaExceeded|uploadLimitExceeded", response.text or ""):
+            raise YouTubeCuotaAgotada("YouTube rechazó la carga: cuota o límite de subidas agotado por hoy.")
+        # rateLimitExceeded / 429: limite de frecuencia por usuario, pasa en segundos.
+        limitado = response.status_code == 429 or (
+            response.status_code == 403 and re.search(r"rateLimitExceeded", response.text or "")
+        )
+        if not limitado or intento == chunk_source.MAX_REINTENTOS - 1:
+            break
+        espera = chunk_source.espera_backoff(intento)
+        if log_fn:
+            log_fn(f"YouTube limitó la frecuencia de pedidos; reintento en {espera:.1f}s...")
+        time.sleep(espera)
     try:
         response.raise_for_status()
     except requests.RequestException as exc:
@@ -166,68 +191,281 @@ def _init_resumable_upload(
     return upload_url
 
 
-def _upload_media(upload_url: str, path: Path, content_type: str, log_fn: Optional[Callable[[str], None]] = None) -> dict:
-    file_size = path.stat().st_size
-    # 10MB por pedazo (debe ser múltiplo de 256KB)
-    chunk_size = 10 * 1024 * 1024 
-    
-    with path.open("rb") as f:
-        start_byte = 0
-        while start_byte < file_size:
-            chunk = f.read(chunk_size)
-            end_byte = start_byte + len(chunk) - 1
-            
-            headers = {
-                "Content-Length": str(len(chunk)),
-                "Content-Range": f"bytes {start_byte}-{end_byte}/{file_size}",
-                "Content-Type": content_type,
-            }
+def _dia_cuota() -> str:
+    # La cuota se reinicia a medianoche del Pacifico (aprox. UTC-8).
+    return time.strftime("%Y-%m-%d", time.gmtime(time.time() - 8 * 3600))
 
-            try:
-                # Al enviar por trozos, el socket se abre y cierra correctamente
-                response = requests.put(upload_url, data=chunk, headers=headers, timeout=60)
-                
-                # 308 es "Resume Incomplete", significa que YouTube recibió el trozo y espera más
-                if response.status_code in [200, 201]:
-                    return response.json()
-                elif response.status_code == 308:
-                    start_byte += len(chunk)
-                    if log_fn:
-                        progreso = (start_byte / file_size) * 100
-                        log_fn(f"Subido: {progreso:.2f}%")
-                else:
-                    response.raise_for_status()
-
-            except (requests.exceptions.ConnectionError, ConnectionAbortedError):
-                if log_fn:
-                    log_fn("Conexión interrumpida por el sistema. Reintentando trozo...")
-                # Retrocedemos el puntero del archivo para reintentar este trozo
-                f.seek(start_byte)
-                time.sleep(2)
-    file_size = path.stat().st_size
-    headers = {
-        "Content-Length": str(file_size),
-        "Content-Type": content_type,
-        "Content-Range": f"bytes 0-{file_size - 1}/{file_size}",
-    }
-    if log_fn:
-        log_fn(f"Media headers: {headers}")
-    response = requests.put(
-        upload_url,
-        data=_chunked_reader(path),
-        headers=headers,
-        timeout=300,
-    )
+
+def _cuota_diaria() -> Optional[int]:
     try:
-        response.raise_for_status()
-    except requests.RequestException as exc:
-        raise YouTubeUploadError(f"Error al subir el video: {exc}") from exc
+        valor = int(os.getenv(CUOTA_ENV, "") or 0)
+    except ValueError:
+        return None
+    return valor if valor > 0 else None
+
+
+def _leer_cuota() -> dict:
+    try:
+        with open(CUOTA_PATH, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception:
+        data = {}
+    if not isinstance(data, dict) or data.get("dia") != _dia_cuota() or not isinstance(data.get("proyectos"), dict):
+        data = {"dia": _dia_cuota(), "proyectos": {}}
+    return data
+
+
+def _proyecto(data: dict, client_id: str) -> dict:
+    # La cuota es por proyecto de Google Cloud, que se identifica por su client_id.
+    return data["proyectos"].setdefault(client_id, {"usadas": 0, "agotada": False})
+
+
+def _escribir_cuota(data: dict) -> None:
+    os.makedirs(os.path.dirname(CUOTA_PATH), exist_ok=True)
+    tmp = f"{CUOTA_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, CUOTA_PATH)
+
+
+def cuota_restante(client_id: Optional[str] = None) -> Optional[int]:
+    """
+    Unidades que quedan hoy en el proyecto (por defecto, el de las
+    credenciales activas) segun lo que gasto esta app: 0 si YouTube ya dijo
+    que no hay cuota, None si no hay tope local (ZEMPER_YOUTUBE_CUOTA_DIARIA).
+    """
+    if client_id is None:
+        client_id = load_active_credentials().client_id
+    with _cuota_lock:
+        proyecto = _proyecto(_leer_cuota(), client_id)
+    if proyecto["agotada"]:
+        return 0
+    tope = _cuota_diaria()
+    return None if tope is None else max(0, tope - int(proyecto["usadas"]))
+
+
+def _reservar_cuota(client_id: str, unidades: int) -> bool:
+    with _cuota_lock:
+        data = _leer_cuota()
+        proyecto = _proyecto(data, client_id)
+        tope = _cuota_diaria()
+        if proyecto["agotada"] or (tope is not None and int(proyecto["usadas"]) + unidades > tope):
+            return False
+        proyecto["usadas"] = int(proyecto["usadas"]) + unidades
+        _escribir_cuota(data)
+        return True
+
+
+def _devolver_cuota(client_id: str, unidades: int) -> None:
+    with _cuota_lock:
+        data = _leer_cuota()
+        proyecto = _proyecto(data, client_id)
+        proyecto["usadas"] = max(0, int(proyecto["usadas"]) - unidades)
+        _escribir_cuota(data)
+
+
+def _agotar_cuota(client_id: str) -> None:
+    # YouTube dijo que no hay mas cuota en este proyecto: no se intenta otra subida hoy.
+    with _cuota_lock:
+        data = _leer_cuota()
+        _proyecto(data, client_id)["agotada"] = True
+        _escribir_cuota(data)
+
+
+class _SesionVencida(YouTubeUploadError):
+    pass
+
+
+class _ConsultaFallida(YouTubeUploadError):
+    # Error pasajero (5xx, 408, 429) al pedir el offset: se reintenta.
+    pass
+
+
+def _clave_sesion(path: Path, snippet: dict, privacy: str) -> str:
+    # Huella por muestras (transcript_store): no relee todo el archivo antes de subir.
+    huella = transcript_store.huella_contenido(str(path)) or str(path.resolve())
+    datos = json.dumps([huella, path.stat().st_size, snippet, privacy], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+def _leer_sesiones() -> dict:
+    try:
+        with open(SESIONES_PATH, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _escribir_sesiones(data: dict) -> None:
+    os.makedirs(os.path.dirname(SESIONES_PATH), exist_ok=True)
+    tmp = f"{SESIONES_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+    os.replace(tmp, SESIONES_PATH)
+
+
+def _sesion_guardada(clave: str) -> Optional[str]:
+    with _sesiones_lock:
+        data = _leer_sesiones()
+        ahora = time.time()
+        vencidas = [k for k, v in data.items() if ahora - v.get("creado", 0) > SESION_VIGENCIA]
+        for k in vencidas:
+            data.pop(k, None)
+        if vencidas:
+            _escribir_sesiones(data)
+        sesion = data.get(clave)
+    return sesion.get("url") if sesion else None
+
+
+def _guardar_sesion(clave: str, upload_url: str, path: Path) -> None:
+    with _sesiones_lock:
+        data = _leer_sesiones()
+        data[clave] = {"url": upload_url, "archivo": str(path), "creado": time.time()}
+        _escribir_sesiones(data)
+
+
+def _borrar_sesion(clave: str) -> None:
+    with _sesiones_lock:
+        data = _leer_sesiones()
+        if data.pop(clave, None) is not None:
+            _escribir_sesiones(data)
+
+
+def _respuesta_final(response: requests.Response) -> dict:
     try:
         return response.json()
     except ValueError as exc:
         raise YouTubeUploadError(f"Respuesta inesperada de YouTube: {exc}") from exc
 
 
+def _offset_de_308(response: requests.Response) -> int:
+    # Range: bytes=0-N indica lo confirmado; sin Range no hay nada guardado.
+    rango = response.headers.get("Range") or response.headers.get("range") or ""
+    match = re.search(r"bytes=\d+-(\d+)", rango)
+    return int(match.group(1)) + 1 if match else 0
+
+
+def _consultar_offset(upload_url: str, file_size: int) -> tuple[int, Optional[dict]]:
+    """
+    Pregunta a YouTube cuantos bytes de la sesion ya tiene. Devuelve
+    (offset, None), o (file_size, respuesta) si la carga ya estaba completa.
+    Lanza _SesionVencida si YouTube rechaza la sesion (404/410 u otro 4xx) y
+    _ConsultaFallida si el error es pasajero.
+    """
+    response = http_client.put(
+        upload_url,
+        headers={"Content-Length": "0", "Content-Range": f"bytes */{file_size}"},
+        timeout=30,
+    )
+    if response.status_code in (200, 201):
+        return file_size, _respuesta_final(response)
+    if response.status_code == 308:
+        return _offset_de_308(response), None
+    if response.status_code in (404, 410):
+        raise _SesionVencida("La sesión de carga venció.")
+    if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+        raise _SesionVencida(f"YouTube rechazó la sesión de carga (HTTP {response.status_code}).")
+    raise _ConsultaFallida(f"HTTP {response.status_code}")
+
+
+def _retomar_sesion(
+    upload_url: str,
+    file_size: int,
+    log_fn: Optional[Callable[[str], None]] = None,
+) -> tuple[int, Optional[dict]]:
+    """
+    _consultar_offset con reintentos para cortes de red, timeouts y errores
+    pasajeros. La sesion solo se da por perdida con _SesionVencida.
+    """
+    for intento in range(chunk_source.MAX_REINTENTOS):
+        try:
+            return _consultar_offset(upload_url, file_size)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+            motivo = type(exc).__name__
+        except _ConsultaFallida as exc:
+            motivo = str(exc)
+        espera = chunk_source.espera_backoff(intento)
+        if log_fn:
+            log_fn(f"No se pudo consultar la sesión guardada ({motivo}). Reintento {intento + 1}/{chunk_source.MAX_REINTENTOS} en {espera:.1f}s...")
+        time.sleep(espera)
+    raise YouTubeUploadError("No se pudo consultar la sesión de carga guardada; se reintentará en la próxima subida.")
+
+
+def _upload_media(
+    upload_url: str,
+    path: Path,
+    content_type: str,
+    log_fn: Optional[Callable[[str], None]] = None,
+    start_byte: int = 0,
+) -> dict:
+    file_size = path.stat().st_size
+    fallos = 0
+    limitador = upload_queue.limitador()
+
+    with path.open("rb") as f, ThreadPoolExecutor(max_workers=1) as lector:
+        def _leer(pos: int) -> tuple[int, bytes]:
+            f.seek(pos)
+            return pos, f.read(UPLOAD_CHUNK_SIZE)
+
+        # El siguiente pedazo se lee del disco mientras el actual viaja.
+        proximo = lector.submit(_leer, start_byte)
+        while True:
+            if stop_control.should_stop():
+                # La sesion queda guardada: volver a subir el archivo continua desde aca.
+                raise YouTubeUploadError("Carga detenida por el usuario.")
+            pos, chunk = proximo.result()
+            if pos != start_byte:
+                pos, chunk = _leer(start_byte)
+            proximo = lector.submit(_leer, start_byte + len(chunk))
+            headers = {"Content-Length": str(len(chunk)), "Content-Type": content_type}
+            if chunk:
+                headers["Content-Range"] = f"bytes {start_byte}-{start_byte + len(chunk) - 1}/{file_size}"
+            else:
+                headers["Content-Range"] = f"bytes */{file_size}"
+
+            try:
+                response = http_client.put(
+                    upload_url,
+                    data=upload_queue.CuerpoLimitado(chunk, limitador),
+                    headers=headers,
+                    timeout=60,
+                )
+                if response.status_code in (200, 201):
+                    return _respuesta_final(response)
+                if response.status_code == 308:
+                    # 308 es "Resume Incomplete": YouTube confirma hasta donde guardo.
+                    start_byte = _offset_de_308(response)
+                    fallos = 0
+                    if log_fn:
+                        log_fn(f"Subido: {start_byte / max(1, file_size) * 100:.2f}%")
+                    continue
+                if response.status_code in (404, 410):
+                    raise _SesionVencida("La sesión de carga venció.")
+                if response.status_code < 500 and response.status_code != 429:
+                    try:
+                        response.raise_for_status()
+                    except requests.RequestException as exc:
+                        raise YouTubeUploadError(f"Error al subir el video: {exc}") from exc
+                motivo = f"HTTP {response.status_code}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionAbortedError) as exc:
+                motivo = type(exc).__name__
+
+            if fallos >= chunk_source.MAX_REINTENTOS:
+                raise YouTubeUploadError(f"La carga falló tras {fallos} reintentos ({motivo}).")
+            espera = chunk_source.espera_backoff(fallos)
+            fallos += 1
+            if log_fn:
+                log_fn(f"Carga interrumpida ({motivo}). Reintento {fallos}/{chunk_source.MAX_REINTENTOS} en {espera:.1f}s...")
+            time.sleep(espera)
+            try:
+                start_byte, final = _consultar_offset(upload_url, file_size)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, _ConsultaFallida):
+                continue
+            if final is not None:
+                return final
+
+
 def _guess_image_type(path: Path) -> str:
     mime, _ = mimetypes.guess_type(str(path))
     return mime or "image/jpeg"
@@ -250,7 +488,7 @@ def set_thumbnail(
         "Content-Type": _guess_image_type(thumbnail_path),
     }
     params = {"videoId": video_id}
-    response = requests.post(
+    response = http_client.post(
         THUMBNAIL_UPLOAD_URL,
         params=params,
         headers=headers,
@@ -290,17 +528,62 @@ def upload_video(
     snippet = _prepare_snippet(safe_title, safe_description, tags, is_short)
     file_size = path.stat().st_size
     content_type = _guess_mime_type(path)
-    if log_fn:
-        log_fn(f"Iniciando carga resumable ({file_size / (1024**2):.1f} MB)...")
-    upload_url = _init_resumable_upload(
-        access_token, snippet, privacy, file_size, content_type, log_fn=log_fn
-    )
-    if log_fn:
-        log_fn("Subiendo bytes del video...")
-    response = _upload_media(upload_url, path, content_type, log_fn=log_fn)
+    clave = _clave_sesion(path, snippet, privacy)
+    response = None
+    upload_url = _sesion_guardada(clave)
+    offset = 0
+    if upload_url:
+        try:
+            offset, response = _retomar_sesion(upload_url, file_size, log_fn=log_fn)
+            if log_fn:
+                log_fn(f"Reanudando carga desde {offset / max(1, file_size) * 100:.2f}%...")
+        except _SesionVencida:
+            _borrar_sesion(clave)
+            upload_url = None
+    for _intento in range(2):
+        if response is not None:
+            break
+        if not upload_url:
+            if not _reservar_cuota(creds.client_id, COSTO_SUBIDA):
+                restante = cuota_restante(creds.client_id)
+                if not restante:
+                    raise YouTubeCuotaAgotada("YouTube ya rechazó una carga hoy por cuota agotada en este proyecto.")
+                raise YouTubeCuotaAgotada(
+                    f"Tope diario de {CUOTA_ENV} alcanzado ({restante} unidades libres, "
+                    f"una subida usa {COSTO_SUBIDA})."
+                )
+            if log_fn:
+                log_fn(f"Iniciando carga resumable ({file_size / (1024**2):.1f} MB)...")
+            try:
+                upload_url = _init_resumable_upload(
+                    access_token, snippet, privacy, file_size, content_type, log_fn=log_fn
+                )
+            except YouTubeCuotaAgotada:
+                _agotar_cuota(creds.client_id)
+                raise
+            except Exception:
+                _devolver_cuota(creds.client_id, COSTO_SUBIDA)
+                raise
+            _guardar_sesion(clave, upload_url, path)
+            offset = 0
+        if log_fn:
+            log_fn("Subiendo bytes del video...")
+        try:
+            response = _upload_media(upload_url, path, content_type, log_fn=log_fn, start_byte=offset)
+        except _SesionVencida:
+            # Una sola vez: se abre una sesion nueva desde cero.
+            _borrar_sesion(clave)
+            upload_url = None
+            if log_fn:
+                log_fn("La sesión de carga venció; se inicia una nueva.")
+    if response is None:
+        raise YouTubeUploadError("No se pudo completar la carga.")
+    _borrar_sesion(clave)
     video_id = response.get("id") or response.get("videoId")
     if not video_id:
         raise YouTubeUploadError("YouTube no devolvió el ID del video.")
+    # La lista de subidas del almacen local ya no esta al dia.
+    youtube_store.invalidar("subidas")
     if log_fn:
         log_fn(f"Video subido con ID: {video_id}")
     return video_id
@@ -313,4 +596,11 @@ def obtener_token_activo(log_fn: Optional[Callable[[str], None]] = None) -> str:
     return token
 
 
-__all__ = ["upload_video", "set_thumbnail", "YouTubeUploadError", "obtener_token_activo"]
+__all__ = [
+    "upload_video",
+    "set_thumbnail",
+    "YouTubeUploadError",
+    "YouTubeCuotaAgotada",
+    "cuota_restante",
+    "obtener_token_activo",
+]
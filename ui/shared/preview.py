@@ -1,18 +1,136 @@
+import subprocess
+import threading
 import time
 import tkinter as tk
+from collections import OrderedDict, deque
+
 import customtkinter as ctk
 from PIL import Image, ImageTk, ImageDraw
 from moviepy import VideoFileClip
 
+from core import proxy
+from core.utils import obtener_duracion_segundos, obtener_fps, obtener_tamano_video
+
+
+MAX_FRAMES_BUFFER = 16
+MAX_FRAMES_CACHE = 32
+SCRUB_SEEK_MS = 150
+
+
+class _DecodificadorFrames(threading.Thread):
+    """
+    Lee frames RGB ya escalados desde un pipe rawvideo de ffmpeg a partir de
+    inicio y los deja en un buffer circular acotado. Si el buffer esta lleno
+    espera a que la UI consuma; no toca Tk.
+    """
+
+    def __init__(self, path, inicio, size, fps, max_frames=None):
+        super().__init__(name="preview-decoder", daemon=True)
+        self.path = path
+        self.inicio = inicio
+        self.size = size
+        self.fps = fps
+        self.max_frames = max_frames
+        self.frames = deque()
+        self.terminado = False
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._proc = None
+
+    def run(self):
+        w, h = self.size
+        frame_bytes = w * h * 3
+        cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+        if self.inicio > 0:
+            cmd += ["-ss", f"{self.inicio:.3f}"]
+        cmd += [
+            "-i", self.path,
+            "-an", "-sn",
+            "-vf", f"fps={self.fps},scale={w}:{h}",
+            "-pix_fmt", "rgb24",
+            "-f", "rawvideo",
+        ]
+        if self.max_frames:
+            cmd += ["-frames:v", str(self.max_frames)]
+        cmd.append("-")
+        try:
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            idx = 0
+            while not self._parar.is_set():
+                data = self._proc.stdout.read(frame_bytes)
+                if len(data) < frame_bytes:
+                    break
+                with self._cond:
+                    while len(self.frames) >= MAX_FRAMES_BUFFER and not self._parar.is_set():
+                        self._cond.wait(0.1)
+                    self.frames.append((self.inicio + idx / self.fps, data))
+                idx += 1
+        except OSError:
+            pass
+        finally:
+            self.terminado = True
+            self._cerrar_proceso()
+
+    def _cerrar_proceso(self):
+        if self._proc is None:
+            return
+        try:
+            if self._proc.poll() is None:
+                self._proc.kill()
+            self._proc.stdout.close()
+            self._proc.wait()
+        except Exception:
+            pass
+
+    def tomar(self, t):
+        """
+        Ultimo frame con pts <= t; los anteriores se descartan (frame drop
+        para no perder la sincronia con el reloj).
+        """
+        frame = None
+        with self._cond:
+            while self.frames and self.frames[0][0] <= t:
+                frame = self.frames.popleft()
+            self._cond.notify_all()
+        return frame
+
+    def primero(self):
+        with self._cond:
+            frame = self.frames.popleft() if self.frames else None
+            self._cond.notify_all()
+        return frame
+
+    def detener(self):
+        self._parar.set()
+        with self._cond:
+            self._cond.notify_all()
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
 
 class SimpleVideoPlayer:
+    """
+    Vista previa de video. Un hilo decodifica con ffmpeg al tamano del widget
+    y llena un buffer circular; el hilo de Tk solo vuelca frames en el
+    PhotoImage y descarta los atrasados. Los frames sueltos (seek en pausa)
+    se cachean por tiempo y tamano. Si la fuente tiene proxy (core.proxy) se
+    decodifica el proxy; al arrastrar se muestra la miniatura del sprite y el
+    frame real llega al soltar.
+    """
+
     def __init__(self, master, log_fn=None):
         self.master = master
         self.log_fn = log_fn
         self.label = tk.Label(master, bg="#000000", fg="#ffffff")
         self.label.pack(fill="both", expand=True)
         self.master.bind("<Configure>", self._on_resize)
-        self.clip = None
+        self.path = None
+        self._decode_path = None
+        self._scrub_id = None
         self.duration = 0.0
         self.fps = 25
         self.playing = False
@@ -20,108 +138,242 @@ class SimpleVideoPlayer:
         self._start_time = 0.0
         self._after_id = None
         self._photo = None
+        self._photo_size = None
         self._target_size = None
+        self._source_size = (1920, 1080)
+        self._decoder = None
+        self._cache = OrderedDict()
 
     def show_placeholder(self, text):
+        self._photo = None
+        self._photo_size = None
         self.label.configure(text=text, image="")
 
     def load(self, path):
         self.stop()
-        if self.clip:
-            try:
-                self.clip.close()
-            except Exception:
-                pass
-        self.clip = None
+        self.path = None
+        self._cache.clear()
         try:
             self.show_placeholder("Cargando vista previa...")
-            self.clip = VideoFileClip(path, audio=False)
-            self.duration = float(self.clip.duration or 0.0)
-            self.fps = int(self.clip.fps or 25)
+            self.duration = float(obtener_duracion_segundos(path) or 0.0)
+            self.fps = max(1, min(60, int(round(obtener_fps(path) or 25))))
+            self._source_size = obtener_tamano_video(path)
+            self.path = path
+            self._decode_path = proxy.proxy_para(path) or path
+            if self._decode_path == path:
+                proxy.solicitar(
+                    path,
+                    al_terminar=lambda meta: self.master.after(0, lambda: self._proxy_listo(path, meta)),
+                    log_fn=self.log_fn,
+                )
             self.current_t = 0.0
             self.master.update_idletasks()
-            self.label.update_idletasks()
-            self._target_size = (
-                max(2, self.label.winfo_width()),
-                max(2, self.label.winfo_height()),
-            )
-            self.master.after(50, lambda: self._render_frame(self.current_t))
-            self.master.after(200, lambda: self._render_frame(self.current_t))
-            self.master.after(600, lambda: self._render_frame(self.current_t))
+            self._target_size = self._medir_widget()
+            self._mostrar(self.current_t)
         except Exception as e:
             if self.log_fn:
                 self.log_fn(f"Error cargando preview: {e}")
             self.show_placeholder("No se pudo cargar la vista previa.")
 
-    def _render_frame(self, t):
-        if not self.clip:
-            return
+    def _proxy_listo(self, path, meta):
+        if meta and self.path == path:
+            # Los proximos decoders leen el proxy; el que esta corriendo sigue.
+            self._decode_path = meta["proxy"]
+
+    def _medir_widget(self):
+        return (
+            max(2, self.label.winfo_width()),
+            max(2, self.label.winfo_height()),
+        )
+
+    def _tamano_frame(self):
+        w, h = self._target_size or self._medir_widget()
+        src_w, src_h = self._source_size
+        scale = min(w / max(1, src_w), h / max(1, src_h))
+        return (
+            max(2, int(src_w * scale) // 2 * 2),
+            max(2, int(src_h * scale) // 2 * 2),
+        )
+
+    def _nuevo_decoder(self, t, max_frames=None):
+        self._detener_decoder()
+        self._decoder = _DecodificadorFrames(self._decode_path, t, self._tamano_frame(), self.fps, max_frames)
+        self._decoder.start()
+        return self._decoder
+
+    def _detener_decoder(self):
+        if self._decoder is not None:
+            self._decoder.detener()
+            self._decoder = None
+
+    def _blit(self, data, size):
         try:
-            t = max(0.0, min(float(t), max(0.0, self.duration - 0.001)))
-            frame = self.clip.get_frame(t)
-            image = Image.fromarray(frame)
-            if self._target_size:
-                w, h = self._target_size
+            image = Image.frombuffer("RGB", size, data, "raw", "RGB", 0, 1)
+            if self._photo is not None and self._photo_size == size:
+                self._photo.paste(image)
             else:
-                w = max(2, self.label.winfo_width())
-                h = max(2, self.label.winfo_height())
-            img_w, img_h = image.size
-            scale = min(w / img_w, h / img_h)
-            new_w = max(1, int(img_w * scale))
-            new_h = max(1, int(img_h * scale))
-            image = image.resize((new_w, new_h), Image.LANCZOS)
-            self._photo = ImageTk.PhotoImage(image)
-            self.label.configure(image=self._photo, text="")
+                self._photo = ImageTk.PhotoImage(image)
+                self._photo_size = size
+                self.label.configure(image=self._photo, text="")
         except Exception as e:
             if self.log_fn:
                 self.log_fn(f"Preview error: {e}")
-            self.label.configure(text="No se pudo renderizar la vista previa.", image="")
+            self.show_placeholder("No se pudo renderizar la vista previa.")
+
+    def _mostrar(self, t):
+        """
+        Muestra el frame en t sin reproducir: desde la cache o decodificando
+        un solo frame en segundo plano.
+        """
+        if not self.path:
+            return
+        self._cancelar_tick()
+        t = max(0.0, min(float(t), max(0.0, self.duration - 0.001)))
+        size = self._tamano_frame()
+        clave = (round(t * self.fps), size)
+        if clave in self._cache:
+            self._cache.move_to_end(clave)
+            self._blit(self._cache[clave], size)
+            return
+        decoder = self._nuevo_decoder(t, max_frames=1)
+        self._esperar_frame(decoder, clave, size)
+
+    def _esperar_frame(self, decoder, clave, size):
+        if decoder is not self._decoder:
+            return
+        frame = decoder.primero()
+        if frame is None:
+            if not decoder.terminado:
+                self._after_id = self.master.after(15, lambda: self._esperar_frame(decoder, clave, size))
+            return
+        self._after_id = None
+        self._cache[clave] = frame[1]
+        while len(self._cache) > MAX_FRAMES_CACHE:
+            self._cache.popitem(last=False)
+        self._blit(frame[1], size)
+
+    def _cancelar_tick(self):
+        if self._after_id:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
 
     def play(self):
-        if not self.clip or self.playing:
+        if not self.path or self.playing:
             return
+        self._cancelar_tick()
         self.playing = True
         self._start_time = time.perf_counter() - self.current_t
+        self._nuevo_decoder(self.current_t)
         self._schedule_next()
 
     def pause(self):
         self.playing = False
-        if self._after_id:
-            self.master.after_cancel(self._after_id)
-            self._after_id = None
+        self._cancelar_tick()
+        self._detener_decoder()
 
     def stop(self):
         self.pause()
         self.current_t = 0.0
-        if self.clip:
-            self._render_frame(self.current_t)
+        if self.path:
+            self._mostrar(self.current_t)
 
     def seek(self, t):
-        if not self.clip:
+        if not self.path:
             return
         self.current_t = max(0.0, min(float(t), self.duration))
         if self.playing:
             self._start_time = time.perf_counter() - self.current_t
-        self._render_frame(self.current_t)
+            self._nuevo_decoder(self.current_t)
+        else:
+            self._mostrar(self.current_t)
+
+    def scrub(self, t):
+        """
+        Arrastre de la linea de tiempo: muestra ya la miniatura del sprite
+        y busca el frame real cuando el arrastre se detiene.
+        """
+        if not self.path:
+            return
+        self.current_t = max(0.0, min(float(t), self.duration))
+        thumb = proxy.miniatura(self.path, self.current_t)
+        if thumb is not None and not self.playing:
+            self._detener_decoder()
+            self._cancelar_tick()
+            size = self._tamano_frame()
+            self._blit(thumb.convert("RGB").resize(size, Image.BILINEAR).tobytes(), size)
+        if self._scrub_id:
+            self.master.after_cancel(self._scrub_id)
+        self._scrub_id = self.master.after(SCRUB_SEEK_MS, self._fin_scrub)
+
+    def _fin_scrub(self):
+        self._scrub_id = None
+        self.seek(self.current_t)
 
     def _schedule_next(self):
-        if not self.playing or not self.clip:
+        if not self.playing or not self.path:
             return
         self.current_t = time.perf_counter() - self._start_time
-        if self.current_t >= self.duration:
+        decoder = self._decoder
+        if self.current_t >= self.duration or (decoder and decoder.terminado and not decoder.frames):
             self.stop()
             return
-        self._render_frame(self.current_t)
-        delay = max(15, int(1000 / max(1, self.fps)))
+        frame = decoder.tomar(self.current_t) if decoder else None
+        if frame is not None:
+            self._blit(frame[1], decoder.size)
+        delay = max(10, int(500 / max(1, self.fps)))
         self._after_id = self.master.after(delay, self._schedule_next)
 
     def _on_resize(self, _event):
-        self._target_size = (
-            max(2, self.label.winfo_width()),
-            max(2, self.label.winfo_height()),
-        )
-        if self.clip and not self.playing:
-            self._render_frame(self.current_t)
+        size = self._medir_widget()
+        if size == self._target_size:
+            return
+        self._target_size = size
+        if not self.path:
+            return
+        if self.playing:
+            self._nuevo_decoder(self.current_t)
+        else:
+            self._mostrar(self.current_t)
+
+
+def vincular_miniaturas(slider, get_path, get_duracion):
+    """
+    Al pasar el mouse sobre slider muestra la miniatura del sprite del video
+    (core.proxy) en ese punto, en un tooltip flotante.
+    """
+    tip = {"win": None, "label": None, "photo": None}
+
+    def _ocultar(_event=None):
+        if tip["win"] is not None:
+            tip["win"].withdraw()
+
+    def _mover(event):
+        path = get_path()
+        duracion = get_duracion() or 0.0
+        ancho = max(1, slider.winfo_width())
+        if not path or duracion <= 0:
+            return
+        t = max(0.0, min(1.0, event.x / ancho)) * duracion
+        thumb = proxy.miniatura(path, t)
+        if thumb is None:
+            _ocultar()
+            return
+        if tip["win"] is None:
+            tip["win"] = tk.Toplevel(slider)
+            tip["win"].overrideredirect(True)
+            tip["label"] = tk.Label(tip["win"], bg="#000000", fg="#ffffff", compound="top")
+            tip["label"].pack()
+        tip["photo"] = ImageTk.PhotoImage(thumb)
+        minutos, segundos = divmod(int(t), 60)
+        tip["label"].configure(image=tip["photo"], text=f"{minutos:02d}:{segundos:02d}")
+        x = slider.winfo_rootx() + event.x - thumb.width // 2
+        y = slider.winfo_rooty() - thumb.height - 24
+        tip["win"].geometry(f"+{x}+{y}")
+        tip["win"].deiconify()
+        tip["win"].lift()
+
+    slider.bind("<Motion>", _mover, add="+")
+    slider.bind("<Leave>", _ocultar, add="+")
 
 
 def create_subtitle_preview(preview_card, pos_sub_var, get_font_lines, get_video_path):
@@ -4,10 +4,12 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import colorchooser
 
-from core.ai_youtube import subir_video_youtube_desde_ia
+from core.ai_youtube import pipeline_publicacion_youtube
 from core.workflow import procesar_corte_individual, procesar_srt, procesar_quemar_srt
 from core.utils import obtener_duracion_segundos, output_base_dir
+from core import proxy
 from ui.shared import helpers
+from ui.shared.preview import vincular_miniaturas
 
 
 def create_tab(parent, context):
@@ -100,6 +102,8 @@ def create_tab(parent, context):
                 return
             estado["path"] = video
             estado["es_audio"] = False
+            # Sprite para el tooltip de los sliders (el preview puede estar oculto).
+            proxy.solicitar(video, log_fn=log)
             set_preview_enabled(True)
             cargar_video_preview(video)
             cargar_rango_individual(video)
@@ -363,6 +367,8 @@ def create_tab(parent, context):
 
     slider_fin_ind = ctk.CTkSlider(range_ind_card, from_=0, to=1, command=on_fin_ind_change)
     slider_fin_ind.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(0, 6))
+    for slider in (slider_inicio_ind, slider_fin_ind):
+        vincular_miniaturas(slider, lambda: estado.get("path"), lambda: rango_ind.get("duracion", 0.0))
 
     lbl_duracion_ind = ctk.CTkLabel(range_ind_card, text="Duracion", font=ctk.CTkFont(size=12))
     lbl_duracion_ind.grid(row=4, column=0, sticky="w")
@@ -631,8 +637,40 @@ def create_tab(parent, context):
             musica_inicio_video = 0.0
 
         def run_auto_ind():
+            preparar_parte = None
+            if auto_subs_ind_var.get():
+                idioma = idioma_var.get()
+                if idioma == "auto":
+                    idioma = ""
+                modelo = modelo_var.get()
+
+                def _generar_srt(video):
+                    srt_path = procesar_srt(
+                        video,
+                        False,
+                        idioma,
+                        modelo,
+                        None,
+                        None,
+                        log,
+                    )
+                    if srt_path:
+                        log(f"SRT generado: {srt_path}")
+
+                preparar_parte = _generar_srt
+
+            # Cada parte se publica apenas se corta: mientras una sube, la
+            # siguiente se transcribe y otra se codifica.
+            publicacion = pipeline_publicacion_youtube(
+                None,
+                model="gpt-4o-mini",
+                idioma="es",
+                privacy="private",
+                log_fn=log,
+                preparar=preparar_parte,
+            )
             try:
-                result = procesar_corte_individual(
+                procesar_corte_individual(
                     estado["path"],
                     minutos,
                     inicio_min,
@@ -656,56 +694,27 @@ def create_tab(parent, context):
                     musica_inicio_video,
                     None,
                     log,
+                    al_terminar_parte=publicacion.enviar,
                 )
-                videos = []
-                if isinstance(result, dict):
-                    videos = result.get("videos") or []
-                elif isinstance(result, list):
-                    videos = result
-                if not videos:
+                trabajos = publicacion.esperar()
+                if not trabajos:
                     log("No se generaron videos para subir.")
                     return
-                if auto_subs_ind_var.get():
-                    idioma = idioma_var.get()
-                    if idioma == "auto":
-                        idioma = ""
-                    modelo = modelo_var.get()
-                    for idx, video in enumerate(videos, start=1):
-                        if stop_control.should_stop():
-                            log("Proceso detenido por el usuario.")
-                            return
-                        log(f"Generando SRT ({idx}/{len(videos)})...")
-                        srt_path = procesar_srt(
-                            video,
-                            False,
-                            idioma,
-                            modelo,
-                            None,
-                            None,
-                            log,
-                        )
-                        if srt_path:
-                            log(f"SRT generado: {srt_path}")
-                for idx, video_path in enumerate(videos, start=1):
-                    if stop_control.should_stop():
-                        log("Proceso detenido por el usuario.")
-                        return
-                    helpers.log_seccion(log, None, "YouTube automático")
-                    log(f"Subiendo {idx}/{len(videos)}: {video_path}")
-                    subir_video_youtube_desde_ia(
-                        video_path,
-                        None,
-                        model="gpt-4o-mini",
-                        idioma="es",
-                        privacy="private",
-                        log_fn=log,
-                    )
-                    log(f"Miniatura oculta ID subida: {idx}/{len(videos)}")
-                log("Todos los videos se subieron como ocultos.")
+                helpers.log_seccion(log, None, "YouTube automático")
+                for trabajo in trabajos:
+                    if trabajo["estado"] == "listo":
+                        log(f"Miniatura oculta ID subida: {trabajo['idx']}/{len(trabajos)}")
+                    else:
+                        log(f"Video {trabajo['idx']}/{len(trabajos)} {trabajo['estado']} en {trabajo['etapa']}: {trabajo['nombre']}")
+                if stop_control.should_stop():
+                    log("Proceso detenido por el usuario.")
+                elif all(t["estado"] == "listo" for t in trabajos):
+                    log("Todos los videos se subieron como ocultos.")
             except Exception as exc:
                 helpers.log_seccion(log, None, "Error YouTube")
                 log(f"Error automático YouTube: {exc}")
             finally:
+                publicacion.esperar()
                 stop_control.set_busy(False)
 
         threading.Thread(target=run_auto_ind, daemon=True).start()
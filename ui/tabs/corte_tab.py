@@ -3,11 +3,11 @@ import threading
 import customtkinter as ctk
 import tkinter as tk
 
-from core.ai_youtube import subir_video_youtube_desde_ia
+from core.ai_youtube import pipeline_publicacion_youtube
 from core.corte_config import get_corte_defaults, get_cintas_defaults, get_mensajes_defaults
 from core.utils import obtener_duracion_segundos, output_base_dir
 from core.workflow import procesar_srt, procesar_quemar_srt
-from ui.shared.preview import SimpleVideoPlayer
+from ui.shared.preview import SimpleVideoPlayer, vincular_miniaturas
 from ui.shared import helpers
 
 
@@ -433,6 +433,15 @@ def create_tab(parent, context):
             vertical = False
 
         def run_auto():
+            # Cada parte se publica apenas se renderiza: mientras una sube, la
+            # siguiente se transcribe y otra se codifica.
+            publicacion = pipeline_publicacion_youtube(
+                None,
+                model="gpt-4o-mini",
+                idioma="es",
+                privacy="private",
+                log_fn=log,
+            )
             try:
                 estado["visualizador"] = visualizador_var.get()
                 estado["posicion_visualizador"] = obtener_posicion_visualizador()
@@ -442,7 +451,7 @@ def create_tab(parent, context):
                 estado["visualizador_opacidad"] = visualizador_opacity_var.get()
                 estado["visualizador_color"] = visualizador_color_var.get()
                 estado["visualizador_margen"] = int(float(visualizador_margin_var.get()))
-                result = procesar_video_fn(
+                procesar_video_fn(
                     estado["path"],
                     False,
                     False,
@@ -484,35 +493,27 @@ def create_tab(parent, context):
                     musica_inicio=musica_inicio,
                     musica_fin=musica_fin,
                     musica_inicio_video=musica_inicio_video,
+                    al_terminar_parte=publicacion.enviar,
                 )
-                videos = []
-                if isinstance(result, dict):
-                    videos = result.get("videos") or []
-                elif isinstance(result, list):
-                    videos = result
-                if not videos:
+                trabajos = publicacion.esperar()
+                if not trabajos:
                     log("No se generaron videos para subir.")
                     return
-                for idx, video_path in enumerate(videos, start=1):
-                    if stop_control.should_stop():
-                        log("Proceso detenido por el usuario.")
-                        return
-                    helpers.log_seccion(log, None, "YouTube automático")
-                    log(f"Subiendo {idx}/{len(videos)}: {video_path}")
-                    subir_video_youtube_desde_ia(
-                        video_path,
-                        None,
-                        model="gpt-4o-mini",
-                        idioma="es",
-                        privacy="private",
-                        log_fn=log,
-                    )
-                    log(f"Video {idx}/{len(videos)} subido en privado.")
-                log("Todos los videos se subieron como ocultos.")
+                helpers.log_seccion(log, None, "YouTube automático")
+                for trabajo in trabajos:
+                    if trabajo["estado"] == "listo":
+                        log(f"Video {trabajo['idx']}/{len(trabajos)} subido en privado: {trabajo['nombre']}")
+                    else:
+                        log(f"Video {trabajo['idx']}/{len(trabajos)} {trabajo['estado']} en {trabajo['etapa']}: {trabajo['nombre']}")
+                if stop_control.should_stop():
+                    log("Proceso detenido por el usuario.")
+                elif all(t["estado"] == "listo" for t in trabajos):
+                    log("Todos los videos se subieron como ocultos.")
             except Exception as exc:
                 helpers.log_seccion(log, None, "Error YouTube")
                 log(f"Error automático YouTube: {exc}")
             finally:
+                publicacion.esperar()
                 stop_control.set_busy(False)
 
         threading.Thread(target=run_auto, daemon=True).start()
@@ -1338,6 +1339,8 @@ def create_tab(parent, context):
 
     slider_fin = ctk.CTkSlider(range_card, from_=0, to=1, command=lambda value: on_slider_change("fin", value))
     slider_fin.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(0, 6))
+    for slider in (slider_inicio, slider_fin):
+        vincular_miniaturas(slider, lambda: video_player.path, lambda: rango.get("duracion", 0.0))
 
     range_feedback_label = ctk.CTkLabel(
         range_card,
@@ -1407,6 +1410,7 @@ def create_tab(parent, context):
             set_slider_values(fin_val, fin_val)
             inicio_val = fin_val
         sync_state_from_sliders()
+        video_player.scrub(inicio_val if side == "inicio" else fin_val)
 
     def on_entry_commit(side, _event=None):
         clear_feedback()
@@ -5,6 +5,7 @@ import tkinter as tk
 import customtkinter as ctk
 from PIL import Image, ImageDraw, ImageTk
 
+from core import picos
 from core.utils import (
     nombre_base_principal,
     output_base_dir,
@@ -80,6 +81,7 @@ class VisualOverlayPreview:
         self.label = tk.Label(container, bg="#0b0d14", text="")
         self.label.pack(fill="both", expand=True)
         self._photo = None
+        self.picos = None
 
     def render(self, exposure, contrast, saturation, temperature, opacity, blend_mode):
         width = 320
@@ -93,21 +95,41 @@ class VisualOverlayPreview:
         )
         combined = Image.alpha_composite(base, overlay)
         draw = ImageDraw.Draw(combined)
-        for offset in range(6):
-            x = 30 + offset * 40
-            y0 = height - 40 - offset * 4
-            y1 = height - 20 - offset * 3
-            draw.line(
-                [(x, y0), (x, y1)],
-                fill=(255, 255, 255, 90),
-                width=4,
-            )
+        if self.picos:
+            # Onda real del video base, leida del indice de picos.
+            x0, y0, x1, y1 = 30, 40, width - 30, height - 62
+            centro = (y0 + y1) / 2
+            alto = (y1 - y0) / 2
+            columnas = picos.ventana(self.picos, 0.0, self.picos["duracion"], x1 - x0)
+            for x, (bajo, alto_col, _rms) in enumerate(columnas, start=x0):
+                draw.line(
+                    [(x, centro - alto_col * alto), (x, centro - bajo * alto)],
+                    fill=(255, 255, 255, 120),
+                )
+        else:
+            for offset in range(6):
+                x = 30 + offset * 40
+                y0 = height - 40 - offset * 4
+                y1 = height - 20 - offset * 3
+                draw.line(
+                    [(x, y0), (x, y1)],
+                    fill=(255, 255, 255, 90),
+                    width=4,
+                )
         draw.rectangle([28, 30, width - 28, height - 60], outline=(255, 255, 255, 40), width=2)
         draw.text((width / 2, 36), f"Modo: {blend_mode.title()}", fill="#d3d6ff", anchor="ma")
         self._photo = ImageTk.PhotoImage(combined)
         self.label.configure(image=self._photo, text="")
 
 
+def _audio_para_picos(video_path: str) -> str:
+    """
+    Audio ya extraido del video (output/<base>/audios) o el video mismo.
+    """
+    audio = os.path.join(output_base_dir(video_path), "audios", f"{nombre_base_principal(video_path)}_original.mp3")
+    return audio if os.path.exists(audio) else video_path
+
+
 def _build_slider_block(parent, label_text, var, state_key, estado, min_value, max_value, steps, formatter, row, post_change=None):
     block = ctk.CTkFrame(parent, fg_color="transparent")
     block.grid_columnconfigure(0, weight=1)
@@ -195,6 +217,8 @@ def create_tab(parent, context):
         estado[key] = ruta
         display_var.set(os.path.basename(ruta))
         log(f"{label_text}: {ruta}")
+        if key == "pegar_visualizador_base_video":
+            cargar_picos(ruta)
 
     btn_base = ctk.CTkButton(file_card, text="Seleccionar video base", command=lambda: _seleccionar_archivo("pegar_visualizador_base_video", base_path_var, "Video base"))
     btn_base.grid(row=1, column=0, sticky="ew", pady=(8, 4))
@@ -205,7 +229,27 @@ def create_tab(parent, context):
     btn_overlay = ctk.CTkButton(file_card, text="Seleccionar visualizador", command=lambda: _seleccionar_archivo("pegar_visualizador_overlay_video", overlay_path_var, "Visualizador"))
     btn_overlay.grid(row=3, column=0, sticky="ew", pady=(8, 4))
 
+    def cargar_picos(video_path):
+        def worker():
+            try:
+                indice = picos.obtener(_audio_para_picos(video_path))
+            except Exception as exc:
+                log(f"No se pudo leer la onda del video base: {exc}")
+                return
+
+            def aplicar():
+                if preview and estado.get("pegar_visualizador_base_video") == video_path:
+                    preview.picos = indice
+                    refresh_preview()
+
+            container.after(0, aplicar)
+
+        threading.Thread(target=worker, daemon=True).start()
+
     def restablecer_rutas():
+        if preview:
+            preview.picos = None
+            refresh_preview()
         estado["pegar_visualizador_base_video"] = None
         estado["pegar_visualizador_overlay_video"] = None
         base_path_var.set("Sin video base")
@@ -372,6 +416,8 @@ def create_tab(parent, context):
 
     preview = VisualOverlayPreview(preview_container)
     refresh_preview()
+    if estado.get("pegar_visualizador_base_video"):
+        cargar_picos(estado["pegar_visualizador_base_video"])
 
     btn_apply = ctk.CTkButton(
         right_panel,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 import threading
 import webbrowser
@@ -340,11 +341,41 @@ def create_tab(parent, context):
             return
         if stop_control:
             stop_control.set_busy(True)
+        pool = None
         try:
             vid = selected_video_id
             log(f"Consultando detalles: {vid}")
+            start_date = start_var.get()
+            end_date = end_var.get()
+            limit = _safe_int(comments_limit_var.get(), 20)
+            include_replies = bool(include_replies_var.get())
+            if limit <= 0:
+                log("Cargando todos los comentarios (guardrail interno)...")
+            else:
+                log(f"Cargando comentarios: {limit}")
 
-            stats = obtener_estadisticas_video(vid, log_fn=log)
+            # Estadisticas, paises y comentarios se piden a la vez; cada caja
+            # se completa, en orden, apenas llega su resultado.
+            pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="yt-detalles")
+            stats_future = pool.submit(obtener_estadisticas_video, vid, log_fn=log)
+            countries_future = pool.submit(
+                obtener_vistas_por_pais,
+                video_id=vid,
+                start_date=start_date,
+                end_date=end_date,
+                max_results=10,
+                log_fn=log,
+            )
+            comments_future = pool.submit(
+                listar_comentarios_video,
+                video_id=vid,
+                max_results=limit,
+                include_replies=include_replies,
+                start_date=start_date,
+                end_date=end_date,
+                log_fn=log,
+            )
+            stats = stats_future.result()
             nonlocal last_stats
             last_stats = stats
             stats_var.set(
@@ -379,13 +410,7 @@ def create_tab(parent, context):
                     decision_lines.append("Short con buena conversación: prueba serie/parte 2 con el mismo tema.")
             _set_decision("\n".join(decision_lines))
 
-            countries = obtener_vistas_por_pais(
-                video_id=vid,
-                start_date=start_var.get(),
-                end_date=end_var.get(),
-                max_results=10,
-                log_fn=log,
-            )
+            countries = countries_future.result()
             geo_lines = ["== Vistas por pais =="]
             if not countries:
                 geo_lines.append("(sin datos)")
@@ -396,26 +421,13 @@ def create_tab(parent, context):
             nonlocal last_countries
             last_countries = countries
 
-            limit = _safe_int(comments_limit_var.get(), 20)
-            include_replies = bool(include_replies_var.get())
-            if limit <= 0:
-                log("Cargando todos los comentarios (guardrail interno)...")
-            else:
-                log(f"Cargando comentarios: {limit}")
-            comments = listar_comentarios_video(
-                video_id=vid,
-                max_results=limit,
-                include_replies=include_replies,
-                start_date=start_var.get(),
-                end_date=end_var.get(),
-                log_fn=log,
-            )
+            comments = comments_future.result()
             nonlocal last_comments
             last_comments = comments
             comment_lines = ["== Comentarios =="]
             if not comments:
                 comment_lines.append("(sin comentarios en este rango o deshabilitados)")
-                comment_lines.append(f"Rango: {start_var.get()} a {end_var.get()}")
+                comment_lines.append(f"Rango: {start_date} a {end_date}")
             else:
                 for idx, c in enumerate(comments, start=1):
                     author = c.get("author") or ""
@@ -429,6 +441,8 @@ def create_tab(parent, context):
         except Exception as exc:
             log(f"Error Analytics: {exc}")
         finally:
+            if pool:
+                pool.shutdown(wait=True)
             if stop_control:
                 stop_control.set_busy(False)
 
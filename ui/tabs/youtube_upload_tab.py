@@ -1,3 +1,4 @@
+import contextlib
 import json
 import re
 import threading
@@ -17,7 +18,8 @@ from core.youtube_credentials import (
     DEFAULT_SCOPES,
 )
 from core.youtube_oauth import build_oauth_url, exchange_code_for_tokens
-from core.youtube_upload import YouTubeUploadError, upload_video, set_thumbnail
+from core.youtube_upload import YouTubeCuotaAgotada, YouTubeUploadError, upload_video, set_thumbnail
+from core import upload_queue
 from core.utils import obtener_duracion_segundos
 from core.ai_youtube import generar_textos_youtube
 from core.ai_youtube import subir_video_youtube_desde_ia
@@ -793,11 +795,14 @@ def create_tab(parent, context):
     bulk_files: list[Path] = []
     bulk_status: dict[str, str] = {}
     bulk_video_ids: dict[str, str] = {}
+    # Trabajo (core.stop_control) del lote en curso: Detener solo corta este lote.
+    bulk_trabajo: dict[str, str | None] = {"id": None}
 
     bulk_privacy_var = tk.StringVar(value=privacy_var.get())
     privacy_var.trace_add("write", lambda *_: bulk_privacy_var.set(privacy_var.get()))
 
     bulk_max_upload_var = tk.StringVar(value="0")  # 0 = all
+    bulk_parallel_var = tk.StringVar(value=str(upload_queue.max_paralelas()))
     bulk_title_prefix_var = tk.StringVar(value="")
     bulk_tags_var = tk.StringVar(value="")
     bulk_short_mode_var = tk.StringVar(value="Auto")  # Auto / Short / Normal
@@ -806,7 +811,7 @@ def create_tab(parent, context):
 
     bulk_header = ctk.CTkFrame(bulk_body, fg_color="transparent")
     bulk_header.grid(row=0, column=0, sticky="ew", padx=(4, 0), pady=(4, 8))
-    bulk_header.grid_columnconfigure(7, weight=1)
+    bulk_header.grid_columnconfigure(9, weight=1)
 
     ctk.CTkButton(
         bulk_header,
@@ -849,6 +854,13 @@ def create_tab(parent, context):
         row=0, column=6, sticky="w"
     )
 
+    ctk.CTkLabel(bulk_header, text="En paralelo:", font=ctk.CTkFont(size=12)).grid(
+        row=0, column=7, sticky="e", padx=(16, 4)
+    )
+    ctk.CTkEntry(bulk_header, textvariable=bulk_parallel_var, width=60).grid(
+        row=0, column=8, sticky="w"
+    )
+
     btn_bulk_start = ctk.CTkButton(
         bulk_header,
         text="Subir lote",
@@ -856,7 +868,7 @@ def create_tab(parent, context):
         height=32,
         width=140,
     )
-    btn_bulk_start.grid(row=0, column=8, sticky="e", padx=(8, 0))
+    btn_bulk_start.grid(row=0, column=10, sticky="e", padx=(8, 0))
 
     btn_bulk_stop = ctk.CTkButton(
         bulk_header,
@@ -865,7 +877,7 @@ def create_tab(parent, context):
         height=32,
         width=120,
     )
-    btn_bulk_stop.grid(row=0, column=9, sticky="e", padx=(8, 0))
+    btn_bulk_stop.grid(row=0, column=11, sticky="e", padx=(8, 0))
 
     bulk_settings = ctk.CTkFrame(bulk_body, fg_color="transparent")
     bulk_settings.grid(row=1, column=0, sticky="ew", padx=(4, 0), pady=(0, 8))
@@ -1049,8 +1061,12 @@ def create_tab(parent, context):
         _bulk_refresh_listbox()
 
     def _bulk_stop():
+        trabajo_id = bulk_trabajo["id"]
+        if not trabajo_id:
+            log("No hay un lote de YouTube en curso.")
+            return
         if stop_control:
-            stop_control.request_stop()
+            stop_control.request_stop(log, trabajo=trabajo_id)
         log("Solicitud de detener enviada.")
 
     def _bulk_short_flag_for_path(path: Path) -> bool:
@@ -1085,6 +1101,11 @@ def create_tab(parent, context):
         except ValueError:
             mostrar_error("Max debe ser un numero (0 = todos).")
             return
+        try:
+            max_paralelo = int((bulk_parallel_var.get() or "1").strip())
+        except ValueError:
+            mostrar_error("En paralelo debe ser un numero (1 = de a uno).")
+            return
         files_to_upload = list(bulk_files)
         if max_value > 0:
             files_to_upload = files_to_upload[:max_value]
@@ -1099,66 +1120,82 @@ def create_tab(parent, context):
         def _ui(fn):
             parent.after(0, fn)
 
+        total = len(files_to_upload)
+
+        def _subir(i, path):
+            idx = i + 1
+
+            def log_archivo(msg, n=path.name):
+                log(f"[{n}] {msg}")
+
+            if not path.exists():
+                log(f"[{idx}] No existe: {path}")
+                _ui(lambda p=path: _bulk_set_status(p, "MISSING"))
+                return None
+
+            _ui(lambda p=path: _bulk_set_status(p, "SUBIENDO"))
+            log(f"[{idx}/{total}] Subiendo: {path.name}")
+
+            try:
+                if bulk_use_ai_var.get():
+                    result = subir_video_youtube_desde_ia(
+                        str(path),
+                        model=bulk_model_var.get(),
+                        idioma="es",
+                        privacy=bulk_privacy_var.get(),
+                        log_fn=log_archivo,
+                    )
+                    video_id = result.get("video_id", "")
+                else:
+                    prefix = bulk_title_prefix_var.get().strip()
+                    title = _bulk_clean_title(path.stem)
+                    if prefix:
+                        title = f"{prefix} {title}".strip()
+                    description = bulk_desc_box.get("1.0", "end").strip()
+                    if not description:
+                        description = title
+                    tags_text = bulk_tags_var.get().strip() or entry_tags.get().strip()
+                    tags_list = [t.strip() for t in tags_text.split(",") if t.strip()]
+                    video_id = upload_video(
+                        path,
+                        title,
+                        description,
+                        tags_list,
+                        privacy=bulk_privacy_var.get(),
+                        is_short=_bulk_short_flag_for_path(path),
+                        log_fn=log_archivo,
+                    )
+            except YouTubeCuotaAgotada as exc:
+                _ui(lambda p=path: _bulk_set_status(p, "CUOTA"))
+                raise upload_queue.ColaDetenida(f"{exc} No se inician más subidas.") from exc
+            except Exception as exc:
+                _ui(lambda p=path: _bulk_set_status(p, "ERR"))
+                helpers.log_seccion(log, None, "Error YouTube lote")
+                log(f"Error subiendo {path.name}: {exc}")
+                return None
+
+            if not video_id:
+                _ui(lambda p=path: _bulk_set_status(p, "ERR"))
+                log("Error: no se recibió video_id.")
+                return None
+            youtube_state["last_video_id"] = video_id
+            bulk_video_ids[str(path)] = video_id
+            url = f"https://youtu.be/{video_id}"
+            _ui(lambda p=path: _bulk_set_status(p, "OK"))
+            _ui(lambda u=url: _bulk_append_result(u))
+            log(f"OK: {url}")
+            return video_id
+
         def worker():
             try:
-                for idx, path in enumerate(files_to_upload, start=1):
+                alcance = stop_control.trabajo("youtube-lote") if stop_control else contextlib.nullcontext()
+                with alcance as trabajo_id:
+                    bulk_trabajo["id"] = trabajo_id
+                    upload_queue.ejecutar_cola(_subir, files_to_upload, max_paralelo, log_fn=log)
                     if stop_control and stop_control.should_stop():
                         log("Proceso detenido por el usuario.")
-                        break
-
-                    if not path.exists():
-                        log(f"[{idx}] No existe: {path}")
-                        _ui(lambda p=path: _bulk_set_status(p, "MISSING"))
-                        continue
-
-                    _ui(lambda p=path: _bulk_set_status(p, "SUBIENDO"))
-                    log(f"[{idx}/{len(files_to_upload)}] Subiendo: {path.name}")
-
-                    try:
-                        if bulk_use_ai_var.get():
-                            result = subir_video_youtube_desde_ia(
-                                str(path),
-                                model=bulk_model_var.get(),
-                                idioma="es",
-                                privacy=bulk_privacy_var.get(),
-                                log_fn=log,
-                            )
-                            video_id = result.get("video_id", "")
-                        else:
-                            prefix = bulk_title_prefix_var.get().strip()
-                            title = _bulk_clean_title(path.stem)
-                            if prefix:
-                                title = f"{prefix} {title}".strip()
-                            description = bulk_desc_box.get("1.0", "end").strip()
-                            if not description:
-                                description = title
-                            tags_text = bulk_tags_var.get().strip() or entry_tags.get().strip()
-                            tags_list = [t.strip() for t in tags_text.split(",") if t.strip()]
-                            video_id = upload_video(
-                                path,
-                                title,
-                                description,
-                                tags_list,
-                                privacy=bulk_privacy_var.get(),
-                                is_short=_bulk_short_flag_for_path(path),
-                                log_fn=log,
-                            )
-
-                        if video_id:
-                            youtube_state["last_video_id"] = video_id
-                            bulk_video_ids[str(path)] = video_id
-                            url = f"https://youtu.be/{video_id}"
-                            _ui(lambda p=path: _bulk_set_status(p, "OK"))
-                            _ui(lambda u=url: _bulk_append_result(u))
-                            log(f"OK: {url}")
-                        else:
-                            _ui(lambda p=path: _bulk_set_status(p, "ERR"))
-                            log("Error: no se recibió video_id.")
-                    except Exception as exc:
-                        _ui(lambda p=path: _bulk_set_status(p, "ERR"))
-                        helpers.log_seccion(log, None, "Error YouTube lote")
-                        log(f"Error subiendo {path.name}: {exc}")
             finally:
+                bulk_trabajo["id"] = None
                 if stop_control:
                     stop_control.set_busy(False)
                 log("Lote finalizado.")
@@ -1194,7 +1231,7 @@ def create_tab(parent, context):
         videos_status_var.set("Cargando lista desde YouTube...")
         def run_list():
             try:
-                videos = listar_videos_subidos(25, log_fn=log)
+                videos = listar_videos_subidos(25, forzar=True, log_fn=log)
                 _render_videos(videos)
                 videos_status_var.set(f"{len(videos)} videos listados")
             except Exception as exc: